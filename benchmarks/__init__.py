@@ -0,0 +1,3 @@
+"""
+RailSafeAI - Benchmark va yuklama testlari
+"""
\ No newline at end of file
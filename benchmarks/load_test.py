@@ -0,0 +1,297 @@
+"""
+RailSafeAI - Ko'p kamerali yuklama testi (sintetik kameralar va sintetik detektor bilan)
+
+Haqiqiy RailSafeAI/CameraProcessor konveyeri oynasiz rejimda N ta sintetik kamera bilan ishga tushiriladi.
+Har bir N alohida jarayonda o'lchanadi (xotira va threadlar aralashmasligi uchun).
+
+Ishlatish:
+    python -m benchmarks.load_test --cameras 1,2,4,8 --latency-ms 20
+    python -m benchmarks.load_test --cameras 1,2,4 --duration 10 --latency-mode cpu --record
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from modules.detector import VehicleDetector
+from benchmarks.synthetic import (
+    MovingBoxes, make_results, make_polygon_json, write_synthetic_video, redirect_paths
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+class SyntheticDetector(VehicleDetector):
+    """Modelsiz detektor: video bilan bir xil harakatlanuvchi qutilarni qaytaradi
+    
+    latency_mode='sleep' - GIL bo'shatiladi (GPU/ONNX inference kabi), 'cpu' - GIL ushlab turiladi.
+    """
+    
+    def __init__(self, scene, latency, latency_mode='sleep'):
+        super().__init__(None)
+        self.scene = scene
+        self.latency = latency
+        self.latency_mode = latency_mode
+        self.detection_enabled = True
+    
+    def detect_and_track(self, frame, frame_index=None):
+        """Kechikishni taqlid qilish va joriy kadrdagi qutilarni qaytarish"""
+        if not self.detection_enabled:
+            return None
+        
+        if self.latency > 0:
+            if self.latency_mode == 'cpu':
+                deadline = time.perf_counter() + self.latency
+                while time.perf_counter() < deadline:
+                    pass
+            else:
+                time.sleep(self.latency)
+        
+        detections = self.scene.detections()
+        self.scene.step()
+        return make_results(detections)
+
+def _rss_bytes():
+    """Joriy RSS (Linux /proc orqali)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+def _cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def _prepare_videos(args, count):
+    """Har bir kamera uchun video (keshlangan) va polygon fayli"""
+    os.makedirs(args.video_dir, exist_ok=True)
+    frames = int(args.fps * (args.warmup + args.duration + 5))
+    width, height = args.size
+    cameras = []
+    for index in range(count):
+        video_path = os.path.join(
+            args.video_dir, f"load_{index}_{width}x{height}_{args.fps}fps_{frames}f_{args.boxes}b.mp4"
+        )
+        write_synthetic_video(video_path, frames, width, height, args.fps, args.boxes, seed=index)
+        
+        # Polygon - kadr o'rtasidagi uchdan bir qism (qutilar kirib-chiqib turadi)
+        polygon = [(width // 3, height // 6), (2 * width // 3, height // 6),
+                   (2 * width // 3, 5 * height // 6), (width // 3, 5 * height // 6)]
+        polygon_path = os.path.join(args.video_dir, f"load_{index}_{width}x{height}_polygon.json")
+        with open(polygon_path, 'w') as f:
+            json.dump(make_polygon_json(polygon, width, height), f)
+        
+        cameras.append({
+            'id': f"load{index}",
+            'source': video_path,
+            'polygon_file': polygon_path,
+            'polygon_length_meters': 20.0,
+            'enabled': True,
+            'detection_active': True,
+            'recording_active': args.record,
+            'position': (0, 0)
+        })
+    return cameras
+
+def run_worker(args):
+    """Bitta N uchun o'lchov (alohida jarayonda)"""
+    from config.settings import VIDEO_SETTINGS, METRICS_SETTINGS, LOG_SETTINGS
+    
+    cameras = _prepare_videos(args, args.worker)
+    work_dir = tempfile.mkdtemp(prefix='railsafe_load_')
+    redirect_paths(work_dir)
+    
+    # Headless CI: HTTP server yo'q, konsolga faqat ogohlantirishlar, kamera tezligi jonli kamera kabi
+    METRICS_SETTINGS['http_enabled'] = False
+    LOG_SETTINGS['console_level'] = 'WARNING'
+    VIDEO_SETTINGS['max_processing_fps'] = 0 if args.unpaced else args.fps
+    
+    from main import RailSafeAI
+    from modules.metrics import PipelineMetrics
+    
+    width, height = args.size
+    
+    def detector_factory(camera_id, cam_config):
+        index = int(camera_id[len('load'):])
+        scene = MovingBoxes(args.boxes, width, height, seed=index)
+        return SyntheticDetector(scene, args.latency_ms / 1000.0, args.latency_mode)
+    
+    system = RailSafeAI(cameras=cameras, detector_factory=detector_factory)
+    measurement = {}
+    
+    def control():
+        time.sleep(args.warmup)
+        # Qizish davridan keyin o'lchov noldan boshlanadi
+        for camera_id, processor in system.camera_processors.items():
+            processor.metrics = PipelineMetrics(camera_id)
+        start_frames = {camera_id: 0 for camera_id in system.camera_processors}
+        start_cpu, start_time = _cpu_seconds(), time.perf_counter()
+        
+        time.sleep(args.duration)
+        elapsed = time.perf_counter() - start_time
+        cpu = _cpu_seconds() - start_cpu
+        per_camera = {}
+        for camera_id, processor in system.camera_processors.items():
+            snapshot = processor.metrics.snapshot()
+            total = snapshot['stages'].get('total', {})
+            inference = snapshot['stages'].get('inference', {})
+            per_camera[camera_id] = {
+                'fps': (snapshot['counters']['frames'] - start_frames[camera_id]) / elapsed,
+                'latency_p50_ms': total.get('p50', 0) * 1000,
+                'latency_p95_ms': total.get('p95', 0) * 1000,
+                'latency_p99_ms': total.get('p99', 0) * 1000,
+                'inference_p50_ms': inference.get('p50', 0) * 1000,
+                'dropped_frames': snapshot['counters']['dropped_frames']
+            }
+        measurement.update({
+            'cameras': per_camera,
+            'elapsed_s': elapsed,
+            'cpu_percent': 100.0 * cpu / elapsed,
+            'rss_mb': _rss_bytes() / 1024 ** 2,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        })
+        system.running = False
+    
+    threading.Thread(target=control, daemon=True).start()
+    system.run(headless=True)
+    
+    with open(args.result, 'w') as f:
+        json.dump(measurement, f)
+
+def _summarize(count, measurement, args):
+    """Bitta N natijasini qisqartirish va real vaqt mezonini tekshirish"""
+    cameras = measurement.get('cameras', {})
+    fps_values = [camera['fps'] for camera in cameras.values()] or [0.0]
+    realtime = len(cameras) == count and min(fps_values) >= args.fps * args.realtime_ratio
+    return {
+        'cameras': count,
+        'fps_min': min(fps_values),
+        'fps_mean': sum(fps_values) / len(fps_values),
+        'latency_p50_ms': max((c['latency_p50_ms'] for c in cameras.values()), default=0),
+        'latency_p95_ms': max((c['latency_p95_ms'] for c in cameras.values()), default=0),
+        'latency_p99_ms': max((c['latency_p99_ms'] for c in cameras.values()), default=0),
+        'cpu_percent': measurement.get('cpu_percent', 0),
+        'rss_mb': measurement.get('rss_mb', 0),
+        'peak_rss_mb': measurement.get('peak_rss_mb', 0),
+        'realtime': realtime,
+        'per_camera': cameras
+    }
+
+def run_sweep(args):
+    """N bo'yicha o'lchovlar va hisobot"""
+    counts = [int(value) for value in args.cameras.split(',')]
+    print(f"Yuklama testi: kameralar {counts}, {args.size[0]}x{args.size[1]} @ {args.fps}fps, "
+          f"detektor {args.latency_ms}ms ({args.latency_mode}), {args.boxes} ta quti")
+    
+    # Videolar bir marta, ota jarayonda tayyorlanadi
+    _prepare_videos(args, max(counts))
+    
+    rows = []
+    for count in counts:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            result_path = f.name
+        command = [sys.executable, '-m', 'benchmarks.load_test', '--worker', str(count), '--result', result_path]
+        command += _forward_args(args)
+        process = subprocess.run(command, capture_output=True, text=True,
+                                 timeout=args.warmup + args.duration + 120)
+        try:
+            with open(result_path, 'r') as f:
+                measurement = json.load(f)
+        except (OSError, ValueError):
+            print(f"N={count}: o'lchov natijasi yo'q (kod {process.returncode})\n{process.stderr[-2000:]}")
+            measurement = {}
+        finally:
+            if os.path.exists(result_path):
+                os.remove(result_path)
+        
+        row = _summarize(count, measurement, args)
+        rows.append(row)
+        print(f"  N={count:3d}  FPS min {row['fps_min']:6.1f} / o'rtacha {row['fps_mean']:6.1f}  "
+              f"kechikish p50 {row['latency_p50_ms']:7.1f}ms p95 {row['latency_p95_ms']:7.1f}ms  "
+              f"CPU {row['cpu_percent']:6.1f}%  RSS {row['rss_mb']:7.1f}MB  "
+              f"{'real vaqt' if row['realtime'] else 'REAL VAQTDAN ORQADA'}")
+    
+    failing = [row['cameras'] for row in rows if not row['realtime']]
+    passing = [row['cameras'] for row in rows if row['realtime']]
+    limit = max((count for count in passing if not failing or count < min(failing)), default=0)
+    print(f"\nReal vaqtda ishlaydigan eng ko'p kamera: {limit}"
+          + (f" (N={min(failing)} da real vaqtdan orqada qoldi)" if failing else ''))
+    
+    payload = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'cpu_count': os.cpu_count(),
+            'size': list(args.size),
+            'fps': args.fps,
+            'latency_ms': args.latency_ms,
+            'latency_mode': args.latency_mode,
+            'boxes': args.boxes,
+            'record': args.record,
+            'paced': not args.unpaced,
+            'warmup_s': args.warmup,
+            'duration_s': args.duration,
+            'realtime_ratio': args.realtime_ratio
+        },
+        'realtime_limit': limit,
+        'results': rows
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Natijalar saqlandi: {output}")
+
+def _forward_args(args):
+    """Ishchi jarayonga o'tkaziladigan parametrlar"""
+    forwarded = ['--fps', str(args.fps), '--size', f"{args.size[0]}x{args.size[1]}",
+                 '--latency-ms', str(args.latency_ms), '--latency-mode', args.latency_mode,
+                 '--boxes', str(args.boxes), '--warmup', str(args.warmup), '--duration', str(args.duration),
+                 '--video-dir', args.video_dir]
+    if args.record:
+        forwarded.append('--record')
+    if args.unpaced:
+        forwarded.append('--unpaced')
+    return forwarded
+
+def _parse_size(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="RailSafeAI ko'p kamerali yuklama testi")
+    parser.add_argument('--cameras', default='1,2,4,8', help="Kameralar soni ro'yxati (vergul bilan)")
+    parser.add_argument('--fps', type=int, default=25, help="Sintetik kamera kadr tezligi")
+    parser.add_argument('--size', type=_parse_size, default=(960, 540), help="Kadr o'lchami, masalan 1280x720")
+    parser.add_argument('--boxes', type=int, default=6, help="Kadrdagi harakatlanuvchi qutilar soni")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Sintetik detektor kechikishi")
+    parser.add_argument('--latency-mode', choices=('sleep', 'cpu'), default='sleep',
+                        help="sleep - GIL bo'shatiladi (GPU kabi), cpu - GIL band (Python kodi kabi)")
+    parser.add_argument('--record', action='store_true', help="Video yozishni ham yoqish")
+    parser.add_argument('--unpaced', action='store_true', help="Kamera tezligini cheklamaslik (maksimal o'tkazuvchanlik)")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Qizish vaqti (sekund)")
+    parser.add_argument('--duration', type=float, default=10.0, help="O'lchov vaqti (sekund)")
+    parser.add_argument('--realtime-ratio', type=float, default=0.95,
+                        help="Real vaqt mezoni: eng sekin kamera FPS >= fps * ratio")
+    parser.add_argument('--video-dir', default=os.path.join(tempfile.gettempdir(), 'railsafe_load_videos'),
+                        help="Sintetik videolar keshi")
+    parser.add_argument('--output', help="Natija JSON fayli (standart: benchmarks/results/load_<vaqt>.json)")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        run_worker(args)
+    else:
+        run_sweep(args)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+RailSafeAI - Mikro-benchmarklar (model, kamera va GPU siz)
+
+Ishlatish:
+    python -m benchmarks.run_benchmarks                       # hammasi, natija benchmarks/results/ ga
+    python -m benchmarks.run_benchmarks --quick --filter tracker
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/oldingi.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+import numpy as np
+
+from benchmarks.synthetic import (
+    make_results, make_polygon, make_points, make_vehicle, make_frame, redirect_paths
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+class BenchmarkRunner:
+    """Benchmarklarni o'lchash va natijalarni yig'ish"""
+    
+    def __init__(self, quick=False, name_filter=None):
+        self.quick = quick
+        self.name_filter = name_filter
+        self.results = []
+    
+    def enabled(self, name):
+        """Benchmark --filter ga mosmi"""
+        return not self.name_filter or self.name_filter in name
+    
+    def measure(self, name, params, func, items=1, setup=None):
+        """Bitta chaqiruv vaqtini o'lchash
+        
+        func - o'lchanadigan funksiya, items - bir chaqiruvdagi elementlar soni (nuqta, track, kadr).
+        setup berilsa, har bir o'lchovdan oldin chaqiriladi va uning natijasi func ga uzatiladi
+        (masalan, o'chirish uchun tracklarni qayta yaratish).
+        """
+        if not self.enabled(name):
+            return
+        
+        repeat = 3 if self.quick else 7
+        target = 0.02 if self.quick else 0.1  # Bitta o'lchov uchun minimal vaqt (sekund)
+        
+        if setup is not None:
+            number = 1
+            timings = []
+            for _ in range(repeat):
+                state = setup()
+                start = perf_counter()
+                func(state)
+                timings.append(perf_counter() - start)
+        else:
+            # Aylanishlar sonini o'lchov target dan uzun bo'ladigan qilib tanlash
+            number = 1
+            while True:
+                elapsed = self._time(func, number)
+                if elapsed >= target or number >= 10 ** 7:
+                    break
+                number = max(number * 2, int(number * target / max(elapsed, 1e-9) * 1.2))
+            timings = [self._time(func, number) / number for _ in range(repeat)]
+        
+        median = statistics.median(timings)
+        result = {
+            'name': name,
+            'params': params,
+            'loops': number,
+            'repeat': repeat,
+            'items': items,
+            'median_s': median,
+            'min_s': min(timings),
+            'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'per_item_s': median / items
+        }
+        self.results.append(result)
+        print(f"  {name:38s} {self._format_params(params):28s} "
+              f"{_format_time(median):>10s}/chaqiruv  {_format_time(median / items):>10s}/element")
+    
+    @staticmethod
+    def _time(func, number):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        return perf_counter() - start
+    
+    @staticmethod
+    def _format_params(params):
+        return ', '.join(f"{key}={value}" for key, value in params.items())
+
+def _format_time(seconds):
+    """Vaqtni o'qish uchun qulay birlikda"""
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.0f}ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+# ===== Benchmarklar =====
+
+def bench_polygon(runner):
+    """PolygonManager.point_in_polygon - polygon o'lchami va nuqtalar soni bo'yicha"""
+    from modules.polygon_utils import PolygonManager
+    
+    manager = PolygonManager()
+    for vertices in (4, 16, 64, 256):
+        manager.polygons['bench'] = make_polygon(vertices)
+        for count in ((1, 100) if runner.quick else (1, 100, 1000)):
+            points = make_points(count)
+            
+            def run(points=points):
+                for point in points:
+                    manager.point_in_polygon('bench', point)
+            
+            runner.measure('polygon.point_in_polygon', {'vertices': vertices, 'points': count}, run, items=count)
+
+def _fill_tracker(tracker, count, current_time=0.0, inside_ratio=0.5):
+    """Trackerga count ta avtomobil qo'shish; har biri polygon ichida yoki undan o'tgan"""
+    vehicles = []
+    for track_id in range(count):
+        vehicle = make_vehicle(track_id, (10, 10, 110, 80))
+        vehicles.append(vehicle)
+        tracker.update_vehicle('bench', vehicle, current_time, True)
+        if track_id >= count * inside_ratio:
+            tracker.update_vehicle('bench', vehicle, current_time + 1.0, False)
+    return vehicles
+
+def bench_tracker(runner):
+    """VehicleTracker.update_vehicle / cleanup_old_vehicles / get_statistics - 10..10000 track"""
+    from modules.event_log import get_logger
+    from modules.tracker import VehicleTracker
+    
+    # Kirish/chiqish hodisalari jurnali o'lchovga aralashmasin
+    get_logger('tracker').disabled = True
+    
+    for count in ((10, 1000) if runner.quick else (10, 100, 1000, 10000)):
+        tracker = VehicleTracker()
+        vehicles = _fill_tracker(tracker, count)
+        state = {'time': 2.0}
+        
+        # Bir kadr: barcha tracklar yangilanadi (polygon holati o'zgarmaydi)
+        def update(vehicles=vehicles, tracker=tracker):
+            state['time'] += 0.04
+            for vehicle in vehicles:
+                tracker.update_vehicle('bench', vehicle, state['time'], False)
+        
+        runner.measure('tracker.update_vehicle', {'tracks': count}, update, items=count)
+        runner.measure('tracker.get_statistics', {'tracks': count},
+                       lambda tracker=tracker: tracker.get_statistics('bench'), items=count)
+        runner.measure('tracker.cleanup_old_vehicles[scan]', {'tracks': count},
+                       lambda tracker=tracker: tracker.cleanup_old_vehicles('bench', 0.0), items=count)
+        
+        def fresh(count=count):
+            tracker = VehicleTracker()
+            _fill_tracker(tracker, count)
+            return tracker
+        
+        runner.measure('tracker.cleanup_old_vehicles[evict]', {'tracks': count},
+                       lambda tracker: tracker.cleanup_old_vehicles('bench', 1000.0), items=count, setup=fresh)
+    
+    get_logger('tracker').disabled = False
+
+def bench_speed(runner):
+    """SpeedEstimator.get_speed_info - polygon ichidagi va undan o'tgan avtomobil"""
+    from modules.speed_estimator import SpeedEstimator
+    
+    estimator = SpeedEstimator()
+    inside = {'in_polygon': True, 'start_time': 1.0, 'total_time': 0}
+    passed = {'in_polygon': False, 'start_time': 1.0, 'total_time': 2.5}
+    runner.measure('speed.get_speed_info', {'state': 'inside'},
+                   lambda: estimator.get_speed_info(inside, 3.0, 50.0))
+    runner.measure('speed.get_speed_info', {'state': 'passed'},
+                   lambda: estimator.get_speed_info(passed, 3.0, 50.0))
+
+def bench_detector(runner):
+    """VehicleDetector.get_vehicle_data - sintetik natija obyektlarida"""
+    from modules.detector import VehicleDetector
+    
+    detector = VehicleDetector(None)
+    rng = np.random.default_rng(0)
+    for count in (1, 10, 100):
+        detections = []
+        for track_id in range(count):
+            x1, y1 = rng.uniform(0, 1100), rng.uniform(0, 600)
+            detections.append((track_id, (x1, y1, x1 + 120, y1 + 80), 0.9))
+        results = make_results(detections)
+        runner.measure('detector.get_vehicle_data', {'boxes': count},
+                       lambda results=results: detector.get_vehicle_data(results), items=count)
+
+def bench_recorder(runner):
+    """VideoRecorder yozish yo'llari - sintetik kadrlarda, vaqtinchalik papkada"""
+    from config.settings import VIDEO_SETTINGS
+    
+    # Filter bu guruhni chiqarib tashlasa, papka va yozuvchilar ochilmaydi
+    if not any(runner.enabled(name) for name in ('recorder.write_main_frame', 'recorder.write_vehicle_frame')):
+        return
+    
+    with tempfile.TemporaryDirectory(prefix='railsafe_bench_') as root:
+        redirect_paths(root)
+        from modules.recorder import VideoRecorder
+        
+        recorder = VideoRecorder()
+        original_mode = VIDEO_SETTINGS.get('vehicle_clip_mode')
+        sizes = ((640, 360),) if runner.quick else ((640, 360), (1280, 720))
+        try:
+            for width, height in sizes:
+                frame = make_frame(width, height)
+                params = {'size': f"{width}x{height}"}
+                
+                recorder.start_main_recording('bench', width, height, 25)
+                runner.measure('recorder.write_main_frame', params,
+                               lambda frame=frame: recorder.write_main_frame('bench', frame))
+                recorder.stop_main_recording('bench')
+                
+                bbox = (width // 4, height // 3, width // 4 + width // 5, height // 3 + height // 6)
+                vehicle_info = make_vehicle(1, bbox)
+                for mode in ('full', 'crop'):
+                    VIDEO_SETTINGS['vehicle_clip_mode'] = mode
+                    recorder.start_vehicle_recording('bench', 1, width, height, 25)
+                    runner.measure('recorder.write_vehicle_frame', dict(params, mode=mode),
+                                   lambda frame=frame: recorder.write_vehicle_frame('bench', 1, frame, vehicle_info))
+                    recorder.stop_vehicle_recording('bench', 1)
+        finally:
+            VIDEO_SETTINGS['vehicle_clip_mode'] = original_mode
+            recorder.shutdown()
+
+BENCHMARKS = [
+    ('polygon', bench_polygon),
+    ('tracker', bench_tracker),
+    ('speed', bench_speed),
+    ('detector', bench_detector),
+    ('recorder', bench_recorder)
+]
+
+# ===== Natijalar =====
+
+def _git_revision():
+    """Joriy commit (mavjud bo'lsa)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def _result_key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+def compare_results(current, baseline_path, threshold):
+    """Oldingi natijalar bilan solishtirish; sekinlashganlar soni qaytariladi"""
+    with open(baseline_path, 'r') as f:
+        baseline = {_result_key(r): r for r in json.load(f)['results']}
+    
+    print(f"\nSolishtirish: {baseline_path} (chegara x{threshold:.2f})")
+    regressions = 0
+    for result in current:
+        old = baseline.get(_result_key(result))
+        if old is None:
+            continue
+        ratio = result['median_s'] / old['median_s'] if old['median_s'] > 0 else float('inf')
+        marker = ''
+        if ratio > threshold:
+            marker = '  <-- SEKINLASHDI'
+            regressions += 1
+        elif ratio < 1 / threshold:
+            marker = '  (tezlashdi)'
+        print(f"  {result['name']:38s} {BenchmarkRunner._format_params(result['params']):28s} x{ratio:5.2f}{marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="RailSafeAI mikro-benchmarklari")
+    parser.add_argument('--quick', action='store_true', help="Kamroq parametr va takror (CI uchun)")
+    parser.add_argument('--filter', help="Faqat nomida shu matn bor benchmarklar")
+    parser.add_argument('--output', help="Natija JSON fayli (standart: benchmarks/results/<vaqt>_<commit>.json)")
+    parser.add_argument('--compare', help="Oldingi natija JSON fayli bilan solishtirish")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Sekinlashish chegarasi (nisbat)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Sekinlashish bo'lsa 1 kodi bilan chiqish")
+    args = parser.parse_args()
+    
+    runner = BenchmarkRunner(quick=args.quick, name_filter=args.filter)
+    for group, bench in BENCHMARKS:
+        print(f"\n[{group}]")
+        bench(runner)
+    
+    revision = _git_revision()
+    payload = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': revision,
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick
+        },
+        'results': runner.results
+    }
+    try:
+        import cv2
+        payload['meta']['opencv'] = cv2.__version__
+    except ImportError:
+        pass
+    
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{revision or 'local'}.json")
+    with open(output, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"\nNatijalar saqlandi: {output}")
+    
+    if args.compare:
+        regressions = compare_results(runner.results, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+RailSafeAI - Benchmark va yuklama testlari uchun sintetik ma'lumotlar moduli
+"""
+import math
+import os
+import numpy as np
+from config.paths import Paths
+
+class FakeTensor:
+    """torch.Tensor ning get_vehicle_data ishlatadigan qismi: [i], .cpu(), .numpy(), .item()"""
+    
+    def __init__(self, values):
+        self.values = np.asarray(values)
+    
+    def __getitem__(self, index):
+        value = self.values[index]
+        return FakeTensor(value) if isinstance(value, np.ndarray) else FakeTensor(np.asarray(value))
+    
+    def cpu(self):
+        return self
+    
+    def numpy(self):
+        return self.values
+    
+    def item(self):
+        return self.values.item()
+    
+    def __float__(self):
+        return float(self.values)
+    
+    def __int__(self):
+        return int(self.values)
+
+class FakeBox:
+    """ultralytics Boxes elementi: id, cls, conf, xyxy"""
+    
+    def __init__(self, track_id, class_id, confidence, xyxy):
+        self.id = FakeTensor([track_id]) if track_id is not None else None
+        self.cls = FakeTensor([class_id])
+        self.conf = FakeTensor([confidence])
+        self.xyxy = FakeTensor([xyxy])
+
+class FakeResult:
+    """ultralytics Results o'rnini bosuvchi obyekt (faqat boxes)"""
+    
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def make_results(detections, class_id=0):
+    """[(track_id, (x1, y1, x2, y2), ishonch), ...] -> detect_and_track() natijasi ko'rinishi"""
+    boxes = [FakeBox(track_id, class_id, confidence, bbox) for track_id, bbox, confidence in detections]
+    return [FakeResult(boxes)]
+
+def make_polygon(vertices, center=(640, 360), radius=300, seed=0):
+    """Tasodifiy radiusli yulduzsimon (o'z-o'zini kesmaydigan) polygon"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    radii = radius * rng.uniform(0.6, 1.0, vertices)
+    points = np.stack([center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)], axis=1)
+    return points.astype(np.int32)
+
+def make_polygon_json(points, width=1280, height=720):
+    """polygon_utils.load_polygon o'qiydigan COCO ko'rinishidagi JSON"""
+    return {
+        'images': [{'id': 1, 'width': width, 'height': height}],
+        'annotations': [{'id': 1, 'image_id': 1, 'segmentation': [np.asarray(points).reshape(-1).tolist()]}]
+    }
+
+def make_points(count, width=1280, height=720, seed=1):
+    """Kadr ichidagi tasodifiy nuqtalar"""
+    rng = np.random.default_rng(seed)
+    return [(float(x), float(y)) for x, y in zip(rng.uniform(0, width, count), rng.uniform(0, height, count))]
+
+def make_vehicle(track_id, bbox, confidence=0.9, class_id=0, class_name='car'):
+    """get_vehicle_data() qaytaradigan avtomobil lug'ati"""
+    x1, y1, x2, y2 = bbox
+    return {
+        'track_id': track_id,
+        'class_id': class_id,
+        'class_name': class_name,
+        'bbox': (int(x1), int(y1), int(x2), int(y2)),
+        'center': ((x1 + x2) / 2, (y1 + y2) / 2),
+        'confidence': confidence
+    }
+
+def make_frame(width=1280, height=720, seed=0):
+    """Shovqinli fon (kodek uchun real kadrga yaqin murakkablik)"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 90, (-(-height // 8), -(-width // 8), 3), dtype=np.uint8)
+    # 8 ga bo'linmaydigan o'lchamlar (masalan 960x540) - ortiqcha qator/ustunlar kesiladi
+    return np.ascontiguousarray(np.repeat(np.repeat(background, 8, axis=0), 8, axis=1)[:height, :width])
+
+class MovingBoxes:
+    """Kadr bo'ylab harakatlanuvchi to'rtburchaklar (sintetik avtomobillar) va ularning haqiqiy holati
+    
+    Bir xil seed bilan yaratilgan ikki nusxa bir xil harakatlanadi: biri videoni chizadi,
+    ikkinchisi sintetik detektor ichida shu kadrdagi "aniqlashlar"ni beradi.
+    """
+    
+    def __init__(self, count, width=1280, height=720, box_size=(120, 70), speed=(4.0, 12.0), seed=0):
+        self.width = width
+        self.height = height
+        self.box_w, self.box_h = box_size
+        self.rng = np.random.default_rng(seed)
+        self.speed_range = speed
+        self.next_id = 1
+        self.boxes = [self._spawn(initial=True) for _ in range(count)]
+    
+    def _spawn(self, initial=False):
+        """Chap chetdan (boshida - istalgan joydan) yangi quti"""
+        box = {
+            'id': self.next_id,
+            'x': float(self.rng.uniform(0, self.width - self.box_w)) if initial else -float(self.box_w),
+            'y': float(self.rng.uniform(0, self.height - self.box_h)),
+            'vx': float(self.rng.uniform(*self.speed_range)),
+            'color': tuple(int(c) for c in self.rng.integers(120, 255, 3))
+        }
+        self.next_id += 1
+        return box
+    
+    def step(self):
+        """Bir kadr oldinga; kadrdan chiqqan quti o'rniga yangisi (yangi track ID bilan) paydo bo'ladi"""
+        for i, box in enumerate(self.boxes):
+            box['x'] += box['vx']
+            if box['x'] > self.width:
+                self.boxes[i] = self._spawn()
+    
+    def detections(self):
+        """[(track_id, (x1, y1, x2, y2), ishonch), ...] - kadrda yetarlicha ko'ringan qutilar"""
+        result = []
+        for box in self.boxes:
+            x1 = max(box['x'], 0.0)
+            x2 = min(box['x'] + self.box_w, float(self.width))
+            if x2 - x1 < self.box_w * 0.3:
+                continue
+            result.append((box['id'], (x1, box['y'], x2, box['y'] + self.box_h), 0.9))
+        return result
+    
+    def draw(self, frame):
+        """Qutilarni kadrga chizish"""
+        for box in self.boxes:
+            x1, y1 = int(box['x']), int(box['y'])
+            if x1 + self.box_w <= 0 or x1 >= self.width:
+                continue
+            frame[max(y1, 0):y1 + self.box_h, max(x1, 0):min(x1 + self.box_w, self.width)] = box['color']
+        return frame
+
+def write_synthetic_video(path, frames, width, height, fps, boxes, seed):
+    """Harakatlanuvchi qutilar videosini yaratish (mavjud bo'lsa qayta yozilmaydi)"""
+    if os.path.exists(path):
+        return path
+    
+    import cv2
+    background = make_frame(width, height, seed)
+    scene = MovingBoxes(boxes, width, height, seed=seed)
+    tmp_path = path + '.tmp.mp4'
+    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Video yozuvchi ochilmadi: {tmp_path}")
+    try:
+        for _ in range(frames):
+            writer.write(scene.draw(background.copy()))
+            scene.step()
+    finally:
+        writer.release()
+    os.replace(tmp_path, path)
+    return path
+
+def redirect_paths(root):
+    """data/ papkalarini vaqtinchalik joyga yo'naltirish (haqiqiy natijalar aralashmasligi uchun)"""
+    Paths.DATA_DIR = root
+    Paths.VIDEOS_DIR = os.path.join(root, 'videos')
+    Paths.POLYGONS_DIR = os.path.join(root, 'polygons')
+    Paths.OUTPUTS_DIR = os.path.join(root, 'outputs')
+    Paths.RESOLUTION_FILE = os.path.join(root, 'resolution_calibration.json')
+    for name in ('VEHICLE_VIDEOS_DIR', 'VEHICLE_IMAGES_DIR', 'LOGS_DIR', 'PROFILES_DIR', 'TRAJECTORIES_DIR'):
+        setattr(Paths, name, os.path.join(Paths.OUTPUTS_DIR, os.path.basename(getattr(Paths, name))))
+    Paths.create_directories()
\ No newline at end of file
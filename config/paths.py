@@ -17,11 +17,16 @@ class Paths:
     # Ma'lumotlar papkalari
     VIDEOS_DIR = os.path.join(DATA_DIR, 'videos')
     POLYGONS_DIR = os.path.join(DATA_DIR, 'polygons')
+    DETECTION_CACHE_DIR = os.path.join(DATA_DIR, 'detection_cache')
+    RESOLUTION_FILE = os.path.join(DATA_DIR, 'resolution_calibration.json')
     OUTPUTS_DIR = os.path.join(DATA_DIR, SAVE_SETTINGS['output_dir'].split('/')[-1])
     
     # Chiquvchi fayllar
     VEHICLE_VIDEOS_DIR = os.path.join(OUTPUTS_DIR, SAVE_SETTINGS['video_dir'])
     VEHICLE_IMAGES_DIR = os.path.join(OUTPUTS_DIR, SAVE_SETTINGS['image_dir'])
+    LOGS_DIR = os.path.join(OUTPUTS_DIR, 'logs')
+    PROFILES_DIR = os.path.join(OUTPUTS_DIR, 'profiles')
+    TRAJECTORIES_DIR = os.path.join(OUTPUTS_DIR, 'trajectories')
     
     @staticmethod
     def create_directories():
@@ -32,7 +37,8 @@ class Paths:
             Paths.POLYGONS_DIR, 
             Paths.OUTPUTS_DIR,
             Paths.VEHICLE_VIDEOS_DIR,
-            Paths.VEHICLE_IMAGES_DIR
+            Paths.VEHICLE_IMAGES_DIR,
+            Paths.LOGS_DIR
         ]
         
         for directory in directories:
@@ -22,6 +22,7 @@ CONTROLS = {
     'stop_detection': 'g',      # Aniqlashni to'xtatish tugmasi  
     'start_recording': 'r',     # Video yozishni boshlash
     'stop_recording': 't',      # Video yozishni to'xtatish
+    'toggle_profiling': 'p',    # Profilingni boshlash/to'xtatish (barcha kameralar)
     'exit': 'q'                 # Chiqish tugmasi
 }
 
@@ -35,6 +36,8 @@ CAMERAS = [
         'enabled': True,
         'detection_active': True,  # Boshlang'ich holatda yoqilgan
         'recording_active': True,
+        'priority': 2,  # QoS ustuvorligi (critical_priority va yuqori - yuklamada ham to'liq sifat)
+        'target_latency_ms': 33.0,  # Kadr ishlov vaqti chegarasi (QoS)
         'position': (0, 0)  # Ekranda ko'rsatish pozitsiyasi
     },
     # Qo'shimcha kameralar qo'shish mumkin:
@@ -46,6 +49,8 @@ CAMERAS = [
         'enabled': True,
         'detection_active': True,  # Boshlang'ich holatda yoqilgan
         'recording_active': True,
+        'priority': 1,
+        'target_latency_ms': 33.0,
         'position': (640, 0)
     },
     #{
@@ -88,7 +93,23 @@ VIDEO_SETTINGS = {
     'quality': 95,
     'individual_vehicle_recording_duration': 10.0,  # sekundda
     'resize_display': True,  # Ko'rsatish uchun kichraytirish
-    'resize_factor': 0.5     # Kichraytirish koeffitsienti
+    'resize_factor': 0.5,    # Kichraytirish koeffitsienti
+    'max_processing_fps': 30,  # Kamera threadi shu tezlikdan oshmaydi (0 - cheklanmagan)
+    
+    # Asosiy video segmentlari (0 - cheklanmagan)
+    'segment_duration': 300,               # Segment davomiyligi (sekund)
+    'segment_max_bytes': 512 * 1024 * 1024,  # Segment maksimal hajmi (bayt)
+    'segment_prepare_lead': 2.0,           # Keyingi segment necha sekund oldin ochib qo'yiladi
+    
+    # Avtomobil kliplari
+    # 'full' - butun kadr, 'crop' - avtomobil atrofi kesib olinadi,
+    # 'indexed' - alohida kodlanmaydi, klip asosiy videodan ffmpeg bilan (stream copy) ajratib olinadi
+    'vehicle_clip_mode': 'full',
+    'vehicle_clip_size': (480, 360),      # Kesilgan klip o'lchami (eni, bo'yi)
+    'vehicle_clip_padding': 0.3,          # bbox atrofidagi qo'shimcha joy (bbox o'lchamiga nisbatan)
+    'vehicle_clip_smoothing': 0.8,        # Kesish oynasini barqarorlashtirish (0 - yo'q, 1 - qotirilgan)
+    'vehicle_clip_thumbnail': True,       # Burchakda butun sahnaning kichik rasmi
+    'vehicle_clip_thumbnail_scale': 0.3   # Kichik rasm o'lchami (klip eniga nisbatan)
 }
 
 # ===== SAQLASH SOZLAMALARI =====
@@ -101,6 +122,235 @@ SAVE_SETTINGS = {
     'save_individual_videos': True
 }
 
+# ===== OCR SOZLAMALARI =====
+OCR_SETTINGS = {
+    'use_worker_pool': True,        # OCR alohida jarayonlarda (kamera threadini bloklamaydi)
+    'engine': 'easyocr',            # 'easyocr' yoki 'paddleocr'
+    'languages': ['en'],
+    'workers': 2,                   # OCR jarayonlari soni
+    'batch_size': 8,                # Bitta paketdagi raqam rasmlari
+    'batch_timeout': 0.05,          # Paketni to'ldirish uchun maksimal kutish (sekund)
+    'max_pending': 64,              # Navbat to'lsa yangi so'rovlar tashlab yuboriladi
+    'frame_budget_ms': 15,          # Bitta kadrda OCR ga ajratilgan vaqt (ms)
+    'min_bbox_area': 6000,          # OCR uchun minimal bbox yuzasi (piksel)
+    'min_confidence': 0.5,          # Minimal aniqlash ishonchi
+    'min_sharpness': 0.3,           # Minimal aniqlik (0..1)
+    'min_frame_interval': 3,        # Bir track uchun urinishlar orasidagi minimal kadr soni
+    'quality_gain': 1.1,            # Keyingi urinish oldingisidan shuncha marta yaxshi kadrda bo'lishi kerak
+    'max_attempts': 8,              # Bir track uchun maksimal OCR urinishlari
+    'min_read_confidence': 0.3,     # Ovoz berishga qabul qilinadigan minimal o'qish ishonchi
+    'finalize_votes': 3,            # Natijani yakunlash uchun minimal o'qishlar soni
+    'finalize_confidence': 0.8      # Natijani yakunlash uchun minimal ishonch
+}
+
+# ===== SAQLASH MUDDATI / DISK KVOTASI =====
+RETENTION_SETTINGS = {
+    'enabled': True,
+    'quotas': {                              # Tur bo'yicha umumiy kvota (bayt)
+        'video': 50 * 1024 ** 3,
+        'image': 5 * 1024 ** 3
+    },
+    'camera_quotas': {                       # Kamera bo'yicha kvota, masalan {'cam1': {'video': 20 * 1024 ** 3}}
+    },
+    'min_free_bytes': 2 * 1024 ** 3,         # Diskda kamida shuncha bo'sh joy qolishi kerak
+    'check_interval': 60,                    # Qo'shimcha tekshiruv oralig'i (sekund)
+    'protected_file': 'protected_outputs.json'  # O'chirilmaydigan (belgilangan) fayllar ro'yxati
+}
+
+# ===== AVTOMOBIL RASMI SOZLAMALARI =====
+SNAPSHOT_SETTINGS = {
+    'padding': 0.15,                # Rasm atrofidagi qo'shimcha joy (bbox o'lchamiga nisbatan)
+    'jpeg_quality': 90,
+    'edge_penalty': 0.5,            # Kadr chetida kesilgan avtomobil bahosi koeffitsienti
+    'sharpness_reference': 100.0,   # Laplacian dispersiyasi uchun me'yor (aniqlik = v / (v + me'yor))
+    'sharpness_sample_size': 64     # Aniqlik shu o'lchamgacha kichraytirilgan nusxada hisoblanadi
+}
+
+# ===== METRIKA SOZLAMALARI =====
+METRICS_SETTINGS = {
+    'window_seconds': 60,           # Kvantillar uchun aylanma oyna uzunligi (oxirgi 1-2 oyna)
+    'fps_smoothing': 0.9,           # FPS silliqlash koeffitsienti (0 - silliqlashsiz)
+    'log_interval': 0,              # Bosqichlar hisobotini konsolga chiqarish oralig'i (sekund, 0 - o'chirilgan)
+    'http_enabled': True,           # /metrics (Prometheus) va /health HTTP serveri
+    'http_host': '127.0.0.1',
+    'http_port': 9108,
+    'health_stale_seconds': 10      # Shuncha vaqt kadr kelmasa kamera nosoz hisoblanadi
+}
+
+# ===== JURNAL (LOG) SOZLAMALARI =====
+LOG_SETTINGS = {
+    'level': 'DEBUG',               # Navbatga qo'yiladigan eng past daraja
+    'console_level': 'INFO',        # Konsolga faqat shu darajadan yuqorisi
+    'file_enabled': True,           # data/outputs/logs/ ga JSON-lines fayl
+    'file_level': 'DEBUG',          # Faylga batafsil hodisalar ham (masalan, kesh dan o'chirish)
+    'file_name': 'railsafe.jsonl',
+    'max_bytes': 10 * 1024 * 1024,  # Fayl shu hajmga yetganda aylantiriladi
+    'backup_count': 5,
+    'queue_size': 10000,            # Navbat to'lsa yangi yozuvlar tashlanadi (kamera kutmaydi)
+    'rate_limit_count': 5,          # Bir xil xabar interval ichida shuncha martadan ko'p chiqarilmaydi
+    'rate_limit_interval': 10.0
+}
+
+# ===== PROFILER SOZLAMALARI =====
+PROFILER_SETTINGS = {
+    'interval': 0.005,              # Stek namunalari oralig'i (sekund)
+    'duration': 30,                 # Shuncha vaqtdan keyin hisobot yoziladi (sekund)
+    'max_depth': 64,                # Stekning eng chuqur qismi
+    'summary_top': 40,              # Funksiyalar hisobotidagi qatorlar soni
+    'signal': 'SIGUSR1'             # Shu signal profilingni yoqadi/o'chiradi (None - o'chirilgan)
+}
+
+# ===== ANIQLASHLAR KESHI SOZLAMALARI =====
+DETECTION_CACHE_SETTINGS = {
+    'enabled': False,               # Video fayllar uchun YOLO natijalarini data/detection_cache/ ga saqlash va qayta ishlatish
+    'replay_unpaced': True,         # Kesh to'liq bo'lsa max_processing_fps cheklovi qo'llanmaydi (tez qayta tahlil)
+    'hash_chunk_size': 8 * 1024 * 1024  # Fayl xeshini hisoblashda o'qiladigan bo'lak (bayt)
+}
+
+# ===== O'TISHLAR ARXIVI SOZLAMALARI =====
+ARCHIVE_SETTINGS = {
+    'enabled': True,                # Polygondan o'tgan har bir avtomobil data/outputs/ dagi SQLite bazaga yoziladi
+    'file_name': 'passages.sqlite3',
+    'batch_size': 200,              # Bitta tranzaksiyada yoziladigan eng ko'p yozuv
+    'flush_interval': 1.0,          # Paket to'lmasa ham shuncha vaqtda yoziladi (sekund)
+    'synchronous': 'NORMAL'         # WAL bilan NORMAL - har tranzaksiyada fsync yo'q, baza buzilmaydi
+}
+
+# ===== HARAKAT STATISTIKASI SOZLAMALARI =====
+TRAFFIC_STATS_SETTINGS = {
+    'resolutions': {                # Nom: (oyna uzunligi sekund, saqlanadigan oynalar soni)
+        'minute': (60, 24 * 60),    # Oxirgi sutka daqiqalar bo'yicha
+        'hour': (3600, 24 * 90)     # Oxirgi 90 kun soatlar bo'yicha
+    },
+    'quantiles': (0.5, 0.85, 0.95), # Hisobotdagi tezlik kvantillari
+    'relative_accuracy': 0.01,      # DDSketch nisbiy xatosi (1%)
+    'max_bins': 256                 # Bitta eskizdagi eng ko'p savat (xotira chegarasi)
+}
+
+# ===== TRAYEKTORIYA SOZLAMALARI =====
+TRAJECTORY_SETTINGS = {
+    'enabled': False,               # Har kadrdagi avtomobil holati data/outputs/trajectories/ ga (soatlik ikkilik fayllar)
+    'chunk_rows': 65536,            # Kamera buferi hajmi (qator) - to'lganda fon threadida yoziladi
+    'flush_interval': 10.0          # Bufer to'lmasa ham shuncha vaqtda yoziladi (sekund)
+}
+
+# ===== OGOHLANTIRISH SOZLAMALARI =====
+ALERT_SETTINGS = {
+    'enabled': False,               # Tezlik chegarasi oshirilganda ogohlantirish yuborish
+    'speed_limits': {               # km/h - klass nomi bo'yicha; kamera 'speed_limits' bilan qayta belgilashi mumkin
+        'default': 60
+    },
+    'min_time_in_polygon': 0.3,     # Bundan qisqa o'tishlar (tracker sakrashi) baholanmaydi (sekund)
+    'max_tracked_alerts': 10000,    # Ogohlantirilgan tracklar xotirasi (bitta track - bitta ogohlantirish)
+    'sink': 'file',                 # 'webhook', 'file' (data/outputs/alerts.jsonl) yoki 'memory'
+    'webhook_url': 'http://127.0.0.1:9200/alerts',
+    'file_name': 'alerts.jsonl',
+    'queue_size': 1000,             # Navbat to'lsa eng eski ogohlantirish tashlanadi
+    'batch_size': 20,               # Bitta so'rovdagi eng ko'p ogohlantirish
+    'batch_interval': 0.5,          # Paket yig'ish uchun kutish (sekund)
+    'timeout': 5.0,                 # Webhook ulanish/javob kutish (sekund)
+    'max_retries': 5,
+    'retry_backoff': 1.0,           # Qayta urinishlar orasidagi kutish (har safar 2 baravar)
+    'retry_backoff_max': 30.0,
+    'shutdown_timeout': 5.0         # To'xtatishda navbatdagilarni yuborish uchun vaqt
+}
+
+# ===== VIDEO MANBA SOZLAMALARI =====
+SOURCE_SETTINGS = {
+    'reconnect': True,              # Jonli manba (RTSP/USB) uzilsa kamera to'xtamaydi - fon threadida qayta ulanadi
+    'open_timeout_ms': 5000,        # Ulanish timeout (FFmpeg backend)
+    'read_timeout_ms': 5000,        # Kadr kelmasa shuncha vaqtdan keyin uzilish deb hisoblanadi
+    'backoff': 0.5,                 # Qayta ulanish urinishlari orasidagi kutish (har safar 2 baravar)
+    'backoff_max': 30.0,
+    'read_wait': 0.5                # Uzilish vaqtida kamera threadi bir marta kutadigan vaqt (sekund)
+}
+
+# ===== KAMERALAR NAZORATCHISI SOZLAMALARI =====
+SUPERVISOR_SETTINGS = {
+    'restart_policy': 'live',       # 'live' - faqat jonli oqimlar (video fayl tugasa qayta ishga tushirilmaydi), 'always', 'never'
+    'check_interval': 1.0,          # Kamera threadlarini tekshirish oralig'i (sekund)
+    'restart_backoff': 2.0,         # Birinchi qayta ishga tushirishgacha kutish (har urinishda 2 baravar)
+    'restart_backoff_max': 60.0,
+    'stable_seconds': 60.0          # Shuncha ishlagan kamera uchun urinishlar hisobi nolga tushadi
+}
+
+# ===== MODELLAR ZAXIRASI SOZLAMALARI =====
+MODEL_POOL_SETTINGS = {
+    'enabled': True,                # Yangi/qayta ishga tushgan kameralar tayyor (qizdirilgan) modelni oladi
+    'warm_spares': 1,               # Fon threadida yuklab turiladigan zaxira modellar soni
+    'warmup_size': (640, 640),      # Qizdirish kadri o'lchami (kenglik, balandlik)
+    'warmup_runs': 2,               # Qizdirish uchun inference soni
+    'acquire_timeout': 120.0,       # Yuklanayotgan zaxirani kutish (sekund)
+    'retry_interval': 30.0          # Yuklash xatosidan keyin qayta urinish (sekund)
+}
+
+# ===== BOSHQARUV API SOZLAMALARI =====
+CONTROL_SETTINGS = {
+    'enabled': False,               # Oynali/headless rejimda ham boshqaruv API (daemon rejimida har doim yoqiladi)
+    'host': '127.0.0.1',
+    'port': 9110,
+    'allowed_hosts': [],            # Qo'shimcha Host nomlari (masalan, '0.0.0.0' da tinglanganda server IP si)
+    'unix_socket': None,            # Masalan '/run/railsafe/control.sock' - TCP o'rniga Unix socket
+    'request_timeout': 5.0,         # So'rovni o'qish uchun kutish (sekund)
+    'stdin_keys': True              # Daemon rejimida terminaldan CONTROLS tugmalari (harf + Enter)
+}
+
+# ===== XIZMAT SIFATI (QoS) SOZLAMALARI =====
+QOS_SETTINGS = {
+    'enabled': False,               # Yuklama oshsa past ustuvorlikdagi kameralar birinchi bo'lib soddalashtiriladi
+    'min_cameras': 2,               # Kamida shuncha kamera ishlasa (bitta kamera hech kim bilan raqobatlashmaydi)
+    'interval': 2.0,                # Kameralar kechikishini tekshirish oralig'i (sekund)
+    'default_priority': 1,          # Kamerada 'priority' berilmasa (katta son - muhimroq)
+    'critical_priority': 2,         # Shu va undan yuqori ustuvorlikdagi kameralar hech qachon soddalashtirilmaydi
+    'target_latency_ms': 33.0,      # Kamerada 'target_latency_ms' berilmasa - kadr ishlov vaqti chegarasi
+    'headroom_ratio': 0.7,          # Barcha kameralar kechikishi chegaraning shu qismidan past bo'lsa - zaxira bor
+    'recover_intervals': 5,         # Shuncha tekshiruv ketma-ket zaxira bo'lsa bir daraja tiklanadi
+    # Darajalar (0 - to'liq sifat): stride - har nechta kadrda aniqlash, imgsz - inference o'lchami
+    # (None - model standarti), annotate - kadrga chizish, vehicle_clips - yangi avtomobil kliplari
+    'levels': [
+        {'stride': 1, 'imgsz': None, 'annotate': True, 'vehicle_clips': True},
+        {'stride': 1, 'imgsz': None, 'annotate': False, 'vehicle_clips': True},
+        {'stride': 2, 'imgsz': None, 'annotate': False, 'vehicle_clips': True},
+        {'stride': 2, 'imgsz': 480, 'annotate': False, 'vehicle_clips': False},
+        {'stride': 3, 'imgsz': 320, 'annotate': False, 'vehicle_clips': False}
+    ]
+}
+
+# ===== INFERENCE O'LCHAMI KALIBRLASH SOZLAMALARI =====
+RESOLUTION_SETTINGS = {
+    'enabled': True,                # Kamera bo'yicha eng kichik yetarli inference o'lchamini tanlash (natija keshlanadi)
+    'reference_imgsz': 1024,        # Kalibrlash vaqtidagi va eng katta o'lcham (model shu o'lchamda eksport qilingan)
+    'sizes': [320, 416, 512, 640, 768, 896, 1024],  # Nomzod o'lchamlar (32 ga karrali)
+    'min_object_px': 32,            # Kichik avtomobil model kirishida kamida shuncha piksel (qisqa tomoni)
+    'object_percentile': 5,         # "Kichik avtomobil" - polygon ichidagi qutilar qisqa tomonining shu foizili
+    'min_samples': 300,             # Shuncha quti yig'ilganda kalibrlash tugaydi
+    'max_frames': 1500,             # ... yoki shuncha aniqlash kadridan keyin
+    'min_estimate_samples': 20,     # Bundan kam quti bo'lsa o'lcham polygon geometriyasidan baholanadi
+    'vehicle_width_m': 1.6,         # Polygon bo'yicha baho: avtomobil eni (metr)
+    'prior_safety': 0.5,            # Polygon bo'yicha baho: uzoq chetdagi kichrayish uchun koeffitsient
+    'edge_margin': 2,               # Kadr chetiga shuncha pikseldan yaqin (kesilgan) qutilar hisobga olinmaydi
+    'max_age_days': 30              # Kalibrlash shuncha kundan keyin takrorlanadi
+}
+
+# ===== BO'LAKLAB ANIQLASH (TILED INFERENCE) SOZLAMALARI =====
+TILING_SETTINGS = {
+    'enabled': False,               # Kamerada 'tiled_inference' berilmasa (uzoq masofali kameralar uchun yoqiladi)
+    'tile_size': 640,               # Bo'lak o'lchami (manba piksellarida, modelga 1:1 beriladi)
+    'overlap': 0.2,                 # Qo'shni bo'laklar kamida shu qismga bir-birini yopadi
+    'region_margin': 0.15,          # Polygon chegaralari o'lchamiga nisbatan shuncha kengaytiriladi
+    'full_frame': True,             # Yaqin (katta) avtomobillar uchun butun kadr ham shu batch da (tile_size da)
+    'conf': 0.1,                    # Aniqlash ishonch chegarasi (model.track() standarti kabi past - tracker saralaydi)
+    'nms_iou': 0.5,                 # Bo'laklar orasidagi takrorlar: IoU shundan katta bo'lsa
+    'merge_ios': 0.7,               # ... yoki kichik qutining shuncha qismi kattasi ichida bo'lsa
+    'edge_margin': 2,               # Bo'lak ichki chetiga shuncha pikseldan yaqin quti - kesilgan
+    'tracker': 'botsort.yaml'       # ultralytics tracker sozlamalari (model.track() standarti)
+}
+
+# ===== KUZATISH SOZLAMALARI =====
+TRACKING_SETTINGS = {
+    'exit_debounce': 1.0            # Chiqqandan keyin shuncha sekund (video vaqti) qaytib kirmasa - o'tish yakunlanadi
+}
+
 # ===== POLYGON SOZLAMALARI =====
 POLYGON_SETTINGS = {
     'line_color': (0, 255, 0),      # Yashil rang
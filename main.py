@@ -1,5 +1,8 @@
+import argparse
 import cv2
 import numpy as np
+import signal
+import sys
 import time
 import threading
 from collections import defaultdict
@@ -9,11 +12,27 @@ from queue import Queue
 from config.settings import *
 from config.paths import Paths
 from modules.detector import VehicleDetector
+from modules.video_source import ReconnectingCapture, is_live_source
+from modules.model_pool import ModelPool
 from modules.tracker import VehicleTracker
 from modules.polygon_utils import PolygonManager
 from modules.speed_estimator import SpeedEstimator
 from modules.recorder import VideoRecorder
 from modules.ocr_reader import OCRReader
+from modules.ocr_scheduler import OCRScheduler
+from modules.passage_archive import PassageArchive
+from modules.trajectory import TrajectoryRecorder
+from modules.alerts import AlertDispatcher, AlertEngine, create_sink
+from modules.event_bus import ExitEvent, UpdateEvent
+from modules.metrics import PipelineMetrics, StageTimer
+from modules.metrics_server import MetricsServer
+from modules.control_server import ControlServer
+from modules.qos import QoSScheduler
+from modules.resolution import ResolutionCalibrator, ResolutionStore
+from modules.profiler import SamplingProfiler
+from modules.event_log import setup_logging, shutdown_logging, get_logger
+
+logger = get_logger('camera')
 
 class CameraProcessor:
     """Bitta kamera uchun alohida processor"""
@@ -23,8 +42,8 @@ class CameraProcessor:
         self.cam_config = cam_config
         self.running = False
         
-        # Har bir kamera uchun alohida YOLO detector
-        self.detector = VehicleDetector(YOLO_MODEL_PATH)
+        # Har bir kamera uchun alohida YOLO detector (yuklama testida - sintetik detektor)
+        self.detector = shared_components['detector_factory'](camera_id, cam_config)
         
         # Shared components
         self.tracker = shared_components['tracker']
@@ -32,10 +51,16 @@ class CameraProcessor:
         self.speed_estimator = shared_components['speed_estimator']
         self.recorder = shared_components['recorder']
         self.ocr_reader = shared_components['ocr_reader']
+        self.ocr_scheduler = shared_components['ocr_scheduler']
+        self.passage_archive = shared_components['passage_archive']
+        self.trajectory_recorder = shared_components['trajectory_recorder']
+        self.alert_dispatcher = shared_components['alert_dispatcher']
+        self.resolution_store = shared_components['resolution_store']
         
         # Kamera
         self.cap = None
         self.frame_count = 0
+        self.source_exhausted = False  # Video fayl oxirigacha o'qildi (aniqlashlar keshi shunda saqlanadi)
         
         # Thread-safe frame sharing
         self.current_frame = None
@@ -44,17 +69,39 @@ class CameraProcessor:
         # Recording tracking
         self._vehicle_recording_started = set()
         
-        # FPS hisoblash uchun
-        self.fps = 0.0
-        self.last_frame_time = None
+        # Processing thread identifikatori (profiler uchun)
+        self.thread_id = None
+        
+        # Oynasiz rejimda kadr ekranga uzatilmaydi
+        self.display_enabled = True
+        
+        # Aniqlashlar to'liq keshdan o'qilsa, kadr tezligi cheklanmaydi
+        self._replay_unpaced = DETECTION_CACHE_SETTINGS['replay_unpaced'] and self.detector.is_replaying_cache()
+        
+        # Bosqichlar kechikishi, FPS va navbatlar metrikalari
+        self.metrics = PipelineMetrics(camera_id)
+        self._display_consumed = True
+        
+        # Xizmat sifati darajasi (QoSScheduler o'zgartiradi; 0 - to'liq sifat)
+        self.qos_level = 0
+        self.qos = QOS_SETTINGS['levels'][0]
+        
+        # Kalibrlangan inference o'lchami (None - model standarti; QoS darajasi uni yana kichraytirishi mumkin)
+        self.resolution = None
+        self.inference_size = None
+        self._clip_track_ids = []  # Oxirgi aniqlash kadrida klipiga yozilgan avtomobillar (stride kadrlari uchun)
+        self._exit_clip_paths = {}  # {track_id: klip yo'li} - chiqish yakunlanguncha track yozuvchisi yopilishi mumkin
+        self._size_lock = threading.Lock()  # O'lchamni kamera threadi (kalibrlash) va QoS threadi o'zgartiradi
     
     def initialize_camera(self):
         """Kamerani ishga tushirish"""
         try:
-            self.cap = cv2.VideoCapture(self.cam_config['source'])
+            self.cap = ReconnectingCapture(self.cam_config['source'], self.camera_id)
             if self.cap.isOpened():
                 # Polygon yuklash
                 if self.polygon_manager.load_polygon(self.camera_id, self.cam_config['polygon_file']):
+                    self.detector.set_tile_region(self.polygon_manager.polygons[self.camera_id])
+                    self._init_resolution()
                     print(f"✓ Kamera {self.camera_id} muvaffaqiyatli ishga tushdi")
                     return True
                 else:
@@ -68,32 +115,99 @@ class CameraProcessor:
             print(f"✗ Kamera {self.camera_id} xatosi: {e}")
             return False
     
-    def process_frame(self, frame):
+    def _init_resolution(self):
+        """Saqlangan inference o'lchami yoki kalibrlashni boshlash (aniqlashlar keshi natijalari o'zgarmasligi uchun - keshsiz)"""
+        if self.resolution_store is None or self.detector.cache is not None or self.detector.tiling is not None:
+            return
+        frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if not all(frame_size):
+            return
+        self.resolution = ResolutionCalibrator(
+            self.camera_id, self.cam_config, self.polygon_manager.polygons[self.camera_id], frame_size,
+            self.resolution_store
+        )
+        self.set_inference_size(RESOLUTION_SETTINGS['reference_imgsz'] if self.resolution.active else self.resolution.size)
+    
+    @property
+    def calibrating(self):
+        """Inference o'lchami kalibrlanmoqda (QoS bu vaqtda kamerani o'zgartirmaydi)"""
+        return self.resolution is not None and self.resolution.active
+    
+    def _apply_inference_size(self):
+        """Detektor o'lchami: kalibrlangan o'lcham va QoS cheklovining kichigi (kalibrlashda - faqat reference)"""
+        with self._size_lock:
+            sizes = [size for size in (self.inference_size, None if self.calibrating else self.qos['imgsz']) if size]
+            self.detector.set_inference_size(min(sizes) if sizes else None)
+    
+    def set_inference_size(self, size):
+        """Kalibrlangan o'lchamni o'rnatish"""
+        with self._size_lock:
+            self.inference_size = size
+        self._apply_inference_size()
+    
+    def set_qos_level(self, level):
+        """QoS darajasini o'rnatish: aniqlash oralig'i, inference o'lchami, chizish va kliplar"""
+        with self._size_lock:
+            self.qos_level, self.qos = level, QOS_SETTINGS['levels'][level]
+        self._apply_inference_size()
+    
+    @property
+    def fps(self):
+        """Silliqlangan FPS (o'qish, ishlov, ko'rsatish va kutish bilan birga)"""
+        return self.metrics.fps
+    
+    def process_frame(self, frame, timer=None):
         """Kadrni qayta ishlash"""
-        # FPS hisoblash uchun vaqtni o‘lchash
-        start_time = time.time()
+        # Har bir bosqich vaqti timer.lap() orqali yig'iladi
+        if timer is None:
+            timer = StageTimer()
         
         current_time = self.frame_count / VIDEO_SETTINGS['fps']
+        qos = self.qos
+        
+        # Indekslangan klip rejimida asosiy video yagona kodlash manbai - uni avtomatik boshlash
+        if (self.cam_config['recording_active'] and self.recorder.uses_indexed_clips() and
+                not self.recorder.is_main_recording(self.camera_id)):
+            frame_height, frame_width = frame.shape[:2]
+            self.recorder.start_main_recording(self.camera_id, frame_width, frame_height, VIDEO_SETTINGS['fps'])
+            timer.lap('recording')
         
         # Polygon chizish
-        frame = self.polygon_manager.draw_polygon(frame, self.camera_id)
+        if qos['annotate']:
+            frame = self.polygon_manager.draw_polygon(frame, self.camera_id)
+            timer.lap('drawing')
         
-        # Avtomobillarni aniqlash (agar yoqilgan bo'lsa)
-        if self.cam_config['detection_active'] and self.detector.is_detection_enabled():
-            results = self.detector.detect_and_track(frame)
+        # Avtomobillarni aniqlash (agar yoqilgan bo'lsa; QoS pasaytirganda - har stride kadrda bir marta)
+        detect = self.cam_config['detection_active'] and self.detector.is_detection_enabled()
+        if detect and qos['stride'] > 1 and self.frame_count % qos['stride']:
+            detect = False
+            # Boshlangan kliplar har kadrda yoziladi (oxirgi ma'lum bbox bilan) - aks holda klip tezlashadi
+            if self.cam_config['recording_active'] and self._clip_track_ids:
+                self.recorder.repeat_vehicle_frames(self.camera_id, self._clip_track_ids, frame)
+                timer.lap('recording')
+        if detect:
+            results = self.detector.detect_and_track(frame, self.frame_count)
+            timer.lap('inference')
             vehicles = self.detector.get_vehicle_data(results)
+            timer.lap('postprocess')
             
             # Har bir avtomobil uchun
+            frame_time = time.time()
             active_ids = []
+            inside_count = 0
+            calibrating = self.calibrating
+            clip_track_ids = []
+            if self.ocr_reader.is_enabled():
+                self.ocr_scheduler.begin_frame(self.camera_id)
             for vehicle in vehicles:
                 track_id = vehicle['track_id']
                 
                 # Track ID ni tekshirish
                 if isinstance(track_id, dict):
-                    print(f"Warning: track_id is dict: {track_id}")
+                    logger.warning("Warning: track_id is dict: %s", track_id)
                     continue
                 if not isinstance(track_id, (int, str)):
-                    print(f"Warning: Invalid track_id type: {type(track_id)}, value: {track_id}")
+                    logger.warning("Warning: Invalid track_id type: %s, value: %s", type(track_id), track_id)
                     continue
                 
                 active_ids.append(track_id)
@@ -101,9 +215,14 @@ class CameraProcessor:
                 
                 # Polygon ichida/tashqarisida ekanligini tekshirish
                 is_inside = self.polygon_manager.point_in_polygon(self.camera_id, center)
+                if is_inside:
+                    inside_count += 1
+                    if calibrating:
+                        self.resolution.observe(vehicle['bbox'])
+                timer.lap('polygon')
                 
                 # Tracker da ma'lumotlarni yangilash
-                self.tracker.update_vehicle(self.camera_id, vehicle, current_time, is_inside)
+                exited = self.tracker.update_vehicle(self.camera_id, vehicle, current_time, is_inside, frame_time)
                 
                 # Tezlik hisoblash
                 vehicle_info = self.tracker.get_vehicle_info(self.camera_id, track_id)
@@ -111,12 +230,18 @@ class CameraProcessor:
                     vehicle_info, current_time, self.cam_config['polygon_length_meters']
                 )
                 
+                # Polygondan chiqdi - o'tish exit_debounce dan keyin yakunlanadi (quyida)
+                if exited:
+                    self._exit_clip_paths[track_id] = self.recorder.get_vehicle_clip_path(self.camera_id, track_id)
+                timer.lap('tracker')
+                
                 # Video yozish
                 if is_inside and self.cam_config['recording_active']:
                     frame_height, frame_width = frame.shape[:2]
                     
                     recording_key = f"{self.camera_id}_{track_id}"
-                    if recording_key not in self._vehicle_recording_started:
+                    # QoS kliplarni o'chirganda faqat boshlangan kliplar davom etadi (rasm tanlash davom etadi)
+                    if recording_key not in self._vehicle_recording_started and qos['vehicle_clips']:
                         if self.recorder.start_vehicle_recording(
                             self.camera_id, track_id, frame_width, frame_height, VIDEO_SETTINGS['fps']
                         ):
@@ -124,38 +249,66 @@ class CameraProcessor:
                     
                     # Video kadr yozish
                     self.recorder.write_vehicle_frame(self.camera_id, track_id, frame, vehicle_info)
+                    clip_track_ids.append(track_id)
+                    timer.lap('recording')
                 
-                # OCR
+                # OCR (rejalashtiruvchi orqali - faqat tanlangan kadrlarda, natija track uchun keshlanadi)
                 ocr_result = None
                 if self.ocr_reader.is_enabled():
-                    ocr_result = self.ocr_reader.process_vehicle_for_ocr(frame, vehicle)
-                    if ocr_result:
+                    ocr_result = self.ocr_scheduler.process(
+                        self.camera_id, self.frame_count, frame, vehicle, vehicle_info
+                    )
+                    timer.lap('ocr')
+                    if ocr_result and qos['annotate']:
                         frame = self.ocr_reader.draw_license_plate(frame, vehicle, ocr_result)
                 
                 # Ma'lumotlarni framega chizish
-                frame = self.tracker.draw_vehicle_info(frame, self.camera_id, track_id, speed_info)
+                if qos['annotate']:
+                    frame = self.tracker.draw_vehicle_info(frame, self.camera_id, track_id, speed_info)
+                    timer.lap('drawing')
+            
+            self._clip_track_ids = clip_track_ids
+            
+            # Polygondan to'liq o'tdi - ExitEvent (arxiv, ogohlantirishlar) obunachilarga tarqatiladi
+            for track_id in self.tracker.pop_finished_passages(self.camera_id, current_time):
+                vehicle_info = self.tracker.get_vehicle_info(self.camera_id, track_id)
+                speed_info = self.speed_estimator.get_speed_info(
+                    vehicle_info, current_time, self.cam_config['polygon_length_meters']
+                )
+                self.tracker.finish_passage(
+                    self.camera_id, track_id, speed_info['average_speed'],
+                    self._exit_clip_paths.pop(track_id, None), vehicle_info['exit_timestamp']
+                )
+            timer.lap('tracker')
+            
+            # Kalibrlash yetarli ma'lumot yig'di - keyingi kadrlardan tanlangan o'lchamda
+            if calibrating and self.resolution.end_frame():
+                self.set_inference_size(self.resolution.finish())
             
             # Aniqlanganlarni chizish
-            frame = self.detector.draw_detections(frame, vehicles, self.tracker.vehicle_tracking, self.camera_id)
+            if qos['annotate']:
+                frame = self.detector.draw_detections(frame, vehicles, self.tracker.vehicle_tracking, self.camera_id)
+                timer.lap('drawing')
             
             # Eski avtomobillarni tozalash
-            self.tracker.cleanup_old_vehicles(self.camera_id, current_time)
+            self.tracker.cleanup_old_vehicles(self.camera_id, current_time, timestamp=frame_time)
+            timer.lap('tracker')
             self.recorder.cleanup_vehicle_recordings(self.camera_id, active_ids)
+            timer.lap('recording')
+            self.ocr_scheduler.cleanup(self.camera_id, self.tracker.get_all_vehicles(self.camera_id).keys())
+            timer.lap('ocr')
+            self.metrics.set_gauge('active_tracks', len(active_ids))
+            self.metrics.set_gauge('vehicles_in_polygon', inside_count)
         
         # Status chizish
-        self._draw_status(frame)
+        if qos['annotate']:
+            self._draw_status(frame)
+            timer.lap('drawing')
         
         # Asosiy videoga yozish
         if self.cam_config['recording_active']:
             self.recorder.write_main_frame(self.camera_id, frame)
-        
-        # FPS ni hisoblash
-        end_time = time.time()
-        frame_time = end_time - start_time
-        if frame_time > 0:
-            self.fps = 1.0 / frame_time
-        else:
-            self.fps = 0.0
+            timer.lap('recording')
         
         return frame
     
@@ -194,44 +347,83 @@ class CameraProcessor:
             return
         
         self.running = True
+        self.thread_id = threading.get_ident()
         print(f"Kamera {self.camera_id} processing thread boshlandi")
+        last_report = time.time()
         
         while self.running:
             try:
+                timer = StageTimer()
                 success, frame = self.cap.read()
+                timer.lap('decode')
                 if not success:
+                    if not self.cap.exhausted:
+                        # Jonli manba qayta ulanmoqda - tracker va yozuvchilar holati saqlanadi
+                        continue
+                    self.source_exhausted = True
+                    self.metrics.increment('dropped_frames')
                     print(f"Kamera {self.camera_id} da kadr o'qilmadi")
                     break
                 
                 # Kadrni qayta ishlash
-                processed_frame = self.process_frame(frame)
+                processed_frame = self.process_frame(frame, timer)
                 
-                # Ekranda ko'rsatish uchun kichraytirish
-                if VIDEO_SETTINGS['resize_display']:
-                    h, w = processed_frame.shape[:2]
-                    new_w = int(w * VIDEO_SETTINGS['resize_factor'])
-                    new_h = int(h * VIDEO_SETTINGS['resize_factor'])
-                    processed_frame = cv2.resize(processed_frame, (new_w, new_h))
-                
-                # Thread-safe frame saqlash
-                with self.frame_lock:
-                    self.current_frame = processed_frame.copy()
+                if self.display_enabled:
+                    # Ekranda ko'rsatish uchun kichraytirish
+                    if VIDEO_SETTINGS['resize_display']:
+                        h, w = processed_frame.shape[:2]
+                        new_w = int(w * VIDEO_SETTINGS['resize_factor'])
+                        new_h = int(h * VIDEO_SETTINGS['resize_factor'])
+                        processed_frame = cv2.resize(processed_frame, (new_w, new_h))
+                    
+                    # Thread-safe frame saqlash
+                    with self.frame_lock:
+                        # Ekran oldingi kadrni olib ulgurmagan bo'lsa - u ko'rsatilmay qoldi
+                        if not self._display_consumed:
+                            self.metrics.increment('display_frames_skipped')
+                        self.current_frame = processed_frame.copy()
+                        self._display_consumed = False
+                    timer.lap('display')
                 
                 self.frame_count += 1
+                timer.totals['total'] = timer.last - timer.start
+                self.metrics.record_frame(timer)
+                self._update_queue_gauges()
+                self.metrics.mark_frame()
                 
-                # FPS limit (CPU yukini kamaytirish uchun)
-                time.sleep(1/30)  # ~30 FPS
+                # Bosqichlar hisobotini vaqti-vaqti bilan chiqarish
+                if METRICS_SETTINGS['log_interval'] and time.time() - last_report >= METRICS_SETTINGS['log_interval']:
+                    last_report = time.time()
+                    logger.info("%s", self.metrics.format_summary())
                 
+                # FPS limit (CPU yukini kamaytirish uchun) - faqat kadr vaqtidan qolgan qismi kutiladi
+                if VIDEO_SETTINGS['max_processing_fps'] and not self._replay_unpaced:
+                    remaining = 1.0 / VIDEO_SETTINGS['max_processing_fps'] - (time.perf_counter() - timer.start)
+                    if remaining > 0:
+                        time.sleep(remaining)
+            
             except Exception as e:
                 print(f"Kamera {self.camera_id} processing xatosi: {e}")
                 break
         
         self.cleanup()
     
+    def _update_queue_gauges(self):
+        """Fon navbatlari chuqurligini metrikalarga yozish"""
+        for name, depth in self.recorder.get_queue_depths().items():
+            self.metrics.set_gauge(name, depth)
+        self.metrics.set_gauge('ocr_pending', self.ocr_reader.get_queue_depth())
+        self.metrics.set_gauge('archive_pending', self.passage_archive.get_queue_depth())
+        if self.alert_dispatcher is not None:
+            self.metrics.set_gauge('alert_pending', self.alert_dispatcher.get_queue_depth())
+        self.metrics.set_gauge('vehicle_recordings', len(self.recorder.vehicle_recorders.get(self.camera_id, ())))
+        self.metrics.set_gauge('vehicles_counted', self.tracker.get_passage_count(self.camera_id))
+    
     def get_current_frame(self):
         """Joriy kadrni thread-safe olish"""
         with self.frame_lock:
             if self.current_frame is not None:
+                self._display_consumed = True
                 return self.current_frame.copy()
         return None
     
@@ -243,13 +435,17 @@ class CameraProcessor:
         """Resurslarni tozalash"""
         if self.cap:
             self.cap.release()
+        self.detector.close_cache(self.source_exhausted)
+        self.trajectory_recorder.flush(self.camera_id)
         print(f"Kamera {self.camera_id} tozalandi")
 
 class RailSafeAI:
     """Asosiy RailSafeAI tizimi - ko'p thread li"""
     
-    def __init__(self):
+    def __init__(self, cameras=None, detector_factory=None):
+        """cameras - CAMERAS o'rniga kameralar ro'yxati, detector_factory(camera_id, cam_config) - detektor yaratish"""
         print("RailSafeAI tizimi ishga tushmoqda...")
+        setup_logging()
         
         # Shared components
         self.tracker = VehicleTracker()
@@ -257,37 +453,221 @@ class RailSafeAI:
         self.speed_estimator = SpeedEstimator()
         self.recorder = VideoRecorder()
         self.ocr_reader = OCRReader()
+        self.ocr_scheduler = OCRScheduler(self.ocr_reader)
+        self.passage_archive = PassageArchive()
+        self.trajectory_recorder = TrajectoryRecorder()
+        self.alert_dispatcher = AlertDispatcher(create_sink()) if ALERT_SETTINGS['enabled'] else None
+        self.alert_engine = AlertEngine(cameras if cameras is not None else CAMERAS, self.alert_dispatcher)
+        self._subscribe_consumers()
+        self.started_at = time.time()
+        
+        # Yangi kameralar tayyor modelni oladi (faqat standart YOLO detektori uchun)
+        self.model_pool = None
+        if detector_factory is None and MODEL_POOL_SETTINGS['enabled']:
+            self.model_pool = ModelPool(Paths.get_model_path(YOLO_MODEL_PATH))
         
-        shared_components = {
+        self.shared_components = {
             'tracker': self.tracker,
             'polygon_manager': self.polygon_manager,
             'speed_estimator': self.speed_estimator,
             'recorder': self.recorder,
-            'ocr_reader': self.ocr_reader
+            'ocr_reader': self.ocr_reader,
+            'ocr_scheduler': self.ocr_scheduler,
+            'passage_archive': self.passage_archive,
+            'trajectory_recorder': self.trajectory_recorder,
+            'alert_dispatcher': self.alert_dispatcher,
+            'resolution_store': ResolutionStore(Paths.RESOLUTION_FILE) if RESOLUTION_SETTINGS['enabled'] else None,
+            'detector_factory': detector_factory or self._create_detector
         }
         
-        # Har bir kamera uchun alohida processor
+        # Har bir kamera uchun alohida processor (ish vaqtida qo'shiladi/olib tashlanadi)
         self.camera_processors = {}
         self.camera_threads = {}
+        self.camera_restarts = {}  # {camera_id: {'attempts', 'next_time', 'started_at', 'total'}}
         
         # Asosiy holatlar
         self.running = True
+        self.started = False
+        self.headless = False
+        self.daemon = False
+        self.shutdown_event = threading.Event()
+        self.control_lock = threading.RLock()
+        self.metrics_server = None
+        self.control_server = None
+        self.qos_scheduler = QoSScheduler(self) if QOS_SETTINGS['enabled'] else None
+        self.profiler = SamplingProfiler()
         
         # Kameralarni ishga tushirish
-        self._initialize_cameras(shared_components)
+        self._initialize_cameras(cameras if cameras is not None else CAMERAS)
         
         print("RailSafeAI tizimi tayyor!")
         self._print_controls()
     
-    def _initialize_cameras(self, shared_components):
+    def _subscribe_consumers(self):
+        """Tracker hodisalari iste'molchilari (kamera threadi ularni kutmaydi)"""
+        events = self.tracker.events
+        if self.passage_archive.enabled:
+            # Faqat navbatga qo'yadi - sinxron yo'l yetarli
+            events.subscribe(ExitEvent, self.passage_archive.on_exit)
+        if self.trajectory_recorder.enabled:
+            # Kamera buferiga yozish kamera threadida bo'lishi kerak
+            events.subscribe(UpdateEvent, self.trajectory_recorder.on_update)
+        if self.alert_dispatcher is not None:
+            events.subscribe(ExitEvent, self.alert_engine.on_exit, mode='async', name='alerts',
+                             queue_size=ALERT_SETTINGS['queue_size'])
+    
+    def _create_detector(self, camera_id, cam_config):
+        """Standart detektor - YOLO modeli bilan"""
+        return VehicleDetector(YOLO_MODEL_PATH, source=cam_config['source'], model_pool=self.model_pool,
+                               tiling=cam_config['tiled_inference'])
+    
+    def _initialize_cameras(self, cameras):
         """Kameralarni ishga tushirish"""
-        for cam_config in CAMERAS:
+        for cam_config in cameras:
             if not cam_config['enabled']:
                 continue
-            
-            camera_id = cam_config['id']
-            processor = CameraProcessor(camera_id, cam_config, shared_components)
+            self.add_camera(cam_config)
+    
+    @staticmethod
+    def _validate_camera_config(cam_config):
+        """Qiymat turlari (boshqaruv API dagi JSON) - xato tur kamera threadini yoki QoS ni to'xtatmasin"""
+        def is_number(value):
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        
+        errors = []
+        if not isinstance(cam_config['id'], (str, int)) or isinstance(cam_config['id'], bool):
+            errors.append("id - satr yoki butun son")
+        if not is_number(cam_config['polygon_length_meters']) or cam_config['polygon_length_meters'] <= 0:
+            errors.append("polygon_length_meters - musbat son")
+        if not isinstance(cam_config['priority'], int) or isinstance(cam_config['priority'], bool):
+            errors.append("priority - butun son")
+        if not is_number(cam_config['target_latency_ms']) or cam_config['target_latency_ms'] <= 0:
+            errors.append("target_latency_ms - musbat son")
+        speed_limits = cam_config.get('speed_limits', {})
+        if not isinstance(speed_limits, dict) or \
+                not all(isinstance(name, str) and is_number(limit) for name, limit in speed_limits.items()):
+            errors.append("speed_limits - {klass nomi: km/h} obyekt")
+        if not isinstance(cam_config['tiled_inference'], bool):
+            errors.append("tiled_inference - true/false")
+        if errors:
+            raise ValueError(f"Kamera sozlamasida noto'g'ri qiymat: {', '.join(errors)}")
+    
+    def add_camera(self, cam_config):
+        """Kamera qo'shish (tizim ishlayotgan bo'lsa threadi darhol boshlanadi)"""
+        missing = [key for key in ('id', 'source', 'polygon_file', 'polygon_length_meters') if key not in cam_config]
+        if missing:
+            raise ValueError(f"Kamera sozlamasida yo'q: {', '.join(missing)}")
+        cam_config = dict(cam_config)
+        cam_config.setdefault('enabled', True)
+        cam_config.setdefault('detection_active', AUTO_DETECTION_ENABLED)
+        cam_config.setdefault('recording_active', RECORDING_ENABLED)
+        cam_config.setdefault('position', (0, 0))
+        cam_config.setdefault('priority', QOS_SETTINGS['default_priority'])
+        cam_config.setdefault('target_latency_ms', QOS_SETTINGS['target_latency_ms'])
+        cam_config.setdefault('tiled_inference', TILING_SETTINGS['enabled'])
+        self._validate_camera_config(cam_config)
+        # Boshqaruv API marshrutlari, fayl nomlari va retention kamera ID sini satr sifatida solishtiradi
+        cam_config['id'] = camera_id = str(cam_config['id'])
+        with self.control_lock:
+            if camera_id in self.camera_processors:
+                raise ValueError(f"Kamera allaqachon mavjud: {camera_id}")
+            processor = CameraProcessor(camera_id, cam_config, self.shared_components)
+            self.alert_engine.set_camera_limits(cam_config)
             self.camera_processors[camera_id] = processor
+            if self.started:
+                self._start_camera(camera_id)
+        return processor
+    
+    def remove_camera(self, camera_id, timeout=5.0):
+        """Kamerani to'xtatib olib tashlash (yozuvlari yakunlanadi, modeli zaxiraga qaytadi)"""
+        with self.control_lock:
+            processor = self._select_processors(camera_id)[camera_id]
+            processor.stop()
+            thread = self.camera_threads.pop(camera_id, None)
+            if thread is not None:
+                thread.join(timeout=timeout)
+            del self.camera_processors[camera_id]
+            self.camera_restarts.pop(camera_id, None)
+            
+            self.recorder.stop_camera_recordings(camera_id)
+            self.tracker.reset_camera(camera_id)
+            self.ocr_scheduler.cleanup(camera_id, ())
+            # Thread kadr o'qishda qotib qolgan bo'lsa model unga qoladi
+            if thread is None or not thread.is_alive():
+                processor.detector.release_model()
+        print(f"Kamera {camera_id} olib tashlandi")
+        return processor.cam_config
+    
+    def restart_camera(self, camera_id):
+        """Kamerani yangi processor va tayyor model bilan qayta ishga tushirish"""
+        with self.control_lock:
+            previous = self.camera_restarts.get(camera_id)
+            cam_config = self.remove_camera(camera_id)
+            self.add_camera(cam_config)
+            state = self.camera_restarts.get(camera_id)
+            if previous is not None and state is not None:
+                # Urinishlar hisobi saqlanadi (kechikish ortib borishi uchun)
+                state['attempts'], state['total'] = previous['attempts'], previous['total']
+        return self.camera_processors[camera_id]
+    
+    def _start_camera(self, camera_id):
+        """Kamera processing threadini boshlash"""
+        processor = self.camera_processors[camera_id]
+        processor.display_enabled = not self.headless
+        thread = threading.Thread(target=processor.run_processing, name=f"camera-{camera_id}", daemon=True)
+        thread.start()
+        self.camera_threads[camera_id] = thread
+        state = self.camera_restarts.setdefault(camera_id, {'attempts': 0, 'next_time': None, 'total': 0})
+        state['started_at'] = time.time()
+    
+    def _should_restart(self, processor):
+        """Thread tugagan kamerani qayta ishga tushirish kerakmi (restart_policy bo'yicha)"""
+        policy = SUPERVISOR_SETTINGS['restart_policy']
+        if policy == 'never':
+            return False
+        if policy == 'live':
+            # Video fayl oxirigacha o'qildi - bu nosozlik emas
+            return is_live_source(processor.cam_config['source'])
+        return True
+    
+    def _run_supervisor(self):
+        """Kamera threadlarini kuzatish: to'xtab qolgan jonli kamerani kechikish bilan qayta ishga tushirish"""
+        while not self.shutdown_event.wait(SUPERVISOR_SETTINGS['check_interval']):
+            now = time.time()
+            for camera_id, thread in list(self.camera_threads.items()):
+                processor = self.camera_processors.get(camera_id)
+                state = self.camera_restarts.get(camera_id)
+                if processor is None or state is None:
+                    continue
+                if thread.is_alive():
+                    if state['attempts'] and now - state['started_at'] >= SUPERVISOR_SETTINGS['stable_seconds']:
+                        state['attempts'] = 0
+                    continue
+                if not self._should_restart(processor):
+                    continue
+                
+                if state['next_time'] is None:
+                    delay = min(SUPERVISOR_SETTINGS['restart_backoff'] * 2 ** state['attempts'],
+                                SUPERVISOR_SETTINGS['restart_backoff_max'])
+                    state['next_time'] = now + delay
+                    logger.warning("Kamera %s to'xtadi - %.1f s dan keyin qayta ishga tushiriladi", camera_id, delay,
+                                   extra={'event': 'camera_down', 'camera_id': camera_id})
+                elif now >= state['next_time'] and self.running:
+                    state['attempts'] += 1
+                    state['total'] += 1
+                    state['next_time'] = None
+                    try:
+                        self.restart_camera(camera_id)
+                    except Exception as e:
+                        logger.error("Xato kamera %s ni qayta ishga tushirishda: %s", camera_id, e)
+    
+    def _has_active_cameras(self):
+        """Ishlayotgan yoki qayta ishga tushirilishini kutayotgan kamera bormi"""
+        for camera_id, thread in list(self.camera_threads.items()):
+            state = self.camera_restarts.get(camera_id)
+            if thread.is_alive() or (state is not None and state['next_time'] is not None):
+                return True
+        return False
     
     def _print_controls(self):
         """Boshqaruv tugmalarini ko'rsatish"""
@@ -297,6 +677,7 @@ class RailSafeAI:
         print(f"  {CONTROLS['stop_detection'].upper()} - Avtomobil aniqlashni TO'XTATISH")
         print(f"  {CONTROLS['start_recording'].upper()} - Video yozishni BOSHLASH")
         print(f"  {CONTROLS['stop_recording'].upper()} - Video yozishni TO'XTATISH")
+        print(f"  {CONTROLS['toggle_profiling'].upper()} - Profilingni BOSHLASH/TO'XTATISH")
         print(f"  {CONTROLS['exit'].upper()} - Dasturdan CHIQISH")
         print("="*50 + "\n")
     
@@ -305,48 +686,152 @@ class RailSafeAI:
         key_char = chr(key).lower()
         
         if key_char == CONTROLS['exit']:
-            self.running = False
+            self.request_shutdown()
             print("Dastur to'xtatilmoqda...")
         
         elif key_char == CONTROLS['start_detection']:
-            # Barcha kameralar uchun aniqlashni yoqish
-            for processor in self.camera_processors.values():
-                processor.cam_config['detection_active'] = True
-                processor.detector.set_detection_enabled(True)
+            self.set_detection(True)
             print("✓ Barcha kameralar uchun ANIQLASH yoqildi")
         
         elif key_char == CONTROLS['stop_detection']:
-            # Barcha kameralar uchun aniqlashni o'chirish
-            for processor in self.camera_processors.values():
-                processor.cam_config['detection_active'] = False
-                processor.detector.set_detection_enabled(False)
+            self.set_detection(False)
             print("✗ Barcha kameralar uchun ANIQLASH o'chirildi")
         
         elif key_char == CONTROLS['start_recording']:
-            # Barcha kameralar uchun yozishni yoqish
-            for processor in self.camera_processors.values():
-                processor.cam_config['recording_active'] = True
-                # Asosiy video yozishni boshlash
-                if processor.cap and processor.cap.isOpened():
+            self.set_recording(True)
+            print("✓ Barcha kameralar uchun YOZISH yoqildi")
+        
+        elif key_char == CONTROLS['stop_recording']:
+            self.set_recording(False)
+            print("✗ Barcha kameralar uchun YOZISH o'chirildi")
+        
+        elif key_char == CONTROLS['toggle_profiling']:
+            self.toggle_profiling()
+    
+    def _select_processors(self, camera_id=None):
+        """Boshqariladigan kameralar (camera_id=None - barchasi)"""
+        if camera_id is None:
+            return dict(self.camera_processors)
+        if camera_id not in self.camera_processors:
+            raise KeyError(f"Kamera topilmadi: {camera_id}")
+        return {camera_id: self.camera_processors[camera_id]}
+    
+    def set_detection(self, enabled, camera_id=None):
+        """Aniqlashni yoqish/o'chirish (camera_id=None - barcha kameralar); o'zgargan kameralar ro'yxati"""
+        with self.control_lock:
+            processors = self._select_processors(camera_id)
+            for processor in processors.values():
+                processor.cam_config['detection_active'] = enabled
+                processor.detector.set_detection_enabled(enabled)
+        return list(processors)
+    
+    def set_recording(self, enabled, camera_id=None):
+        """Video yozishni yoqish/o'chirish (camera_id=None - barcha kameralar); o'zgargan kameralar ro'yxati"""
+        with self.control_lock:
+            processors = self._select_processors(camera_id)
+            if enabled:
+                self.recorder.set_recording_enabled(True)
+            
+            for processor in processors.values():
+                processor.cam_config['recording_active'] = enabled
+                if not enabled:
+                    self.recorder.stop_camera_recordings(processor.camera_id)
+                elif processor.cap and processor.cap.isOpened():
+                    # Asosiy video yozishni boshlash
                     frame_width = int(processor.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                     frame_height = int(processor.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
                     fps = processor.cap.get(cv2.CAP_PROP_FPS) or VIDEO_SETTINGS['fps']
                     self.recorder.start_main_recording(processor.camera_id, frame_width, frame_height, fps)
             
-            self.recorder.set_recording_enabled(True)
-            print("✓ Barcha kameralar uchun YOZISH yoqildi")
+            # Hech bir kamera yozmayotgan bo'lsa - umumiy yozish ham o'chiriladi
+            if not enabled and not any(p.cam_config['recording_active'] for p in self.camera_processors.values()):
+                self.recorder.set_recording_enabled(False)
+        return list(processors)
+    
+    def get_status(self, camera_id=None):
+        """Tizim yoki bitta kamera holati (boshqaruv API uchun)"""
+        cameras = {}
+        for cam_id, processor in self._select_processors(camera_id).items():
+            thread = self.camera_threads.get(cam_id)
+            cameras[cam_id] = {
+                'running': processor.running and thread is not None and thread.is_alive(),
+                'detection': processor.cam_config['detection_active'] and processor.detector.is_detection_enabled(),
+                'recording': processor.cam_config['recording_active'] and self.recorder.is_recording_enabled(),
+                'main_recording': self.recorder.is_main_recording(cam_id),
+                'frames': processor.frame_count,
+                'fps': round(processor.fps, 2),
+                'passages': self.tracker.get_passage_count(cam_id),
+                'source_exhausted': processor.source_exhausted,
+                'source': processor.cap.get_stats() if processor.cap is not None else None,
+                'restarts': self.camera_restarts.get(cam_id, {}).get('total', 0),
+                'inference_size': processor.detector.track_args.get('imgsz'),
+                'tiles': processor.detector.get_tile_count(),
+                'calibrating_resolution': processor.calibrating,
+                'qos': {
+                    'level': processor.qos_level,
+                    'priority': processor.cam_config['priority'],
+                    'target_latency_ms': processor.cam_config['target_latency_ms'],
+                    'latency_ms': self.qos_scheduler.get_latency_ms(cam_id) if self.qos_scheduler else None
+                }
+            }
         
-        elif key_char == CONTROLS['stop_recording']:
-            # Barcha kameralar uchun yozishni o'chirish
-            for processor in self.camera_processors.values():
-                processor.cam_config['recording_active'] = False
-                self.recorder.stop_main_recording(processor.camera_id)
-            
-            self.recorder.set_recording_enabled(False)
-            print("✗ Barcha kameralar uchun YOZISH o'chirildi")
+        if camera_id is not None:
+            return cameras[camera_id]
+        return {
+            'uptime': round(time.time() - self.started_at, 1),
+            'mode': 'daemon' if self.daemon else ('headless' if self.headless else 'display'),
+            'profiling': self.profiler.is_running(),
+            'cameras': cameras
+        }
+    
+    def request_shutdown(self):
+        """Tizimni to'xtatish (istalgan threaddan yoki signal ishlovchisidan)"""
+        self.running = False
+        self.shutdown_event.set()
+    
+    def start_profiling(self, camera_id=None):
+        """Profilingni boshlash (camera_id=None - barcha kameralar); noma'lum kamera - KeyError"""
+        processors = self.camera_processors
+        if camera_id is not None:
+            processors = {camera_id: processors[camera_id]}
+        return self.profiler.start({cam: processor.thread_id for cam, processor in processors.items()})
+    
+    def stop_profiling(self):
+        """Profilingni to'xtatish (ishlamayotgan bo'lsa hech narsa qilmaydi)"""
+        self.profiler.stop()
+        return False
     
-    def run(self):
-        """Asosiy ishga tushirish sikli"""
+    def toggle_profiling(self):
+        """Profilingni yoqish/o'chirish (klaviatura va signal uchun - barcha kameralar)"""
+        if self.profiler.is_running():
+            return self.stop_profiling()
+        return self.start_profiling()
+    
+    def _install_signal_handlers(self):
+        """Signal orqali profilingni boshqarish (masalan, kill -USR1 <pid>); daemon rejimida SIGTERM/SIGINT - to'xtatish"""
+        signal_name = PROFILER_SETTINGS['signal']
+        if signal_name and hasattr(signal, signal_name):
+            # Ishlovchi faqat belgi qo'yadi: to'xtatish hisobotni yozadi (asosiy thread muzlaydi), profiler
+            # qulfi band paytida kelgan signal esa o'zaro bloklanishga olib keladi
+            toggle_requested = threading.Event()
+            threading.Thread(target=self._run_profiling_toggles, args=(toggle_requested,),
+                             name='profiling-signal', daemon=True).start()
+            signal.signal(getattr(signal, signal_name), lambda signum, frame: toggle_requested.set())
+        if self.daemon:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda signum, frame: self.request_shutdown())
+    
+    def _run_profiling_toggles(self, toggle_requested):
+        """Signal so'ragan profiling yoqish/o'chirishni alohida threadda bajarish"""
+        while not self.shutdown_event.is_set():
+            if toggle_requested.wait(1.0):
+                toggle_requested.clear()
+                self.toggle_profiling()
+    
+    def run(self, headless=False, daemon=False):
+        """Asosiy ishga tushirish sikli (headless=True - oynalarsiz, daemon=True - oynalarsiz, boshqaruv API orqali)"""
+        self.daemon = daemon
+        self.headless = headless or daemon
         if not self.camera_processors:
             print("Hech qanday kamera topilmadi. Dastur to'xtatildi.")
             return
@@ -354,13 +839,53 @@ class RailSafeAI:
         print("Tizim ishga tushdi! Video oynalarini yoping...")
         
         # Har bir kamera uchun alohida thread boshlash
-        for camera_id, processor in self.camera_processors.items():
-            thread = threading.Thread(target=processor.run_processing, daemon=True)
-            thread.start()
-            self.camera_threads[camera_id] = thread
+        with self.control_lock:
+            self.started = True
+            for camera_id in list(self.camera_processors):
+                self._start_camera(camera_id)
+        threading.Thread(target=self._run_supervisor, name='camera-supervisor', daemon=True).start()
+        if self.qos_scheduler is not None:
+            self.qos_scheduler.start()
+        
+        self._install_signal_handlers()
+        
+        # Headless monitoring uchun /metrics va /health
+        if METRICS_SETTINGS['http_enabled']:
+            self.metrics_server = MetricsServer(self)
+            if not self.metrics_server.start():
+                self.metrics_server = None
+        
+        # Kamera bo'yicha boshqaruv (daemon rejimida tugmalar o'rniga)
+        if daemon or CONTROL_SETTINGS['enabled']:
+            self.control_server = ControlServer(self)
+            if not self.control_server.start():
+                self.control_server = None
+        if daemon and CONTROL_SETTINGS['stdin_keys'] and sys.stdin is not None and sys.stdin.isatty():
+            threading.Thread(target=self._read_stdin_keys, name='stdin-keys', daemon=True).start()
         
         # UI thread - oynalarni ko'rsatish
-        self._run_display_loop()
+        if self.headless:
+            self._run_headless_loop()
+        else:
+            self._run_display_loop()
+    
+    def _run_headless_loop(self):
+        """Oynasiz rejim - kamera threadlari tugaguncha yoki to'xtatilguncha kutish (asosiy thread uxlaydi)
+        
+        Daemon rejimida kameralar API orqali qo'shilishi mumkin - faqat to'xtatish buyrug'i kutiladi.
+        """
+        while self.running and (self.daemon or self._has_active_cameras()):
+            self.shutdown_event.wait(1.0)
+        
+        self.cleanup()
+    
+    def _read_stdin_keys(self):
+        """Terminal orqali CONTROLS tugmalari (daemon rejimi uchun ixtiyoriy; harf + Enter)"""
+        for line in sys.stdin:
+            for key_char in line.strip():
+                self.handle_key_press(ord(key_char))
+            if not self.running:
+                break
     
     def _run_display_loop(self):
         """Display loop - asosiy thread"""
@@ -368,8 +893,13 @@ class RailSafeAI:
         x_offset = 0
         
         while self.running:
+            # Olib tashlangan kameralar oynalarini yopish
+            for camera_id in [cam for cam in window_positions if cam not in self.camera_processors]:
+                cv2.destroyWindow(f"RailSafeAI - Kamera {camera_id}")
+                del window_positions[camera_id]
+            
             # Har bir kameradan frame olish
-            for camera_id, processor in self.camera_processors.items():
+            for camera_id, processor in list(self.camera_processors.items()):
                 frame = processor.get_current_frame()
                 if frame is not None:
                     window_name = f"RailSafeAI - Kamera {camera_id}"
@@ -398,24 +928,46 @@ class RailSafeAI:
         """Resurslarni tozalash"""
         print("Resurslar tozalanmoqda...")
         
+        # Ishlayotgan profilingni yakunlash (hisobot yoziladi)
+        if self.profiler.is_running():
+            self.profiler.stop()
+        
+        # Nazoratchi kameralarni qayta ishga tushirmasligi uchun
+        self.shutdown_event.set()
+        
         # Barcha processor threadlarini to'xtatish
-        for processor in self.camera_processors.values():
+        for processor in list(self.camera_processors.values()):
             processor.stop()
         
         # Thread larni kutish
-        for thread in self.camera_threads.values():
+        for thread in list(self.camera_threads.values()):
             thread.join(timeout=2.0)
         
-        # Barcha yozishni to'xtatish
-        self.recorder.stop_all_recordings()
+        # Barcha yozishni to'xtatish va fon ishlarini kutish (hodisalar shinasi - arxivdan oldin: async
+        # obunachilar navbatidagi hodisalar ham yetib boradi)
+        self.recorder.shutdown()
+        self.ocr_reader.stop()
+        self.tracker.events.stop()
+        self.passage_archive.stop()
+        self.trajectory_recorder.stop()
+        if self.model_pool is not None:
+            self.model_pool.stop()
+        if self.alert_dispatcher is not None:
+            self.alert_dispatcher.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
         
         # Oynalarni yopish
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
         
         # Statistikani ko'rsatish
         self.print_final_statistics()
         
         print("RailSafeAI to'xtatildi!")
+        shutdown_logging()
     
     def print_final_statistics(self):
         """Yakuniy statistikani chop etish"""
@@ -425,31 +977,49 @@ class RailSafeAI:
         
         for camera_id in self.camera_processors.keys():
             print(f"\nKamera {camera_id}:")
-            stats = self.tracker.get_statistics(camera_id)
+            vehicles_data = self._get_session_passages(camera_id)
             
-            if stats['vehicles_data']:
-                print(f"  Jami avtomobillar: {stats['completed_vehicles']}")
+            if vehicles_data:
+                print(f"  Jami avtomobillar: {len(vehicles_data)}")
                 print("  ID | Turi    | Vaqt(s) | Tezlik(km/h)")
                 print("  " + "-"*40)
                 
-                for vehicle_data in stats['vehicles_data']:
+                for vehicle_data in vehicles_data:
                     print(f"  {vehicle_data['id']:2d} | {vehicle_data['class']:8s} | "
                           f"{vehicle_data['time']:6.2f}s | {vehicle_data['speed']:8.1f}km/h")
             else:
                 print("  Hech qanday avtomobil aniqlanmadi")
+            
+            # Bosqichlar kechikishi (p50/p95/p99)
+            print(self.camera_processors[camera_id].metrics.format_summary())
         
         print("="*60)
+    
+    def _get_session_passages(self, camera_id):
+        """Shu ishga tushirishdagi o'tishlar - arxivdan (xotiradan tozalanganlari ham), arxiv o'chiq bo'lsa trackerdan"""
+        if not self.passage_archive.enabled:
+            return self.tracker.get_statistics(camera_id)['vehicles_data']
+        
+        passages = self.passage_archive.get_passages(camera_id, since=self.started_at)
+        return [{'id': passage['track_id'], 'class': passage['class_name'] or '-',
+                 'time': passage['duration'], 'speed': passage['speed'] or 0.0}
+                for passage in reversed(passages)]
 
 def main():
-    """Asosiy funktsiya"""
+    """Asosiy funktsiya (--daemon - oynalarsiz, boshqaruv API orqali; --headless - oynalarsiz)"""
+    parser = argparse.ArgumentParser(description="RailSafeAI")
+    parser.add_argument('--daemon', action='store_true', help="Oynalarsiz, boshqaruv API bilan (serverlar uchun)")
+    parser.add_argument('--headless', action='store_true', help="Oynalarsiz (kameralar tugaguncha)")
+    args = parser.parse_args()
+    
     try:
         # Papkalarni yaratish
         Paths.create_directories()
         
         # RailSafeAI tizimini ishga tushirish
         system = RailSafeAI()
-        system.run()
-        
+        system.run(headless=args.headless, daemon=args.daemon)
+    
     except KeyboardInterrupt:
         print("\nDastur foydalanuvchi tomonidan to'xtatildi")
     except Exception as e:
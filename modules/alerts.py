@@ -0,0 +1,258 @@
+"""
+RailSafeAI - Tezlik buzilishi ogohlantirishlari va ularni asinxron yuborish moduli
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from time import time
+from urllib.parse import urlsplit
+from config.settings import ALERT_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('alerts')
+
+class WebhookSink:
+    """Mahalliy HTTP webhook: paket JSON massiv sifatida POST qilinadi (faqat http://)"""
+    
+    def __init__(self, url, timeout=None):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise ValueError(f"Faqat http:// webhook qo'llab-quvvatlanadi: {url}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.timeout = timeout or ALERT_SETTINGS['timeout']
+    
+    async def send(self, alerts):
+        body = json.dumps(alerts).encode('utf-8')
+        request = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                   f"Connection: close\r\n\r\n").encode('ascii') + body
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            writer.write(request)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+        finally:
+            writer.close()
+        status = int(status_line.split()[1]) if len(status_line.split()) > 1 else 0
+        if not 200 <= status < 300:
+            raise ConnectionError(f"Webhook javobi {status}")
+
+class FileSink:
+    """JSON-lines fayl (har qatorda bitta ogohlantirish)"""
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Paths.OUTPUTS_DIR, ALERT_SETTINGS['file_name'])
+    
+    async def send(self, alerts):
+        await asyncio.to_thread(self._write, alerts)
+    
+    def _write(self, alerts):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+class MemorySink:
+    """Xotiradagi qabul qiluvchi (sinov va yuklama testlari uchun; fail=True - ishlamay turgan server)"""
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+    
+    async def send(self, alerts):
+        if self.fail:
+            raise ConnectionError("Qabul qiluvchi ishlamayapti")
+        self.batches.append(list(alerts))
+
+def create_sink(kind=None):
+    """ALERT_SETTINGS['sink'] bo'yicha qabul qiluvchi"""
+    kind = kind or ALERT_SETTINGS['sink']
+    if kind == 'webhook':
+        return WebhookSink(ALERT_SETTINGS['webhook_url'])
+    if kind == 'file':
+        return FileSink()
+    if kind == 'memory':
+        return MemorySink()
+    raise ValueError(f"Noma'lum ogohlantirish qabul qiluvchisi: {kind}")
+
+class AlertDispatcher:
+    """Alohida threaddagi asyncio sikli: cheklangan navbat, paketlash va qayta urinishlar
+    
+    Kamera threadi faqat call_soon_threadsafe() chaqiradi - qabul qiluvchi ishlamasa ham kutmaydi;
+    navbat to'lsa eng eski ogohlantirish tashlanadi.
+    """
+    
+    def __init__(self, sink):
+        self.sink = sink
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'retries': 0}
+        self.loop = asyncio.new_event_loop()
+        self.queue = None
+        self._ready = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue(maxsize=ALERT_SETTINGS['queue_size'])
+        self._worker = self.loop.create_task(self._deliver())
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+    
+    def submit(self, alert):
+        """Ogohlantirishni navbatga qo'yish (istalgan threaddan, bloklanmaydi)"""
+        if self._stopping or self.loop.is_closed():
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, alert)
+        except RuntimeError:
+            return False  # Sikl yopilgan
+        return True
+    
+    def _enqueue(self, alert):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.stats['dropped'] += 1
+        self.queue.put_nowait(alert)
+        self.stats['queued'] += 1
+    
+    async def _deliver(self):
+        """Paketlarni yig'ish va yuborish"""
+        while True:
+            batch = [await self.queue.get()]
+            deadline = self.loop.time() + ALERT_SETTINGS['batch_interval']
+            while len(batch) < ALERT_SETTINGS['batch_size']:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._send_with_retries(batch)
+            for _ in batch:
+                self.queue.task_done()
+    
+    async def _send_with_retries(self, batch):
+        delay = ALERT_SETTINGS['retry_backoff']
+        for attempt in range(ALERT_SETTINGS['max_retries'] + 1):
+            try:
+                await self.sink.send(batch)
+                self.stats['sent'] += len(batch)
+                return
+            except Exception as e:
+                if attempt == ALERT_SETTINGS['max_retries'] or self._stopping:
+                    self.stats['failed'] += len(batch)
+                    logger.error("Ogohlantirishlar yuborilmadi (%d ta): %s", len(batch), e)
+                    return
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, ALERT_SETTINGS['retry_backoff_max'])
+    
+    def get_queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+    
+    def stop(self, timeout=None):
+        """Navbatdagilarni yuborishga vaqt berib, siklni to'xtatish"""
+        if not self._thread.is_alive():
+            return
+        timeout = timeout if timeout is not None else ALERT_SETTINGS['shutdown_timeout']
+        
+        async def drain():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                stats = self.stats
+                logger.warning("Ogohlantirishlar navbati to'liq yuborilmadi (%d ta qoldi)",
+                               stats['queued'] - stats['sent'] - stats['failed'] - stats['dropped'])
+            self._stopping = True
+            self._worker.cancel()
+        
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), self.loop).result(timeout + 5.0)
+        except Exception as e:
+            logger.error("Ogohlantirish dispetcherini to'xtatishda xato: %s", e)
+        self._stopping = True
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5.0)
+
+class AlertEngine:
+    """Tezlik qoidalari: kamera va klass bo'yicha chegaralar, bitta track uchun bitta ogohlantirish
+    
+    Baholash polygondan chiqishda o'rtacha tezlik bo'yicha (kirishdagi "joriy" tezlik ishonchsiz);
+    polygonda min_time_in_polygon dan kam bo'lgan o'tishlar (tracker sakrashlari) hisobga olinmaydi.
+    """
+    
+    def __init__(self, cameras, dispatcher=None):
+        self.enabled = ALERT_SETTINGS['enabled']
+        self.dispatcher = dispatcher
+        self.limits = {}
+        for cam_config in cameras:
+            self.set_camera_limits(cam_config)
+        self.alerted = OrderedDict()  # {(camera_id, track_id): vaqt} - cheklangan
+        self.lock = threading.Lock()
+    
+    def on_exit(self, event):
+        """ExitEvent obunachisi"""
+        self.check_passage(event.camera_id, event.track_id, event.vehicle, event.clip_path)
+    
+    def set_camera_limits(self, cam_config):
+        """Kamera chegaralari (ish vaqtida qo'shilgan kamera uchun ham)"""
+        limits = dict(ALERT_SETTINGS['speed_limits'])
+        limits.update(cam_config.get('speed_limits', {}))
+        self.limits[cam_config['id']] = limits
+    
+    def get_limit(self, camera_id, class_name):
+        """Kamera va klass uchun tezlik chegarasi (km/h)"""
+        limits = self.limits.get(camera_id, ALERT_SETTINGS['speed_limits'])
+        return limits.get(class_name, limits.get('default'))
+    
+    def check_passage(self, camera_id, track_id, vehicle_info, clip_path=None):
+        """Polygondan chiqqan avtomobilni tekshirish; buzilish bo'lsa ogohlantirish yuboriladi"""
+        if not self.enabled or self.dispatcher is None:
+            return None
+        
+        speed = vehicle_info['speed']
+        limit = self.get_limit(camera_id, vehicle_info['class_name'])
+        if limit is None or not speed or speed <= limit:
+            return None
+        if vehicle_info['total_time'] < ALERT_SETTINGS['min_time_in_polygon']:
+            return None
+        
+        key = (camera_id, track_id)
+        with self.lock:
+            if key in self.alerted:
+                return None
+            self.alerted[key] = time()
+            while len(self.alerted) > ALERT_SETTINGS['max_tracked_alerts']:
+                self.alerted.popitem(last=False)
+        
+        alert = {
+            'type': 'speed_violation',
+            'camera_id': camera_id,
+            'track_id': track_id,
+            'class_name': vehicle_info['class_name'],
+            'speed': round(float(speed), 1),
+            'limit': limit,
+            'duration': round(float(vehicle_info['total_time']), 2),
+            'license_plate': vehicle_info['license_plate'],
+            'clip_path': clip_path,
+            'time': datetime.now().isoformat(timespec='seconds')
+        }
+        self.dispatcher.submit(alert)
+        logger.warning("Kamera %s: Avtomobil %s tezlikni oshirdi - %.1f km/h (chegara %s)",
+                       camera_id, track_id, alert['speed'], limit,
+                       extra={'event': 'speed_violation', 'camera_id': camera_id, 'track_id': track_id,
+                              'speed': alert['speed'], 'limit': limit})
+        return alert
\ No newline at end of file
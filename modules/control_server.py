@@ -0,0 +1,263 @@
+"""
+RailSafeAI - Mahalliy boshqaruv API (HTTP yoki Unix socket, asyncio) moduli
+"""
+import asyncio
+import json
+import os
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from config.settings import CONTROL_SETTINGS
+from modules.event_log import get_logger
+
+logger = get_logger('control')
+
+# Sarlavhalar soni va so'rov tanasi (faqat kamera qo'shishda - JSON) hajmi cheklangan
+_MAX_HEADER_LINES = 100
+_MAX_BODY_BYTES = 65536
+
+_LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+class ControlServer:
+    """Daemon rejimi uchun boshqaruv: kamera bo'yicha aniqlash/yozishni yoqish-o'chirish va holat
+    
+    Alohida threaddagi asyncio sikli so'rovlarni qabul qiladi; tizim metodlari asyncio.to_thread
+    orqali chaqiriladi (yozuvchini ochish siklni to'xtatmaydi). Marshrutlar:
+        GET  /status, /cameras/<id>
+        POST /cameras (JSON - CAMERAS elementi), DELETE /cameras/<id>, POST /cameras/<id>/restart
+        POST /cameras/<id|all>/detection/start|stop, /cameras/<id|all>/recording/start|stop
+        POST /profiling[/<id|all>]/start|stop, /shutdown
+    """
+    
+    def __init__(self, system, host=None, port=None, unix_socket=None):
+        self.system = system  # RailSafeAI: get_status, add/remove/restart_camera, set_detection, set_recording, ...
+        self.host = host or CONTROL_SETTINGS['host']
+        self.port = port or CONTROL_SETTINGS['port']
+        self.unix_socket = unix_socket if unix_socket is not None else CONTROL_SETTINGS['unix_socket']
+        self.allowed_hosts = self._allowed_hosts()
+        self.loop = None
+        self.server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+    
+    def _allowed_hosts(self):
+        """Qabul qilinadigan Host sarlavhalari - bog'langan manzil (port bilan va portsiz)
+        
+        Brauzerdagi begona sahifa (yoki DNS rebinding) boshqa Host bilan keladi - so'rov bajarilmaydi.
+        """
+        names = {self.host} | set(CONTROL_SETTINGS['allowed_hosts'])
+        if self.host in _LOOPBACK_HOSTS:
+            names.update(_LOOPBACK_HOSTS)
+        allowed = set()
+        for name in names:
+            name = f"[{name}]" if ':' in name else name
+            allowed.update({name.lower(), f"{name}:{self.port}".lower()})
+        return allowed
+    
+    def _check_request(self, method, host, content_type):
+        """Saytlararo so'rovlardan himoya: (status, JSON) yoki None"""
+        if not self.unix_socket and host.lower() not in self.allowed_hosts:
+            return 403, {'error': f"Ruxsat etilmagan Host: {host or '-'}"}
+        # Oddiy (preflight siz) saytlararo so'rov application/json yubora olmaydi
+        if method in ('POST', 'DELETE') and content_type.partition(';')[0].strip().lower() != 'application/json':
+            return 415, {'error': "Content-Type: application/json kerak"}
+        return None
+    
+    @property
+    def address(self):
+        return f"unix:{self.unix_socket}" if self.unix_socket else f"http://{self.host}:{self.port}"
+    
+    def start(self):
+        """Siklni fon threadda ishga tushirish (manzil band bo'lsa False)"""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='control-api', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+        if self._error is not None:
+            print(f"Xato boshqaruv serverini ishga tushirishda ({self.address}): {self._error}")
+            self._thread.join(timeout=5.0)
+            return False
+        print(f"Boshqaruv API: {self.address}/status")
+        return True
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(self._create_server())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+    
+    async def _create_server(self):
+        if not self.unix_socket:
+            return await asyncio.start_server(self._handle, self.host, self.port)
+        
+        # Oldingi ishga tushirishdan qolgan socket fayli
+        if os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+        os.makedirs(os.path.dirname(os.path.abspath(self.unix_socket)), exist_ok=True)
+        server = await asyncio.start_unix_server(self._handle, self.unix_socket)
+        os.chmod(self.unix_socket, 0o660)
+        return server
+    
+    async def _handle(self, reader, writer):
+        """Bitta so'rov - bitta javob (Connection: close)"""
+        timeout = CONTROL_SETTINGS['request_timeout']
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout)
+            parts = request_line.decode('latin-1').split()
+            content_length = 0
+            headers = {}
+            for _ in range(_MAX_HEADER_LINES):
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+                if name.strip().lower() == 'content-length':
+                    content_length = int(value.strip() or 0)
+            if content_length > _MAX_BODY_BYTES:
+                status, payload = 413, {'error': "So'rov juda katta"}
+            else:
+                body = await asyncio.wait_for(reader.readexactly(content_length), timeout) if content_length else b''
+                rejected = len(parts) >= 2 and \
+                    self._check_request(parts[0].upper(), headers.get('host', ''), headers.get('content-type', ''))
+                if len(parts) < 2:
+                    status, payload = 400, {'error': "Noto'g'ri so'rov"}
+                elif rejected:
+                    status, payload = rejected
+                else:
+                    try:
+                        status, payload = await self.dispatch(parts[0].upper(), urlsplit(parts[1]).path, body)
+                    except Exception as e:
+                        logger.error("Boshqaruv so'rovida xato (%s %s): %s", parts[0], parts[1], e)
+                        status, payload = 500, {'error': f"Ichki xato: {e}"}
+            await self._respond(writer, status, payload)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, writer, status, payload):
+        body = (json.dumps(payload, indent=2, ensure_ascii=False) + '\n').encode('utf-8')
+        writer.write((f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n"
+                      f"Connection: close\r\n\r\n").encode('ascii') + body)
+        await writer.drain()
+    
+    async def dispatch(self, method, path, body=b''):
+        """Marshrutlash: (HTTP status, JSON)"""
+        parts = [part for part in path.split('/') if part]
+        
+        if parts == ['cameras'] and method == 'POST':
+            return await self._add_camera(body)
+        
+        if len(parts) == 2 and parts[0] == 'cameras' and method == 'DELETE':
+            if parts[1] not in self.system.camera_processors:
+                return 404, {'error': f"Kamera topilmadi: {parts[1]}"}
+            await asyncio.to_thread(self.system.remove_camera, parts[1])
+            logger.info("Boshqaruv: kamera %s olib tashlandi", parts[1],
+                        extra={'event': 'control_camera_remove', 'camera_id': parts[1]})
+            return 200, {'removed': parts[1]}
+        
+        if parts == ['status'] or (len(parts) == 2 and parts[0] == 'cameras'):
+            if method != 'GET':
+                return 405, {'error': "Faqat GET"}
+            camera_id = parts[1] if len(parts) == 2 else None
+            if camera_id is not None and camera_id not in self.system.camera_processors:
+                return 404, {'error': f"Kamera topilmadi: {camera_id}"}
+            return 200, self.system.get_status(camera_id)
+        
+        if method != 'POST':
+            return (405, {'error': "Faqat POST"}) if self._is_command(parts) else (404, {'error': "Topilmadi"})
+        
+        if len(parts) == 4 and parts[0] == 'cameras' and parts[2] in ('detection', 'recording') and \
+                parts[3] in ('start', 'stop'):
+            camera_id = None if parts[1] == 'all' else parts[1]
+            if camera_id is not None and camera_id not in self.system.camera_processors:
+                return 404, {'error': f"Kamera topilmadi: {camera_id}"}
+            action = self.system.set_detection if parts[2] == 'detection' else self.system.set_recording
+            cameras = await asyncio.to_thread(action, parts[3] == 'start', camera_id)
+            logger.info("Boshqaruv: %s %s (%s)", parts[2], parts[3], ', '.join(map(str, cameras)),
+                        extra={'event': f"control_{parts[2]}_{parts[3]}", 'cameras': cameras})
+            return 200, {'cameras': cameras, parts[2]: parts[3] == 'start'}
+        
+        if len(parts) == 3 and parts[0] == 'cameras' and parts[2] == 'restart':
+            if parts[1] not in self.system.camera_processors:
+                return 404, {'error': f"Kamera topilmadi: {parts[1]}"}
+            await asyncio.to_thread(self.system.restart_camera, parts[1])
+            logger.info("Boshqaruv: kamera %s qayta ishga tushirildi", parts[1],
+                        extra={'event': 'control_camera_restart', 'camera_id': parts[1]})
+            return 200, {'restarted': parts[1]}
+        
+        if len(parts) in (2, 3) and parts[0] == 'profiling' and parts[-1] in ('start', 'stop'):
+            camera_id = parts[1] if len(parts) == 3 and parts[1] != 'all' else None
+            if camera_id is not None and camera_id not in self.system.camera_processors:
+                return 404, {'error': f"Kamera topilmadi: {camera_id}"}
+            # Holatga qarab almashtirish emas - bir vaqtdagi ikki so'rov bir-birini bekor qilmaydi
+            if parts[-1] == 'start':
+                try:
+                    started = await asyncio.to_thread(self.system.start_profiling, camera_id)
+                except KeyError:
+                    return 404, {'error': f"Kamera topilmadi: {camera_id}"}
+                if not started and not self.system.profiler.is_running():
+                    return 409, {'error': "Profilingni boshlab bo'lmadi (ishlayotgan kamera threadi yo'q)"}
+            else:
+                await asyncio.to_thread(self.system.stop_profiling)
+            logger.info("Boshqaruv: profiling %s (%s)", parts[-1], camera_id or 'all',
+                        extra={'event': f"control_profiling_{parts[-1]}", 'camera_id': camera_id})
+            return 200, {'profiling': self.system.profiler.is_running(), 'camera': camera_id or 'all'}
+        
+        if parts == ['shutdown']:
+            self.system.request_shutdown()
+            return 202, {'status': 'stopping'}
+        
+        return 404, {'error': "Topilmadi"}
+    
+    async def _add_camera(self, body):
+        """Kamera qo'shish: tana - CAMERAS elementi kabi JSON obyekt"""
+        try:
+            cam_config = json.loads(body or b'null')
+        except ValueError as e:
+            return 400, {'error': f"JSON xato: {e}"}
+        if not isinstance(cam_config, dict):
+            return 400, {'error': "Kamera sozlamasi JSON obyekt bo'lishi kerak"}
+        if 'position' in cam_config:
+            if not isinstance(cam_config['position'], list) or len(cam_config['position']) != 2:
+                return 400, {'error': "position - [x, y]"}
+            cam_config['position'] = tuple(cam_config['position'])
+        
+        try:
+            processor = await asyncio.to_thread(self.system.add_camera, cam_config)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        logger.info("Boshqaruv: kamera %s qo'shildi", processor.camera_id,
+                    extra={'event': 'control_camera_add', 'camera_id': processor.camera_id})
+        return 201, {'added': processor.camera_id}
+    
+    def _is_command(self, parts):
+        return bool(parts) and parts[0] in ('cameras', 'profiling', 'shutdown')
+    
+    def stop(self):
+        """Serverni yopish va siklni to'xtatish"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+        
+        try:
+            asyncio.run_coroutine_threadsafe(close(), self.loop).result(5.0)
+        except Exception as e:
+            logger.error("Boshqaruv serverini to'xtatishda xato: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5.0)
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+RailSafeAI - Yozib olingan video uchun aniqlashlar keshi moduli
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+import numpy as np
+from config.settings import DETECTION_CACHE_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('detection_cache')
+
+CACHE_VERSION = 1
+
+# Ustunlar: nom -> (dtype, bitta qatordagi qiymatlar soni)
+COLUMNS = {
+    'track_id': (np.int32, 1),     # -1 - tracker ID bermagan quti
+    'class_id': (np.int16, 1),
+    'confidence': (np.float32, 1),
+    'xyxy': (np.float32, 4)
+}
+
+_digest_lock = threading.Lock()
+
+def file_digest(path):
+    """Fayl mazmuni xeshi (o'lcham va o'zgartirish vaqti o'zgarmagan bo'lsa qayta hisoblanmaydi)"""
+    stat = os.stat(path)
+    real_path = os.path.realpath(path)
+    memo_path = os.path.join(Paths.DETECTION_CACHE_DIR, 'digests.json')
+    
+    with _digest_lock:
+        try:
+            with open(memo_path, 'r') as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+        
+        entry = memo.get(real_path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DETECTION_CACHE_SETTINGS['hash_chunk_size']), b''):
+                digest.update(chunk)
+        
+        memo[real_path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        os.makedirs(Paths.DETECTION_CACHE_DIR, exist_ok=True)
+        tmp_path = memo_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(memo, f)
+        os.replace(tmp_path, memo_path)
+        return memo[real_path][2]
+
+class CachedDetections:
+    """Bitta kadrning keshlangan aniqlashlari (memmap ustunlari kesimlari)"""
+    
+    __slots__ = ('track_ids', 'class_ids', 'confidences', 'boxes')
+    
+    def __init__(self, track_ids, class_ids, confidences, boxes):
+        self.track_ids = track_ids
+        self.class_ids = class_ids
+        self.confidences = confidences
+        self.boxes = boxes
+    
+    def __len__(self):
+        return len(self.track_ids)
+
+def extract_columns(results):
+    """YOLO track() natijasidan ustunlar (track_id, class_id, confidence, xyxy)"""
+    if not results or results[0].boxes is None or len(results[0].boxes) == 0:
+        return None
+    
+    boxes = results[0].boxes
+    count = len(boxes)
+    track_ids = boxes.id.cpu().numpy() if boxes.id is not None else np.full(count, -1)
+    return (
+        np.asarray(track_ids, dtype=np.int32).reshape(count),
+        np.asarray(boxes.cls.cpu().numpy(), dtype=np.int16).reshape(count),
+        np.asarray(boxes.conf.cpu().numpy(), dtype=np.float32).reshape(count),
+        np.asarray(boxes.xyxy.cpu().numpy(), dtype=np.float32).reshape(count, 4)
+    )
+
+class DetectionCache:
+    """Video mazmuni, model, inference sozlamalari va kadr indeksi bo'yicha aniqlashlar keshi
+    
+    Har bir ustun alohida ikkilik faylda (memmap bilan o'qiladi), offsets.bin - har kadr qatorlari boshlanishi.
+    Kesh faqat video oxirigacha uzluksiz o'tilganda saqlanadi; yarim qolgan yozuv tashlanadi.
+    """
+    
+    def __init__(self, video_path, model_path, inference_settings):
+        self.key = self._make_key(video_path, model_path, inference_settings)
+        self.path = os.path.join(Paths.DETECTION_CACHE_DIR, self.key)
+        self.video_path = video_path
+        self.complete = False
+        self.frames = 0
+        self.columns = {}
+        self.offsets = None
+        
+        # Yozish holati
+        self._tmp_path = None
+        self._files = {}
+        self._offsets = []
+        self._rows = 0
+        self._broken = False
+        
+        self.meta = {
+            'version': CACHE_VERSION,
+            'video': os.path.realpath(video_path),
+            'model': os.path.realpath(model_path),
+            'settings': inference_settings
+        }
+        self._open_reader()
+    
+    @staticmethod
+    def _make_key(video_path, model_path, inference_settings):
+        """Kesh kaliti: video va model mazmuni xeshi + inference sozlamalari"""
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'video': file_digest(video_path),
+            'model': file_digest(model_path),
+            'settings': inference_settings
+        }, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
+    def _open_reader(self):
+        """Tayyor keshni memmap bilan ochish"""
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return
+        
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            self.frames = meta['frames']
+            self.offsets = np.fromfile(os.path.join(self.path, 'offsets.bin'), dtype=np.int64)
+            rows = int(self.offsets[-1])
+            for name, (dtype, width) in COLUMNS.items():
+                shape = (rows, width) if width > 1 else (rows,)
+                # Bo'sh faylni memmap qilib bo'lmaydi
+                self.columns[name] = (np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode='r', shape=shape)
+                                      if rows else np.empty(shape, dtype=dtype))
+            self.complete = len(self.offsets) == self.frames + 1
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            logger.warning("Aniqlashlar keshi o'qilmadi (%s): %s", self.path, e)
+            self.columns = {}
+            self.complete = False
+        
+        if self.complete:
+            logger.info("Aniqlashlar keshi topildi: %s (%d kadr)", self.video_path, self.frames,
+                        extra={'event': 'detection_cache_hit'})
+    
+    def read(self, frame_index):
+        """Kadr aniqlashlari (keshda bo'lmasa None)"""
+        if not self.complete or frame_index >= self.frames:
+            return None
+        start, end = self.offsets[frame_index], self.offsets[frame_index + 1]
+        return CachedDetections(
+            self.columns['track_id'][start:end],
+            self.columns['class_id'][start:end],
+            self.columns['confidence'][start:end],
+            self.columns['xyxy'][start:end]
+        )
+    
+    def append(self, frame_index, results):
+        """Inference natijasini yozish (kadrlar 0 dan ketma-ket kelishi kerak)"""
+        if self.complete or self._broken:
+            return
+        
+        if frame_index != len(self._offsets):
+            # Kadr o'tkazib yuborildi (masalan, aniqlash vaqtincha o'chirildi) - kesh to'liq bo'lmaydi
+            logger.warning("Aniqlashlar keshi yozilmaydi: kadr %d kutilgan edi, %d keldi",
+                           len(self._offsets), frame_index)
+            self.abort()
+            return
+        
+        try:
+            if self._tmp_path is None:
+                self._tmp_path = self.path + '.tmp'
+                shutil.rmtree(self._tmp_path, ignore_errors=True)
+                os.makedirs(self._tmp_path)
+                self._files = {name: open(os.path.join(self._tmp_path, f"{name}.bin"), 'wb') for name in COLUMNS}
+            
+            self._offsets.append(self._rows)
+            columns = extract_columns(results)
+            if columns is None:
+                return
+            for name, values in zip(COLUMNS, columns):
+                values.tofile(self._files[name])
+            self._rows += len(columns[0])
+        except Exception as e:
+            logger.error("Aniqlashlar keshini yozishda xato: %s", e)
+            self.abort()
+    
+    def finish(self, completed):
+        """Yozishni yakunlash: video oxirigacha yetilgan bo'lsa kesh saqlanadi, aks holda tashlanadi"""
+        if self._tmp_path is None or self._broken:
+            return
+        
+        if not completed:
+            logger.info("Video oxirigacha ishlanmadi - aniqlashlar keshi saqlanmadi: %s", self.video_path)
+            self.abort()
+            return
+        
+        try:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+            
+            np.asarray(self._offsets + [self._rows], dtype=np.int64).tofile(os.path.join(self._tmp_path, 'offsets.bin'))
+            meta = dict(self.meta, frames=len(self._offsets), rows=self._rows,
+                        created=datetime.now().isoformat(timespec='seconds'))
+            with open(os.path.join(self._tmp_path, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(self._tmp_path, self.path)
+            self._tmp_path = None
+            logger.info("Aniqlashlar keshi saqlandi: %s (%d kadr, %d quti)", self.path, meta['frames'], self._rows,
+                        extra={'event': 'detection_cache_saved'})
+        except Exception as e:
+            logger.error("Aniqlashlar keshini saqlashda xato: %s", e)
+            self.abort()
+    
+    def abort(self):
+        """Yarim yozilgan keshni tashlash"""
+        self._broken = True
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        if self._tmp_path is not None:
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+            self._tmp_path = None
\ No newline at end of file
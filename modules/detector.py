@@ -1,27 +1,99 @@
 """
 RailSafeAI - YOLO obyekt aniqlash moduli
 """
-from ultralytics import YOLO
-from config.settings import AUTO_DETECTION_ENABLED, TARGET_CLASSES, CLASS_NAMES
+import os
+from config.settings import AUTO_DETECTION_ENABLED, TARGET_CLASSES, CLASS_NAMES, DETECTION_CACHE_SETTINGS, TILING_SETTINGS
 from config.paths import Paths
+from modules.detection_cache import DetectionCache, CachedDetections
+from modules.tiling import TiledInference
+from modules.event_log import get_logger
 import cv2
 
+logger = get_logger('detector')
+
 class VehicleDetector:
     """YOLO yordamida avtomobil aniqlash uchun klass"""
     
-    def __init__(self, model_path):
-        """Detektorni ishga tushirish"""
-        try:
-            full_model_path = Paths.get_model_path(model_path)
-            self.model = YOLO(full_model_path)
-            print(f"YOLO model yuklandi: {full_model_path}")
-        except Exception as e:
-            print(f"Xato: Model yuklanmadi - {e}")
-            self.model = None
+    IMGSZ_FAILURE_LIMIT = 3  # Berilgan o'lchamda ketma-ket shuncha xatodan keyin model o'lchami sinab ko'riladi
+    
+    def __init__(self, model_path, source=None, model_pool=None, tiling=False):
+        """Detektorni ishga tushirish (model_path=None - modelsiz, masalan sintetik natijalar uchun)
         
+        source - video fayl bo'lsa va kesh yoqilgan bo'lsa, aniqlashlar keshdan o'qiladi/keshga yoziladi.
+        model_pool - model yuklanmaydi, zaxiradan tayyor (qizdirilgan) model olinadi.
+        tiling - polygon hududi bo'laklab aniqlanadi (TiledInference, uzoqdagi kichik avtomobillar uchun).
+        """
         self.detection_enabled = AUTO_DETECTION_ENABLED
         self.target_classes = TARGET_CLASSES
+        # model.track() parametrlari - kesh kalitiga ham kiradi
+        self.track_args = {'persist': True, 'classes': self.target_classes}
+        self.fixed_imgsz = False  # Model (masalan, statik ONNX) boshqa inference o'lchamini qabul qilmadi
+        self.imgsz_failures = 0
+        self.model = None
+        self.model_pool = model_pool
+        self.cache = None
+        self.tiling = TiledInference(self.target_classes) if tiling else None
+        if model_path is None:
+            return
+        
+        full_model_path = Paths.get_model_path(model_path)
+        if self.tiling is None:
+            # Bo'laklar polygonga bog'liq, polygon esa kesh ochilgandan keyin yuklanadi - keshlanmaydi
+            self._open_cache(source, full_model_path)
+        if self.is_replaying_cache():
+            # Barcha kadrlar keshda - model yuklanmaydi
+            return
+        
+        try:
+            # ultralytics faqat model yuklanganda kerak - get_vehicle_data/draw_detections usiz ham ishlaydi
+            if model_pool is not None:
+                self.model = model_pool.acquire()
+            else:
+                from ultralytics import YOLO
+                self.model = YOLO(full_model_path)
+            logger.info("YOLO model yuklandi: %s", full_model_path)
+        except Exception as e:
+            logger.error("Xato: Model yuklanmadi - %s", e)
+            self.model = None
+    
+    def _open_cache(self, source, model_path):
+        """Video fayl uchun aniqlashlar keshini ochish (jonli oqimlar keshlanmaydi)"""
+        if not DETECTION_CACHE_SETTINGS['enabled'] or not isinstance(source, str) or not os.path.isfile(source):
+            return
         
+        try:
+            self.cache = DetectionCache(source, model_path, self.track_args)
+        except OSError as e:
+            logger.warning("Aniqlashlar keshi ishlatilmaydi: %s", e)
+            self.cache = None
+    
+    def is_replaying_cache(self):
+        """Aniqlashlar to'liq keshdan o'qilyaptimi"""
+        return self.cache is not None and self.cache.complete
+    
+    def close_cache(self, completed):
+        """Kesh yozishni yakunlash (completed - video oxirigacha ishlangan)"""
+        if self.cache is not None:
+            self.cache.finish(completed)
+    
+    def release_model(self):
+        """Kamera olib tashlanganda modelni zaxiraga qaytarish"""
+        # Bo'laklab aniqlash predictor sozlamalarini (imgsz, classes) o'zgartiradi - model qaytarilmaydi
+        if self.model_pool is not None and self.tiling is None:
+            self.model_pool.release(self.model)
+        self.model = None
+    
+    def set_tile_region(self, polygon):
+        """Bo'laklab aniqlash hududi - kamera polygoni (bo'laklash o'chiq bo'lsa hech narsa qilmaydi)"""
+        if self.tiling is not None:
+            self.tiling.set_polygon(polygon)
+    
+    def get_tile_count(self):
+        """Bir kadrdagi inference bo'laklari soni (butun kadr bilan; bo'laklash o'chiq bo'lsa None)"""
+        if self.tiling is None or not self.tiling.tiles:
+            return None
+        return len(self.tiling.tiles) + (1 if TILING_SETTINGS['full_frame'] else 0)
+    
     def is_detection_enabled(self):
         """Aniqlash yoqilganligini tekshirish"""
         return self.detection_enabled
@@ -30,30 +102,98 @@ class VehicleDetector:
         """Aniqlashni yoqish/o'chirish"""
         self.detection_enabled = enabled
         status = "YOQILDI" if enabled else "O'CHIRILDI"
-        print(f"Avtomobil aniqlash: {status}")
+        logger.info("Avtomobil aniqlash: %s", status)
+    
+    def _model_imgsz(self):
+        """Model o'lchami: eksport metama'lumotidan (ONNX), bo'lmasa ultralytics standarti"""
+        backend = getattr(getattr(self.model, 'predictor', None), 'model', None)
+        return getattr(backend, 'imgsz', None) or getattr(self.model, 'overrides', {}).get('imgsz') or 640
+    
+    def set_inference_size(self, imgsz):
+        """Inference o'lchamini o'zgartirish (QoS; None - model standarti)
+        
+        Natijalar boshqa o'lchamda bo'ladi - yozilayotgan aniqlashlar keshi tashlanadi.
+        Bo'laklab aniqlashda bo'lak o'lchami o'zgarmaydi.
+        """
+        if self.fixed_imgsz or self.tiling is not None:
+            return
+        if imgsz is None:
+            if 'imgsz' not in self.track_args:
+                return
+            # ultralytics predictori oldingi chaqiruvdagi imgsz ni eslab qoladi - standartga qaytish ham aniq beriladi
+            imgsz = self._model_imgsz()
+        if imgsz == self.track_args.get('imgsz'):
+            return
+        # Kamera threadi o'qiyotgan lug'at o'zgartirilmaydi - yangisi bilan almashtiriladi
+        self.track_args = dict(self.track_args, imgsz=imgsz)
+        if self.cache is not None and not self.cache.complete:
+            logger.info("Inference o'lchami o'zgardi - aniqlashlar keshi yozilmaydi")
+            self.cache.abort()
     
-    def detect_and_track(self, frame):
-        """Frameda avtomobillarni aniqlash va kuzatish"""
-        if not self.detection_enabled or self.model is None:
+    def detect_and_track(self, frame, frame_index=None):
+        """Frameda avtomobillarni aniqlash va kuzatish (frame_index - video kadr raqami, kesh uchun)"""
+        if not self.detection_enabled:
             return None
         
+        if self.is_replaying_cache() and frame_index is not None:
+            return self.cache.read(frame_index)
+        
+        if self.model is None:
+            return None
+        
+        if self.tiling is not None:
+            try:
+                return self.tiling.detect_and_track(self.model, frame)
+            except Exception as e:
+                logger.error("Bo'laklab aniqlashda xato: %s", e)
+                return None
+        
+        track_args = self.track_args
         try:
             # YOLO model bilan aniqlash va kuzatish
             results = self.model.track(
                 frame, 
-                persist=True, 
-                classes=self.target_classes,
-                verbose=False  # Chop etishni kamaytirish
+                verbose=False,  # Chop etishni kamaytirish
+                **track_args
             )
+            self.imgsz_failures = 0
+            if self.cache is not None:
+                self.cache.append(frame_index, results)
             return results
         except Exception as e:
-            print(f"Aniqlashda xato: {e}")
+            logger.error("Aniqlashda xato: %s", e)
+            if 'imgsz' in track_args and not self.fixed_imgsz:
+                return self._retry_model_imgsz(frame, track_args)
             return None
     
+    def _retry_model_imgsz(self, frame, track_args):
+        """Berilgan o'lcham ketma-ket xato bersa - model o'lchamida sinash
+        
+        Model o'z o'lchamida ishlasa (statik ONNX) o'lcham qotiriladi va QoS/kalibrlash uni boshqa
+        o'zgartirmaydi. Bir martalik xatolar (xotira, buzuq kadr, tracker) holatni o'zgartirmaydi.
+        """
+        self.imgsz_failures += 1
+        model_imgsz = self._model_imgsz()
+        if self.imgsz_failures < self.IMGSZ_FAILURE_LIMIT or model_imgsz == track_args['imgsz']:
+            return None
+        try:
+            results = self.model.track(frame, verbose=False, **dict(track_args, imgsz=model_imgsz))
+        except Exception:
+            return None  # Model o'lchamida ham xato - sabab o'lcham emas
+        logger.warning("Model %s inference o'lchamini qabul qilmadi - o'z o'lchami %s ishlatiladi",
+                       track_args['imgsz'], model_imgsz)
+        self.track_args = dict(track_args, imgsz=model_imgsz)
+        self.fixed_imgsz = True
+        self.imgsz_failures = 0
+        return results
+    
     def get_vehicle_data(self, results):
         """Aniqlangan avtomobillar ma'lumotlarini chiqarish"""
         vehicles = []
         
+        if isinstance(results, CachedDetections):
+            return self._get_cached_vehicle_data(results)
+        
         if not results or results[0].boxes is None:
             return vehicles
         
@@ -93,6 +233,24 @@ class VehicleDetector:
         
         return vehicles
     
+    def _get_cached_vehicle_data(self, detections):
+        """Keshdagi ustunlardan avtomobillar ma'lumotlari (get_vehicle_data bilan bir xil ko'rinish)"""
+        vehicles = []
+        for track_id, class_id, confidence, (x1, y1, x2, y2) in zip(
+                detections.track_ids.tolist(), detections.class_ids.tolist(),
+                detections.confidences.tolist(), detections.boxes.tolist()):
+            if track_id < 0:
+                continue
+            vehicles.append({
+                'track_id': track_id,
+                'class_id': class_id,
+                'class_name': CLASS_NAMES.get(class_id, 'Unknown'),
+                'bbox': (int(x1), int(y1), int(x2), int(y2)),
+                'center': ((x1 + x2) / 2, (y1 + y2) / 2),
+                'confidence': confidence
+            })
+        return vehicles
+    
     def draw_detections(self, frame, vehicles, vehicle_tracking, camera_id):
         """Aniqlangan avtomobillarni framega chizish"""
         for vehicle in vehicles:
@@ -0,0 +1,187 @@
+"""
+RailSafeAI - Jarayon ichidagi hodisalar shinasi (tracker hodisalari va ularning iste'molchilari) moduli
+"""
+import threading
+from queue import Queue, Empty, Full
+from modules.event_log import get_logger
+
+logger = get_logger('event_bus')
+
+class VehicleEvent:
+    """Avtomobil hodisasi asosi: kamera, track va hodisa vaqti (unix)"""
+    
+    __slots__ = ('camera_id', 'track_id', 'timestamp')
+    
+    def __init__(self, camera_id, track_id, timestamp):
+        self.camera_id = camera_id
+        self.track_id = track_id
+        self.timestamp = timestamp
+    
+    def __repr__(self):
+        return f"{type(self).__name__}(camera_id={self.camera_id!r}, track_id={self.track_id!r})"
+
+class UpdateEvent(VehicleEvent):
+    """Har kadrda: aniqlash natijasi (get_vehicle_data lug'ati) va polygon ichidaligi"""
+    
+    __slots__ = ('vehicle', 'in_zone')
+    
+    def __init__(self, camera_id, track_id, timestamp, vehicle, in_zone):
+        super().__init__(camera_id, track_id, timestamp)
+        self.vehicle = vehicle
+        self.in_zone = in_zone
+
+class EnterEvent(VehicleEvent):
+    """Polygon ichiga kirdi"""
+    
+    __slots__ = ('class_name',)
+    
+    def __init__(self, camera_id, track_id, timestamp, class_name):
+        super().__init__(camera_id, track_id, timestamp)
+        self.class_name = class_name
+
+class ExitEvent(VehicleEvent):
+    """Polygondan to'liq o'tdi: vehicle - tracker yozuvining nusxasi (tezlik, vaqt, raqam), klip yo'li"""
+    
+    __slots__ = ('vehicle', 'clip_path')
+    
+    def __init__(self, camera_id, track_id, timestamp, vehicle, clip_path=None):
+        super().__init__(camera_id, track_id, timestamp)
+        self.vehicle = vehicle
+        self.clip_path = clip_path
+
+class ExpireEvent(VehicleEvent):
+    """Uzoq ko'rinmagani uchun tracker xotirasidan o'chirildi"""
+    
+    __slots__ = ('vehicle',)
+    
+    def __init__(self, camera_id, track_id, timestamp, vehicle):
+        super().__init__(camera_id, track_id, timestamp)
+        self.vehicle = vehicle
+
+class _AsyncSubscriber:
+    """O'z navbati va threadi bo'lgan obunachi (nashr qiluvchi kutmaydi)"""
+    
+    def __init__(self, name, handler, queue_size, overflow):
+        self.name = name
+        self.handler = handler
+        self.overflow = overflow  # 'drop_oldest' yoki 'drop_newest'
+        self.queue = Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=f"event-{name}", daemon=True)
+        self.thread.start()
+    
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return
+        except Full:
+            pass
+        
+        self.dropped += 1
+        if self.overflow == 'drop_oldest':
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(event)
+            except (Empty, Full):
+                pass
+    
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            try:
+                self.handler(event)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Hodisa ishlovchisi xatosi (%s, %s): %s", self.name, type(event).__name__, e)
+    
+    def stop(self, timeout):
+        # Navbat to'la bo'lsa ham to'xtash belgisi yetib borishi kerak
+        while True:
+            try:
+                self.queue.put(None, timeout=timeout)
+                break
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+        self.thread.join(timeout=timeout)
+
+class EventBus:
+    """Turlangan hodisalar shinasi
+    
+    subscribe(EventType, handler, mode='sync') - handler nashr qiluvchi threadida darhol chaqiriladi
+    (tez, bloklanmaydigan ishlar uchun); mode='async' - obunachining o'z threadi va cheklangan navbati,
+    to'lsa overflow siyosati bo'yicha hodisa tashlanadi. Obuna hodisa turi va uning avlodlariga tegadi.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._subscribers = []    # [(event_type, mode, handler yoki _AsyncSubscriber, nom)]
+        self._routes = {}         # {hodisa klassi: [(mode, target), ...]} - nashrda MRO qidirmaslik uchun
+        self.sync_errors = 0
+    
+    def subscribe(self, event_type, handler, mode='sync', name=None, queue_size=1000, overflow='drop_oldest'):
+        """Obuna bo'lish; async obunachi uchun nom (metrikalarda) va navbat siyosati"""
+        if mode not in ('sync', 'async'):
+            raise ValueError(f"Noto'g'ri obuna rejimi: {mode}")
+        if overflow not in ('drop_oldest', 'drop_newest'):
+            raise ValueError(f"Noto'g'ri navbat siyosati: {overflow}")
+        
+        name = name or getattr(handler, '__qualname__', repr(handler))
+        target = _AsyncSubscriber(name, handler, queue_size, overflow) if mode == 'async' else handler
+        with self.lock:
+            self._subscribers.append((event_type, mode, target, name))
+            self._routes = {}
+        return target
+    
+    def _resolve(self, event_class):
+        """Hodisa klassi uchun obunachilar ro'yxati (bir marta hisoblanadi)"""
+        with self.lock:
+            routes = [(mode, target) for event_type, mode, target, _ in self._subscribers
+                      if issubclass(event_class, event_type)]
+            self._routes[event_class] = routes
+        return routes
+    
+    def has_subscribers(self, event_class):
+        """Shu turdagi hodisaga obunachi bormi (hodisa obyektini yaratmaslik uchun)"""
+        routes = self._routes.get(event_class)
+        if routes is None:
+            routes = self._resolve(event_class)
+        return bool(routes)
+    
+    def publish(self, event):
+        """Hodisani tarqatish: sync obunachilar shu yerda, async lar navbatga (kutmasdan)"""
+        routes = self._routes.get(type(event))
+        if routes is None:
+            routes = self._resolve(type(event))
+        
+        for mode, target in routes:
+            if mode == 'async':
+                target.deliver(event)
+                continue
+            try:
+                target(event)
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error("Hodisa ishlovchisi xatosi (%s): %s", type(event).__name__, e)
+    
+    def get_stats(self):
+        """Async obunachilar: navbat chuqurligi, tashlangan hodisalar, xatolar"""
+        with self.lock:
+            subscribers = [(name, target) for _, mode, target, name in self._subscribers if mode == 'async']
+        return {
+            name: {'queue': target.queue.qsize(), 'dropped': target.dropped, 'errors': target.errors}
+            for name, target in subscribers
+        }
+    
+    def stop(self, timeout=5.0):
+        """Async obunachilar navbatlarini tugatib, threadlarini to'xtatish"""
+        with self.lock:
+            subscribers = [target for _, mode, target, _ in self._subscribers if mode == 'async']
+        for target in subscribers:
+            target.stop(timeout)
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+RailSafeAI - Navbatga asoslangan tuzilmali hodisalar jurnali moduli
+"""
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+from datetime import datetime
+from queue import Queue, Full
+from time import monotonic
+from config.settings import LOG_SETTINGS
+from config.paths import Paths
+
+ROOT_LOGGER = 'railsafe'
+
+# LogRecord ning standart atributlari - qolganlari (extra=...) tuzilmali maydonlar hisoblanadi
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'suppressed'}
+
+_listener = None
+_queue_handler = None
+
+class RateLimitFilter(logging.Filter):
+    """Takrorlanuvchi xabarlarni interval ichida cheklash (kamera threadida, navbatga qo'yishdan oldin)"""
+    
+    MAX_KEYS = 10000
+    
+    def __init__(self, max_count, interval):
+        super().__init__()
+        self.max_count = max_count
+        self.interval = interval
+        self.windows = {}  # {(logger, shablon, argumentlar): [oyna boshi, soni, tashlanganlar]}
+        self.lock = threading.Lock()  # Filtr barcha kamera threadlarida chaqiriladi
+        self._next_prune = 0.0
+    
+    def filter(self, record):
+        # Kalit - shablon va argumentlar: har xil avtomobil hodisalari bir-birini cheklamaydi
+        key = (record.name, record.msg, record.args)
+        try:
+            hash(key)
+        except TypeError:
+            key = (record.name, record.msg)
+        
+        now = monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is None and len(self.windows) >= self.MAX_KEYS:
+                    self._prune(now)
+                    if len(self.windows) >= self.MAX_KEYS:
+                        return True  # Jadval tirik oynalar bilan to'la - yangi xabar cheklanmaydi
+                suppressed = window[2] if window is not None else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            
+            window[1] += 1
+            if window[1] > self.max_count:
+                window[2] += 1
+                return False
+            return True
+    
+    def _prune(self, now):
+        """Muddati o'tgan oynalarni o'chirish (lug'at cheksiz o'smasligi uchun; interval da ko'pi bilan bir marta)"""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.interval
+        for key in [key for key, window in self.windows.items() if now - window[0] >= self.interval]:
+            self.windows.pop(key, None)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Navbatga qo'yish - kamera threadi uchun yagona xarajat; navbat to'lsa yozuv tashlanadi"""
+    
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # Bir jarayon ichida - formatlash (str.format, json) fon threadga qoldiriladi
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+class JsonLinesFormatter(logging.Formatter):
+    """Har bir yozuvni bitta JSON qatoriga aylantirish"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class ConsoleFormatter(logging.Formatter):
+    """Konsol uchun qisqa format; cheklangan takrorlar soni xabar oxiriga qo'shiladi"""
+    
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" (yana {suppressed} ta shunday xabar o'tkazib yuborildi)"
+        return text
+
+def setup_logging():
+    """Jurnal tizimini sozlash: QueueHandler -> fon listener -> konsol va JSON-lines fayl"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    
+    handlers = []
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(LOG_SETTINGS['console_level'])
+    console.setFormatter(ConsoleFormatter('%(message)s'))
+    handlers.append(console)
+    
+    if LOG_SETTINGS['file_enabled']:
+        try:
+            os.makedirs(Paths.LOGS_DIR, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                os.path.join(Paths.LOGS_DIR, LOG_SETTINGS['file_name']),
+                maxBytes=LOG_SETTINGS['max_bytes'],
+                backupCount=LOG_SETTINGS['backup_count'],
+                encoding='utf-8'
+            )
+            file_handler.setLevel(LOG_SETTINGS['file_level'])
+            file_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(file_handler)
+        except Exception as e:
+            print(f"Xato jurnal faylini ochishda: {e}")
+    
+    _queue_handler = NonBlockingQueueHandler(Queue(maxsize=LOG_SETTINGS['queue_size']))
+    _queue_handler.addFilter(RateLimitFilter(LOG_SETTINGS['rate_limit_count'], LOG_SETTINGS['rate_limit_interval']))
+    
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(LOG_SETTINGS['level'])
+    root.addHandler(_queue_handler)
+    root.propagate = False
+    
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Navbatdagi yozuvlarni yozib, fon threadni to'xtatish"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+    if _queue_handler.dropped:
+        print(f"Ogohlantirish: jurnal navbati to'lgani sababli {_queue_handler.dropped} ta yozuv tashlandi")
+    _listener = None
+    _queue_handler = None
+
+def get_logger(name):
+    """Modul uchun logger (railsafe.<name>)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
\ No newline at end of file
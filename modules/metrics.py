@@ -0,0 +1,185 @@
+"""
+RailSafeAI - Kadr ishlov bosqichlari uchun kechikish metrikalari moduli
+"""
+import math
+from time import perf_counter, time
+from config.settings import METRICS_SETTINGS
+
+# Logarifmik bucketlar: 10 mks dan ~30 s gacha, har biri oldingisidan ~10% katta
+_MIN_SECONDS = 1e-5
+_GROWTH = 1.1
+_LOG_GROWTH = math.log(_GROWTH)
+_BUCKET_COUNT = int(math.log(30.0 / _MIN_SECONDS) / _LOG_GROWTH) + 2
+
+def _bucket_index(seconds):
+    """Qiymat tushadigan bucket raqami - O(1)"""
+    if seconds <= _MIN_SECONDS:
+        return 0
+    return min(int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH) + 1, _BUCKET_COUNT - 1)
+
+def _bucket_upper(index):
+    """Bucket yuqori chegarasi (sekund)"""
+    return _MIN_SECONDS * _GROWTH ** index
+
+class LatencyHistogram:
+    """Aylanma oynali arzon gistogramma (p50/p95/p99 uchun)
+    
+    Ikki oyna saqlanadi: joriy va oldingi. Oyna vaqti tugaganda joriy oyna oldingisiga aylanadi,
+    shuning uchun kvantillar oxirgi 1-2 oynadagi qiymatlarni aks ettiradi.
+    """
+    
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.current = [0] * _BUCKET_COUNT
+        self.previous = [0] * _BUCKET_COUNT
+        self.window_start = time()
+        self.total_count = 0
+        self.total_sum = 0.0
+    
+    def record(self, seconds):
+        """Bitta o'lchovni qo'shish"""
+        now = time()
+        if now - self.window_start >= self.window_seconds:
+            self.previous = self.current
+            self.current = [0] * _BUCKET_COUNT
+            self.window_start = now
+        
+        self.current[_bucket_index(seconds)] += 1
+        self.total_count += 1
+        self.total_sum += seconds
+    
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        """Kvantillarni hisoblash (bucket yuqori chegarasi bo'yicha, ~10% aniqlik)"""
+        counts = [c + p for c, p in zip(self.current, self.previous)]
+        total = sum(counts)
+        if total == 0:
+            return {q: 0.0 for q in qs}
+        
+        result = {}
+        targets = sorted(qs)
+        cumulative = 0
+        t = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            while t < len(targets) and cumulative >= targets[t] * total:
+                result[targets[t]] = _bucket_upper(index)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+    
+    def window_count(self):
+        """Oxirgi oynalardagi o'lchovlar soni"""
+        return sum(self.current) + sum(self.previous)
+
+class StageTimer:
+    """Bitta kadr ichida bosqichlar vaqtini yig'ish (bosqichlar aralash kelishi mumkin)
+    
+    lap(stage) oldingi lap dan beri o'tgan vaqtni shu bosqichga qo'shadi.
+    """
+    __slots__ = ('totals', 'start', 'last')
+    
+    def __init__(self):
+        self.totals = {}
+        self.start = self.last = perf_counter()
+    
+    def lap(self, stage):
+        """Oxirgi belgidan beri o'tgan vaqtni bosqichga yozish"""
+        now = perf_counter()
+        self.totals[stage] = self.totals.get(stage, 0.0) + now - self.last
+        self.last = now
+
+class PipelineMetrics:
+    """Bitta kamera uchun bosqich kechikishlari, hisoblagichlar va navbat chuqurliklari"""
+    
+    STAGES = ('decode', 'inference', 'postprocess', 'polygon', 'tracker', 'ocr',
+              'drawing', 'recording', 'display', 'total')
+    
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.window_seconds = METRICS_SETTINGS['window_seconds']
+        self.histograms = {stage: LatencyHistogram(self.window_seconds) for stage in self.STAGES}
+        self.counters = {'frames': 0, 'dropped_frames': 0, 'display_frames_skipped': 0}
+        self.gauges = {}
+        
+        # Silliqlangan FPS (kadrlar orasidagi vaqt bo'yicha)
+        self.fps = 0.0
+        self._last_frame_time = None
+        self.last_frame_wall = None  # Oxirgi kadr tugagan vaqt (health tekshiruvi uchun)
+    
+    def record(self, stage, seconds):
+        """Bosqich davomiyligini yozish"""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram(self.window_seconds)
+        histogram.record(seconds)
+    
+    def record_frame(self, timer):
+        """StageTimer da yig'ilgan bosqich vaqtlarini gistogrammalarga yozish"""
+        for stage, seconds in timer.totals.items():
+            self.record(stage, seconds)
+    
+    def stage_totals(self, stage):
+        """Bosqich o'lchovlari soni va yig'indisi (ikki o'qish farqi - shu oraliqdagi o'rtacha kechikish)"""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            return 0, 0.0
+        return histogram.total_count, histogram.total_sum
+    
+    def increment(self, counter, value=1):
+        """Hisoblagichni oshirish"""
+        self.counters[counter] = self.counters.get(counter, 0) + value
+    
+    def set_gauge(self, name, value):
+        """Joriy qiymatni (masalan, navbat chuqurligi) yozish"""
+        self.gauges[name] = value
+    
+    def mark_frame(self):
+        """Kadr tugadi - FPS ni yangilash"""
+        now = perf_counter()
+        if self._last_frame_time is not None:
+            interval = now - self._last_frame_time
+            if interval > 0:
+                instant_fps = 1.0 / interval
+                alpha = METRICS_SETTINGS['fps_smoothing']
+                self.fps = instant_fps if self.fps == 0 else alpha * self.fps + (1 - alpha) * instant_fps
+        self._last_frame_time = now
+        self.last_frame_wall = time()
+        self.counters['frames'] += 1
+    
+    def snapshot(self):
+        """Metrikalarning o'zgarmas nusxasi (boshqa threadlar o'qishi uchun)"""
+        stages = {}
+        for stage, histogram in list(self.histograms.items()):
+            if histogram.total_count == 0:
+                continue
+            q = histogram.quantiles()
+            stages[stage] = {
+                'p50': q[0.5],
+                'p95': q[0.95],
+                'p99': q[0.99],
+                'count': histogram.total_count,
+                'sum': histogram.total_sum
+            }
+        
+        return {
+            'camera_id': self.camera_id,
+            'fps': self.fps,
+            'stages': stages,
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'last_frame_time': self.last_frame_wall,
+            'time': time()
+        }
+    
+    def format_summary(self):
+        """Qisqa matnli hisobot (p50/p95/p99, ms)"""
+        snapshot = self.snapshot()
+        lines = [f"Kamera {self.camera_id}: FPS {snapshot['fps']:.1f}, "
+                 f"tashlangan kadrlar: {snapshot['counters']['dropped_frames']}"]
+        for stage in self.STAGES:
+            if stage in snapshot['stages']:
+                s = snapshot['stages'][stage]
+                lines.append(f"  {stage:12s} p50 {s['p50'] * 1000:7.2f}ms | "
+                             f"p95 {s['p95'] * 1000:7.2f}ms | p99 {s['p99'] * 1000:7.2f}ms")
+        return '\n'.join(lines)
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+RailSafeAI - Prometheus /metrics va /health HTTP serveri moduli
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from time import time
+from config.settings import METRICS_SETTINGS
+
+# Kamera gauge nomlari -> Prometheus metrika nomi va turi
+_CAMERA_GAUGES = {
+    'active_tracks': ('railsafe_active_tracks', 'gauge', "Kadrdagi kuzatilayotgan avtomobillar"),
+    'vehicles_in_polygon': ('railsafe_vehicles_in_polygon', 'gauge', "Polygon ichidagi avtomobillar"),
+    'vehicles_counted': ('railsafe_vehicles_counted_total', 'counter', "Polygondan o'tgan avtomobillar"),
+    'vehicle_recordings': ('railsafe_vehicle_recordings', 'gauge', "Faol avtomobil yozuvlari")
+}
+
+# Navbat gauge lari bitta metrikaga 'queue' yorlig'i bilan yig'iladi
+_QUEUE_GAUGES = ('segment_jobs', 'clip_jobs', 'snapshot_jobs', 'ocr_pending', 'archive_pending', 'alert_pending')
+
+_COUNTERS = {
+    'frames': ('railsafe_frames_total', "Qayta ishlangan kadrlar"),
+    'dropped_frames': ('railsafe_dropped_frames_total', "O'qilmagan (tashlangan) kadrlar"),
+    'display_frames_skipped': ('railsafe_display_frames_skipped_total', "Ekranga chiqmay qolgan kadrlar")
+}
+
+def _escape(value):
+    """Prometheus yorlig'i qiymatini ekranlash"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _MetricsWriter:
+    """Prometheus text formatini yig'ish (bir metrika qatorlari HELP/TYPE ostida birga guruhlanadi)"""
+    
+    def __init__(self):
+        self.families = {}  # {nom: [qatorlar]} - qo'shilish tartibida
+    
+    def add(self, name, metric_type, help_text, value, labels=None, family=None):
+        family = family or name
+        lines = self.families.get(family)
+        if lines is None:
+            lines = self.families[family] = [f"# HELP {family} {help_text}", f"# TYPE {family} {metric_type}"]
+        if labels:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            lines.append(f"{name} {value}")
+    
+    def render(self):
+        return '\n'.join(line for lines in self.families.values() for line in lines) + '\n'
+
+class MetricsServer:
+    """Fon threadda ishlaydigan kichik HTTP server: /metrics, /health va /traffic
+    
+    Kamera threadlari hech qanday lock ushlamaydi - server faqat PipelineMetrics nusxalarini o'qiydi.
+    """
+    
+    def __init__(self, system, host=None, port=None):
+        self.system = system  # RailSafeAI: camera_processors, camera_threads, recorder
+        self.host = host or METRICS_SETTINGS['http_host']
+        self.port = port or METRICS_SETTINGS['http_port']
+        self.started_at = time()
+        self.httpd = None
+        self._thread = None
+    
+    def start(self):
+        """Serverni fon threadda ishga tushirish"""
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path
+                if path == '/metrics':
+                    server._respond(self, 200, 'text/plain; version=0.0.4; charset=utf-8', server.render_metrics())
+                elif path == '/health':
+                    status, payload = server.check_health()
+                    server._respond(self, status, 'application/json', json.dumps(payload, indent=2))
+                elif path == '/traffic':
+                    status, payload = server.render_traffic(parse_qs(url.query))
+                    server._respond(self, status, 'application/json', json.dumps(payload, indent=2))
+                else:
+                    server._respond(self, 404, 'text/plain', "Topilmadi\n")
+            
+            def log_message(self, format, *args):
+                pass  # Har bir so'rovni konsolga chiqarmaslik
+        
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.httpd.daemon_threads = True
+        except OSError as e:
+            print(f"Xato metrika serverini ishga tushirishda ({self.host}:{self.port}): {e}")
+            return False
+        
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Metrikalar: http://{self.host}:{self.port}/metrics | http://{self.host}:{self.port}/health")
+        return True
+    
+    def _respond(self, handler, status, content_type, body):
+        """HTTP javobini yuborish"""
+        data = body.encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+    
+    def render_traffic(self, query):
+        """Harakat statistikasi: /traffic?resolution=minute|hour&camera=..&since=<unix>&summary=1"""
+        stats = self.system.tracker.traffic_stats
+        resolution = query.get('resolution', ['minute'])[0]
+        camera_id = query.get('camera', [None])[0]
+        try:
+            since = float(query['since'][0]) if 'since' in query else None
+            if query.get('summary', ['0'])[0] == '1':
+                return 200, stats.get_summary(resolution, camera_id, since)
+            return 200, stats.get_series(resolution, camera_id, since)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+    
+    def render_metrics(self):
+        """Barcha metrikalarni Prometheus text formatida yig'ish"""
+        out = _MetricsWriter()
+        out.add('railsafe_uptime_seconds', 'gauge', "Tizim ishlash vaqti", f"{time() - self.started_at:.1f}")
+        
+        for camera_id, processor in list(self.system.camera_processors.items()):
+            snapshot = processor.metrics.snapshot()
+            labels = {'camera': camera_id}
+            
+            out.add('railsafe_fps', 'gauge', "Silliqlangan kadr tezligi", f"{snapshot['fps']:.3f}", labels)
+            
+            for stage, stats in snapshot['stages'].items():
+                stage_labels = {'camera': camera_id, 'stage': stage}
+                for key, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+                    out.add('railsafe_stage_latency_seconds', 'summary', "Bosqich kechikishi (aylanma oyna)",
+                            f"{stats[key]:.6f}", dict(stage_labels, quantile=quantile))
+                # summary ning _count/_sum qatorlari shu metrika oilasiga tegishli
+                out.add('railsafe_stage_latency_seconds_count', 'summary', None, stats['count'],
+                        stage_labels, family='railsafe_stage_latency_seconds')
+                out.add('railsafe_stage_latency_seconds_sum', 'summary', None, f"{stats['sum']:.6f}",
+                        stage_labels, family='railsafe_stage_latency_seconds')
+            
+            for counter, (name, help_text) in _COUNTERS.items():
+                out.add(name, 'counter', help_text, snapshot['counters'].get(counter, 0), labels)
+            
+            gauges = snapshot['gauges']
+            for gauge, (name, metric_type, help_text) in _CAMERA_GAUGES.items():
+                if gauge in gauges:
+                    out.add(name, metric_type, help_text, gauges[gauge], labels)
+            for queue in _QUEUE_GAUGES:
+                if queue in gauges:
+                    out.add('railsafe_queue_depth', 'gauge', "Fon navbatlari chuqurligi",
+                            gauges[queue], {'camera': camera_id, 'queue': queue})
+            
+            # Manba uzilishlari va qayta ulanishlar
+            source = getattr(processor.cap, 'get_stats', None)
+            if source is not None:
+                stats = source()
+                out.add('railsafe_source_connected', 'gauge', "Manba ulangan", int(stats['connected']), labels)
+                out.add('railsafe_source_outages_total', 'counter', "Manba uzilishlari", stats['outages'], labels)
+                out.add('railsafe_source_reconnects_total', 'counter', "Muvaffaqiyatli qayta ulanishlar",
+                        stats['reconnects'], labels)
+                out.add('railsafe_source_outage_seconds_total', 'counter', "Uzilishlar umumiy davomiyligi (joriysi bilan)",
+                        f"{stats['outage_seconds'] + stats['current_outage_seconds']:.2f}", labels)
+            
+            # Xizmat sifati darajasi (0 - to'liq sifat) va rejalashtiruvchi o'lchagan kechikish
+            out.add('railsafe_qos_level', 'gauge', "QoS soddalashtirish darajasi", processor.qos_level, labels)
+            imgsz = processor.detector.track_args.get('imgsz')
+            if imgsz:
+                out.add('railsafe_inference_size', 'gauge', "Inference o'lchami (kalibrlangan, QoS bilan)", imgsz, labels)
+            tiles = processor.detector.get_tile_count()
+            if tiles:
+                out.add('railsafe_inference_tiles', 'gauge', "Bir kadrdagi inference bo'laklari (bo'laklab aniqlash)", tiles, labels)
+            qos = getattr(self.system, 'qos_scheduler', None)
+            latency = qos.get_latency_ms(camera_id) if qos is not None else None
+            if latency is not None:
+                out.add('railsafe_qos_frame_latency_seconds', 'gauge', "Oxirgi QoS oralig'idagi o'rtacha kadr ishlov vaqti",
+                        f"{latency / 1000.0:.6f}", labels)
+                out.add('railsafe_qos_target_latency_seconds', 'gauge', "Kadr ishlov vaqti chegarasi",
+                        f"{processor.cam_config['target_latency_ms'] / 1000.0:.6f}", labels)
+        
+        # Disk ishlatilishi (saqlash indeksidan - diskni skanerlamasdan)
+        usage = self.system.recorder.retention.get_usage()
+        for kind, size in usage['kind_bytes'].items():
+            out.add('railsafe_output_bytes', 'gauge', "Natija fayllari hajmi", size, {'kind': kind})
+        for key, size in usage['camera_bytes'].items():
+            camera_id, kind = key.split('/', 1)
+            out.add('railsafe_camera_output_bytes', 'gauge', "Kamera natija fayllari hajmi", size,
+                    {'camera': camera_id, 'kind': kind})
+        out.add('railsafe_output_files', 'gauge', "Indeksdagi natija fayllari", usage['files'])
+        out.add('railsafe_evicted_files_total', 'counter', "Kvota bo'yicha o'chirilgan fayllar", usage['evicted_files'])
+        out.add('railsafe_evicted_bytes_total', 'counter', "Kvota bo'yicha o'chirilgan baytlar", usage['evicted_bytes'])
+        
+        # Hodisalar shinasining async obunachilari
+        for name, stats in self.system.tracker.events.get_stats().items():
+            out.add('railsafe_event_queue_depth', 'gauge', "Hodisa obunachisi navbati", stats['queue'], {'subscriber': name})
+            out.add('railsafe_events_dropped_total', 'counter', "Navbat to'lgani uchun tashlangan hodisalar",
+                    stats['dropped'], {'subscriber': name})
+            out.add('railsafe_event_errors_total', 'counter', "Hodisa ishlovchisi xatolari", stats['errors'],
+                    {'subscriber': name})
+        
+        # Ogohlantirishlar yetkazilishi (navbatga qo'yilgan, yuborilgan, yuborilmagan, tashlangan)
+        dispatcher = getattr(self.system, 'alert_dispatcher', None)
+        if dispatcher is not None:
+            for result, count in dispatcher.stats.items():
+                out.add('railsafe_alerts_total', 'counter', "Ogohlantirishlar", count, {'result': result})
+        
+        # Kamera nazoratchisi va modellar zaxirasi
+        for camera_id, state in list(getattr(self.system, 'camera_restarts', {}).items()):
+            out.add('railsafe_camera_restarts_total', 'counter', "Kamera qayta ishga tushirishlari", state['total'],
+                    {'camera': camera_id})
+        qos = getattr(self.system, 'qos_scheduler', None)
+        if qos is not None:
+            for direction in ('degraded', 'restored'):
+                out.add('railsafe_qos_changes_total', 'counter', "QoS darajasi o'zgarishlari", qos.stats[direction],
+                        {'direction': direction})
+        pool = getattr(self.system, 'model_pool', None)
+        if pool is not None:
+            out.add('railsafe_model_pool_idle', 'gauge', "Zaxiradagi tayyor modellar", pool.get_idle_count())
+            for result in ('warm_hits', 'cold_loads'):
+                out.add('railsafe_model_acquire_total', 'counter', "Kameralarga berilgan modellar",
+                        pool.stats[result], {'result': result})
+        
+        return out.render()
+    
+    def check_health(self):
+        """Kameralar ishlayaptimi va kadrlar kelyaptimi: (HTTP status, JSON)"""
+        now = time()
+        stale_after = METRICS_SETTINGS['health_stale_seconds']
+        cameras = {}
+        healthy = bool(self.system.camera_processors)
+        
+        for camera_id, processor in list(self.system.camera_processors.items()):
+            thread = self.system.camera_threads.get(camera_id)
+            last_frame = processor.metrics.last_frame_wall
+            age = now - last_frame if last_frame is not None else None
+            ok = (thread is not None and thread.is_alive() and age is not None and age <= stale_after)
+            cameras[camera_id] = {
+                'ok': ok,
+                'running': processor.running,
+                'source_connected': processor.cap.is_connected() if hasattr(processor.cap, 'is_connected') else None,
+                'last_frame_age': round(age, 2) if age is not None else None,
+                'fps': round(processor.metrics.fps, 2)
+            }
+            healthy = healthy and ok
+        
+        payload = {'status': 'ok' if healthy else 'degraded', 'cameras': cameras}
+        return (200 if healthy else 503), payload
+    
+    def stop(self):
+        """Serverni to'xtatish"""
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
\ No newline at end of file
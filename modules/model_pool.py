@@ -0,0 +1,117 @@
+"""
+RailSafeAI - Oldindan yuklangan va qizdirilgan YOLO modellari zaxirasi moduli
+"""
+import threading
+from collections import deque
+import numpy as np
+from config.settings import MODEL_POOL_SETTINGS
+from modules.event_log import get_logger
+
+logger = get_logger('model_pool')
+
+class ModelPool:
+    """Yangi kameralar uchun tayyor modellar: fon threadi doim `warm_spares` ta modelni yuklab, qizdirib turadi
+    
+    Kamera qo'shilganda acquire() tayyor modelni darhol beradi (yuklash va birinchi inference
+    kechikishi kamerada bo'lmaydi), zaxira fon threadida to'ldiriladi. Kuzatuv (track) holati bor
+    model qaytarilganda qayta ishlatilmaydi: ultralytics trackerini tozalash track ID hisoblagichini
+    ham nolga tushiradi, u esa barcha kameralar uchun umumiy.
+    """
+    
+    def __init__(self, model_path, spares=None, loader=None):
+        self.model_path = model_path
+        self.spares = spares if spares is not None else MODEL_POOL_SETTINGS['warm_spares']
+        self.loader = loader or self._load_yolo
+        self.idle = deque()
+        self.loading = 0
+        self.cond = threading.Condition()
+        self.stats = {'loaded': 0, 'warm_hits': 0, 'cold_loads': 0, 'reused': 0, 'failed': 0}
+        self._stopping = False
+        self._available = True  # ultralytics yo'q bo'lsa fon yuklash to'xtatiladi
+        self._thread = None
+        if self.spares > 0:
+            self._thread = threading.Thread(target=self._run_filler, name='model-pool', daemon=True)
+            self._thread.start()
+    
+    def _load_yolo(self):
+        from ultralytics import YOLO
+        return YOLO(self.model_path)
+    
+    def _load_warm(self):
+        """Model yuklash va qora kadrda bir necha marta inference (og'irliklar qurilmaga, yadrolar tayyor)"""
+        model = self.loader()
+        width, height = MODEL_POOL_SETTINGS['warmup_size']
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        for _ in range(MODEL_POOL_SETTINGS['warmup_runs']):
+            model.predict(frame, verbose=False)
+        return model
+    
+    def _run_filler(self):
+        """Zaxirani to'ldirish (yuklash xatosida retry_interval kutiladi)"""
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self._stopping or len(self.idle) + self.loading < self.spares)
+                if self._stopping:
+                    return
+                self.loading += 1
+            
+            model = None
+            try:
+                model = self._load_warm()
+                logger.info("Zaxira model yuklandi va qizdirildi: %s", self.model_path)
+            except ImportError as e:
+                self._available = False
+                logger.error("Zaxira modellar yuklanmaydi: %s", e)
+            except Exception as e:
+                logger.error("Xato zaxira modelni yuklashda: %s", e)
+            
+            with self.cond:
+                self.loading -= 1
+                if model is not None:
+                    self.idle.append(model)
+                    self.stats['loaded'] += 1
+                else:
+                    self.stats['failed'] += 1
+                self.cond.notify_all()
+                if model is None:
+                    if not self._available:
+                        return
+                    self.cond.wait_for(lambda: self._stopping, MODEL_POOL_SETTINGS['retry_interval'])
+    
+    def acquire(self, timeout=None):
+        """Tayyor modelni olish; zaxira yuklanayotgan bo'lsa uni kutadi, bo'lmasa shu threadda yuklaydi"""
+        timeout = timeout if timeout is not None else MODEL_POOL_SETTINGS['acquire_timeout']
+        with self.cond:
+            if not self.idle and self.loading:
+                self.cond.wait_for(lambda: self.idle or not self.loading, timeout)
+            if self.idle:
+                model = self.idle.popleft()
+                self.stats['warm_hits'] += 1
+                self.cond.notify_all()  # Fon threadi zaxirani to'ldiradi
+                return model
+            self.stats['cold_loads'] += 1
+        return self._load_warm()
+    
+    def release(self, model):
+        """Kamera olib tashlanganda modelni qaytarish (faqat kuzatuv holati yo'q bo'lsa zaxiraga)"""
+        if model is None:
+            return
+        if hasattr(getattr(model, 'predictor', None), 'trackers'):
+            return  # Xotiradan bo'shatiladi, zaxira fon threadida yangisi bilan to'ldiriladi
+        with self.cond:
+            if not self._stopping and len(self.idle) < self.spares:
+                self.idle.append(model)
+                self.stats['reused'] += 1
+                self.cond.notify_all()
+    
+    def get_idle_count(self):
+        return len(self.idle)
+    
+    def stop(self):
+        """Fon yuklashni to'xtatish va zaxiradagi modellarni bo'shatish"""
+        with self.cond:
+            self._stopping = True
+            self.idle.clear()
+            self.cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
\ No newline at end of file
@@ -1,7 +1,8 @@
 """
 RailSafeAI - OCR raqam o'qish moduli (hozircha o'chirilgan)
 """
-from config.settings import OCR_ENABLED
+from config.settings import OCR_ENABLED, OCR_SETTINGS
+from modules.ocr_worker import OCRWorkerPool, extract_plate_region
 import cv2
 
 class OCRReader:
@@ -10,6 +11,7 @@ class OCRReader:
     def __init__(self):
         self.enabled = OCR_ENABLED
         self.ocr_engine = None
+        self.worker_pool = None  # Alohida jarayonlardagi OCR ishchilari
         
         if self.enabled:
             self._initialize_ocr()
@@ -17,6 +19,19 @@ class OCRReader:
     def _initialize_ocr(self):
         """OCR dvigatelni ishga tushirish"""
         try:
+            # OCR alohida jarayonlarda - kamera threadi tanib olishni kutmaydi
+            if OCR_SETTINGS['use_worker_pool']:
+                self.worker_pool = OCRWorkerPool(
+                    OCR_SETTINGS['engine'],
+                    OCR_SETTINGS['languages'],
+                    workers=OCR_SETTINGS['workers'],
+                    batch_size=OCR_SETTINGS['batch_size'],
+                    batch_timeout=OCR_SETTINGS['batch_timeout'],
+                    max_pending=OCR_SETTINGS['max_pending']
+                )
+                print(f"OCR ishchilari ishga tushirildi: {OCR_SETTINGS['workers']} jarayon ({OCR_SETTINGS['engine']})")
+                return
+            
             # Bu yerda OCR kutubxonasini yuklash kerak (masalan, EasyOCR, PaddleOCR)
             # import easyocr
             # self.ocr_engine = easyocr.Reader(['en', 'uz'])
@@ -33,10 +48,14 @@ class OCRReader:
         """OCR yoqilganligini tekshirish"""
         return self.enabled
     
+    def is_async(self):
+        """OCR alohida jarayonlarda (asinxron) bajariladimi"""
+        return self.worker_pool is not None
+    
     def set_enabled(self, enabled):
         """OCR ni yoqish/o'chirish"""
         self.enabled = enabled
-        if enabled and self.ocr_engine is None:
+        if enabled and self.ocr_engine is None and self.worker_pool is None:
             self._initialize_ocr()
         
         status = "YOQILDI" if enabled else "O'CHIRILDI"
@@ -69,6 +88,28 @@ class OCRReader:
             print(f"OCR da xato: {e}")
             return None
     
+    def read_license_plate_async(self, frame, bbox, callback):
+        """Raqam hududini topib, uni OCR ishchilariga yuborish; natija callback(plate_info) orqali keladi"""
+        if not self.enabled or self.worker_pool is None:
+            return False
+        
+        # Faqat kichik raqam hududi jarayonlararo uzatiladi
+        plate_crop = extract_plate_region(frame, bbox)
+        if plate_crop is None:
+            return False
+        
+        return self.worker_pool.submit(plate_crop, callback)
+    
+    def stop(self):
+        """OCR ishchilarini to'xtatish"""
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+            self.worker_pool = None
+    
+    def get_queue_depth(self):
+        """OCR ishchilariga yuborilishini kutayotgan so'rovlar soni"""
+        return self.worker_pool.requests.qsize() if self.worker_pool is not None else 0
+    
     def process_vehicle_for_ocr(self, frame, vehicle_info):
         """Avtomobil uchun OCR ishlov berish"""
         if not self.enabled:
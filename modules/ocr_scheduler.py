@@ -0,0 +1,173 @@
+"""
+RailSafeAI - OCR rejalashtirish moduli (har bir track uchun kesh va ko'p kadrli ovoz berish)
+"""
+import threading
+from time import perf_counter
+from config.settings import OCR_SETTINGS
+from modules.snapshot_selector import estimate_sharpness
+
+class OCRScheduler:
+    """OCR ni har kadrda emas, faqat tanlangan sifatli kadrlarda ishga tushirish"""
+    
+    def __init__(self, ocr_reader):
+        self.ocr_reader = ocr_reader
+        self.tracks = {}      # {(camera_id, track_id): track_state}
+        self.deadlines = {}   # {camera_id: joriy kadr uchun OCR vaqt chegarasi}
+        self.lock = threading.Lock()
+        
+        # Statistika
+        self.ocr_calls = 0
+        self.skipped_by_budget = 0
+    
+    def begin_frame(self, camera_id):
+        """Yangi kadr boshlanishi - shu kadr uchun OCR vaqt byudjetini belgilash"""
+        self.deadlines[camera_id] = perf_counter() + OCR_SETTINGS['frame_budget_ms'] / 1000.0
+    
+    def _new_state(self):
+        """Track uchun boshlang'ich holat"""
+        return {
+            'attempts': 0,
+            'last_attempt_frame': None,
+            'best_quality': 0.0,   # Shu paytgacha OCR qilingan eng yaxshi kadr sifati
+            'reads': [],           # [(matn, ishonch), ...]
+            'result': None,        # Ovoz berish natijasi (chizish uchun formatda)
+            'inflight': False,     # OCR ishchilarida javob kutilmoqda
+            'final': False
+        }
+    
+    def process(self, camera_id, frame_index, frame, vehicle, vehicle_info):
+        """Avtomobil uchun OCR natijasini qaytarish; kerak bo'lsa OCR ni ishga tushirish"""
+        key = (camera_id, vehicle['track_id'])
+        with self.lock:
+            state = self.tracks.get(key)
+            if state is None:
+                state = self.tracks[key] = self._new_state()
+        
+        if not state['final'] and not state['inflight'] and \
+                self._should_attempt(camera_id, frame_index, frame, vehicle, state):
+            if self.ocr_reader.is_async():
+                # Natija keyinroq ishchi jarayondan callback orqali keladi
+                submitted = self.ocr_reader.read_license_plate_async(
+                    frame, vehicle['bbox'],
+                    lambda plate_info: self._on_async_read(key, plate_info, vehicle_info)
+                )
+                if submitted:
+                    state['inflight'] = True
+                    self._count_attempt(state, frame_index)
+            else:
+                plate_info = self.ocr_reader.read_license_plate(frame, vehicle['bbox'])
+                self._count_attempt(state, frame_index)
+                self._record_read(state, plate_info, vehicle_info)
+        
+        return state['result']
+    
+    def _count_attempt(self, state, frame_index):
+        """OCR urinishini hisobga olish"""
+        self.ocr_calls += 1
+        state['attempts'] += 1
+        state['last_attempt_frame'] = frame_index
+        if state['attempts'] >= OCR_SETTINGS['max_attempts']:
+            state['final'] = True
+    
+    def _on_async_read(self, key, plate_info, vehicle_info):
+        """OCR ishchisidan kelgan natijani tegishli trackka qo'shish"""
+        with self.lock:
+            state = self.tracks.get(key)
+            if state is None:
+                return  # Track allaqachon tugagan
+            state['inflight'] = False
+            self._record_read(state, plate_info, vehicle_info)
+    
+    def _record_read(self, state, plate_info, vehicle_info):
+        """O'qish natijasini ovozlarga qo'shish va raqamni trackka biriktirish"""
+        if plate_info and plate_info['text'] and plate_info['confidence'] >= OCR_SETTINGS['min_read_confidence']:
+            state['reads'].append((plate_info['text'], plate_info['confidence']))
+            self._vote(state)
+            
+            # Yakuniy raqamni trackka biriktirish
+            if vehicle_info is not None and state['result'] is not None:
+                vehicle_info['license_plate'] = state['result']['license_plate']
+                vehicle_info['plate_confidence'] = state['result']['confidence']
+    
+    def _should_attempt(self, camera_id, frame_index, frame, vehicle, state):
+        """Kadr OCR uchun yetarlicha yaxshimi va vaqt byudjeti qoldimi"""
+        x1, y1, x2, y2 = vehicle['bbox']
+        area = max(x2 - x1, 0) * max(y2 - y1, 0)
+        if area < OCR_SETTINGS['min_bbox_area'] or vehicle['confidence'] < OCR_SETTINGS['min_confidence']:
+            return False
+        
+        last = state['last_attempt_frame']
+        if last is not None and frame_index - last < OCR_SETTINGS['min_frame_interval']:
+            return False
+        
+        # Oldingi urinishdan sezilarli yaxshi bo'lmagan kadr o'tkazib yuboriladi
+        quality = area * vehicle['confidence']
+        if quality < state['best_quality'] * OCR_SETTINGS['quality_gain']:
+            return False
+        
+        if perf_counter() >= self.deadlines.get(camera_id, 0):
+            self.skipped_by_budget += 1
+            return False
+        
+        # Aniqlik faqat yuqoridagi arzon filtrlardan o'tgan kadr uchun hisoblanadi
+        h, w = frame.shape[:2]
+        crop = frame[max(y1, 0):min(y2, h), max(x1, 0):min(x2, w)]
+        if crop.size == 0 or estimate_sharpness(crop) < OCR_SETTINGS['min_sharpness']:
+            return False
+        
+        state['best_quality'] = quality
+        return True
+    
+    def _vote(self, state):
+        """O'qishlarni ishonch bo'yicha vaznli ovoz berish orqali birlashtirish"""
+        # Eng ko'p vaznga ega uzunlik tanlanadi, keyin har bir pozitsiya bo'yicha belgi ovozi
+        length_weights = {}
+        for text, confidence in state['reads']:
+            length_weights[len(text)] = length_weights.get(len(text), 0) + confidence
+        length = max(length_weights, key=length_weights.get)
+        
+        same_length = [(text, confidence) for text, confidence in state['reads'] if len(text) == length]
+        plate = []
+        position_scores = []
+        for i in range(length):
+            char_weights = {}
+            for text, confidence in same_length:
+                char_weights[text[i]] = char_weights.get(text[i], 0) + confidence
+            char = max(char_weights, key=char_weights.get)
+            plate.append(char)
+            position_scores.append(char_weights[char] / sum(char_weights.values()))
+        
+        total_weight = sum(confidence for _, confidence in state['reads'])
+        agreement = length_weights[length] / total_weight * min(position_scores) if position_scores else 0
+        mean_confidence = length_weights[length] / len(same_length)
+        
+        state['result'] = {
+            'license_plate': ''.join(plate),
+            'confidence': agreement * mean_confidence,
+            'votes': len(state['reads']),
+            'timestamp': None
+        }
+        
+        if (len(state['reads']) >= OCR_SETTINGS['finalize_votes'] and
+                state['result']['confidence'] >= OCR_SETTINGS['finalize_confidence']):
+            state['final'] = True
+    
+    def get_plate(self, camera_id, track_id):
+        """Track uchun joriy (ovoz berilgan) raqam natijasi"""
+        state = self.tracks.get((camera_id, track_id))
+        return state['result'] if state else None
+    
+    def cleanup(self, camera_id, known_track_ids):
+        """Trackerda qolmagan tracklar holatini o'chirish"""
+        known_track_ids = set(known_track_ids)
+        with self.lock:
+            for key in [key for key in self.tracks if key[0] == camera_id and key[1] not in known_track_ids]:
+                del self.tracks[key]
+    
+    def get_statistics(self):
+        """OCR rejalashtirish statistikasi"""
+        return {
+            'tracks': len(self.tracks),
+            'ocr_calls': self.ocr_calls,
+            'skipped_by_budget': self.skipped_by_budget
+        }
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+RailSafeAI - Alohida jarayonlarda ishlaydigan OCR ishchilari va raqam hududini topish moduli
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from queue import Queue, Empty, Full
+import cv2
+import numpy as np
+
+def localize_plate(vehicle_crop):
+    """Avtomobil rasmidan raqam hududini arzon usulda topish (morfologiya + Sobel)
+    
+    Qaytaradi: (x1, y1, x2, y2) - vehicle_crop koordinatalarida yoki None
+    """
+    h, w = vehicle_crop.shape[:2]
+    if h < 20 or w < 40:
+        return None
+    
+    # Tezlik uchun kichraytirilgan kulrang nusxada ishlanadi
+    scale = min(1.0, 320.0 / w)
+    small = cv2.resize(vehicle_crop, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) \
+        if scale < 1.0 else vehicle_crop
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    
+    # Qorong'i fondagi yorug' belgilar (va aksincha) - blackhat + gorizontal gradient
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    blackhat = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, kernel)
+    gradient = cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=3)
+    gradient = cv2.convertScaleAbs(gradient)
+    gradient = cv2.morphologyEx(gradient, cv2.MORPH_CLOSE, kernel)
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    mask = cv2.erode(mask, None, iterations=1)
+    mask = cv2.dilate(mask, None, iterations=2)
+    
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    small_h, small_w = gray.shape[:2]
+    best = None
+    best_score = 0
+    for contour in contours:
+        x, y, cw, ch = cv2.boundingRect(contour)
+        aspect = cw / float(max(ch, 1))
+        # Raqam odatda cho'zinchoq va avtomobilning pastki qismida bo'ladi
+        if not 2.0 <= aspect <= 7.0 or cw < small_w * 0.1 or y < small_h * 0.3:
+            continue
+        score = cw * ch * (0.5 + y / float(small_h))
+        if score > best_score:
+            best, best_score = (x, y, cw, ch), score
+    
+    if best is None:
+        return None
+    
+    x, y, cw, ch = best
+    pad_x, pad_y = int(cw * 0.1), int(ch * 0.2)
+    return (max(int((x - pad_x) / scale), 0), max(int((y - pad_y) / scale), 0),
+            min(int((x + cw + pad_x) / scale), w), min(int((y + ch + pad_y) / scale), h))
+
+def extract_plate_region(frame, bbox, max_width=320):
+    """Kadrdan faqat raqam hududini kesib olish (topilmasa - pastki o'rta qism)"""
+    frame_h, frame_w = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    x1, y1 = max(int(x1), 0), max(int(y1), 0)
+    x2, y2 = min(int(x2), frame_w), min(int(y2), frame_h)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    
+    vehicle_crop = frame[y1:y2, x1:x2]
+    region = localize_plate(vehicle_crop)
+    if region is not None:
+        rx1, ry1, rx2, ry2 = region
+        plate = vehicle_crop[ry1:ry2, rx1:rx2]
+    else:
+        h, w = vehicle_crop.shape[:2]
+        plate = vehicle_crop[h // 2:, w // 6:w - w // 6]
+    
+    if plate.size == 0:
+        return None
+    
+    # Jarayonlararo uzatish hajmini cheklash
+    if plate.shape[1] > max_width:
+        scale = max_width / float(plate.shape[1])
+        plate = cv2.resize(plate, (max_width, max(int(plate.shape[0] * scale), 1)), interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(plate)
+
+# ===== Ishchi jarayon ichidagi qism =====
+_ENGINE = None
+_ENGINE_NAME = None
+
+def _init_worker(engine_name, languages):
+    """Ishchi jarayonda OCR dvigatelni bir marta yuklash"""
+    global _ENGINE, _ENGINE_NAME
+    _ENGINE_NAME = engine_name
+    try:
+        if engine_name == 'easyocr':
+            import easyocr
+            _ENGINE = easyocr.Reader(languages, gpu=False, verbose=False)
+        elif engine_name == 'paddleocr':
+            from paddleocr import PaddleOCR
+            _ENGINE = PaddleOCR(use_angle_cls=False, lang='en', show_log=False)
+        else:
+            print(f"Noma'lum OCR dvigateli: {engine_name}")
+    except ImportError:
+        print(f"OCR kutubxonasi ({engine_name}) ishchi jarayonda topilmadi")
+    except Exception as e:
+        print(f"OCR ishchisini ishga tushirishda xato: {e}")
+
+def _recognize(image):
+    """Bitta raqam rasmini o'qish: (matn, ishonch) yoki None"""
+    if _ENGINE is None:
+        return None
+    
+    if _ENGINE_NAME == 'easyocr':
+        detections = _ENGINE.readtext(image)
+        # Chapdan o'ngga tartiblab birlashtirish
+        detections = sorted(detections, key=lambda d: min(p[0] for p in d[0]))
+        parts = [(text, conf) for _, text, conf in detections]
+    else:
+        output = _ENGINE.ocr(image, cls=False)
+        lines = output[0] if output and output[0] else []
+        lines = sorted(lines, key=lambda line: min(p[0] for p in line[0]))
+        parts = [(text, conf) for _, (text, conf) in lines]
+    
+    text = ''.join(''.join(ch for ch in part if ch.isalnum()).upper() for part, _ in parts)
+    if not text:
+        return None
+    return text, float(sum(conf for _, conf in parts) / len(parts))
+
+def _recognize_batch(images):
+    """Paket holidagi rasmlarni o'qish (ishchi jarayonda bajariladi)"""
+    results = []
+    for image in images:
+        try:
+            results.append(_recognize(image))
+        except Exception:
+            results.append(None)
+    return results
+
+class OCRWorkerPool:
+    """OCR ni alohida jarayonlarda paketlab bajarish; natijalar callback orqali qaytariladi"""
+    
+    def __init__(self, engine_name, languages, workers=2, batch_size=8, batch_timeout=0.05, max_pending=64):
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.requests = Queue(maxsize=max_pending)
+        self.inflight = threading.BoundedSemaphore(workers * 2)  # Har ishchiga 2 tagacha paket
+        self.dropped = 0
+        self.completed = 0
+        
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(engine_name, languages)
+        )
+        
+        self.running = True
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+    
+    def submit(self, image, callback):
+        """So'rovni navbatga qo'yish; navbat to'la bo'lsa tashlab yuboriladi (kamera kutmaydi)"""
+        try:
+            self.requests.put_nowait((image, callback))
+            return True
+        except Full:
+            self.dropped += 1
+            return False
+    
+    def _dispatch(self):
+        """So'rovlarni paketlarga yig'ib ishchilarga yuborish"""
+        while self.running:
+            try:
+                batch = [self.requests.get(timeout=0.5)]
+            except Empty:
+                continue
+            
+            # Paketni to'ldirish (batch_timeout dan oshmasdan)
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.requests.get(timeout=self.batch_timeout))
+                except Empty:
+                    break
+            
+            self.inflight.acquire()
+            if not self.running:
+                self.inflight.release()
+                break
+            
+            images = [image for image, _ in batch]
+            callbacks = [callback for _, callback in batch]
+            try:
+                future = self.executor.submit(_recognize_batch, images)
+            except RuntimeError:
+                self.inflight.release()
+                break
+            future.add_done_callback(lambda f, callbacks=callbacks: self._on_batch_done(f, callbacks))
+    
+    def _on_batch_done(self, future, callbacks):
+        """Paket natijalarini egalariga tarqatish"""
+        self.inflight.release()
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"OCR ishchisida xato: {e}")
+            results = [None] * len(callbacks)
+        
+        for callback, result in zip(callbacks, results):
+            self.completed += 1
+            plate_info = None
+            if result is not None:
+                text, confidence = result
+                plate_info = {'text': text, 'confidence': confidence, 'bbox': None}
+            try:
+                callback(plate_info)
+            except Exception as e:
+                print(f"OCR natijasini qayta ishlashda xato: {e}")
+    
+    def get_statistics(self):
+        """Navbat va ishlov statistikasi"""
+        return {
+            'pending': self.requests.qsize(),
+            'dropped': self.dropped,
+            'completed': self.completed
+        }
+    
+    def stop(self):
+        """Ishchilarni to'xtatish"""
+        self.running = False
+        self.executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
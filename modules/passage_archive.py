@@ -0,0 +1,223 @@
+"""
+RailSafeAI - Polygondan o'tgan avtomobillar arxivi (SQLite) moduli
+"""
+import os
+import sqlite3
+import threading
+from queue import Queue, Empty
+from time import time
+from config.settings import ARCHIVE_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('archive')
+
+# Jadval ustunlari (kiritish tartibida)
+COLUMNS = (
+    'camera_id', 'track_id', 'class_id', 'class_name', 'entry_time', 'exit_time', 'duration',
+    'speed', 'license_plate', 'plate_confidence', 'clip_path'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    camera_id TEXT NOT NULL,
+    track_id INTEGER NOT NULL,
+    class_id INTEGER,
+    class_name TEXT,
+    entry_time REAL NOT NULL,
+    exit_time REAL NOT NULL,
+    duration REAL NOT NULL,
+    speed REAL,
+    license_plate TEXT,
+    plate_confidence REAL,
+    clip_path TEXT
+);
+CREATE INDEX IF NOT EXISTS passages_camera_time ON passages (camera_id, exit_time);
+CREATE INDEX IF NOT EXISTS passages_time ON passages (exit_time);
+CREATE INDEX IF NOT EXISTS passages_speed ON passages (speed);
+"""
+
+class PassageArchive:
+    """O'tishlarni fon threadida paketlab SQLite (WAL) bazasiga yozish va hisobotlar uchun so'rovlar
+    
+    Kamera threadi faqat navbatga qo'yadi (cheklanmagan navbat - yozuv yo'qolmaydi); disk bilan
+    faqat yozuvchi thread ishlaydi, har bir paket bitta tranzaksiyada yoziladi. stop() dan keyin kelgan
+    yozuvlar (to'xtayotgan kamera threadidan) darhol yoziladi.
+    """
+    
+    def __init__(self, path=None):
+        self.enabled = ARCHIVE_SETTINGS['enabled']
+        self.path = path or os.path.join(Paths.OUTPUTS_DIR, ARCHIVE_SETTINGS['file_name'])
+        self.jobs = Queue()
+        self.written = 0
+        self.failed = 0
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()  # Navbatga qo'yish va to'xtatish belgisi tartibi uchun
+        if not self.enabled:
+            return
+        
+        # Jadval va indekslar oldindan yaratiladi - so'rovlar yozuvchi ishga tushmasdan ham ishlaydi
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        connection.close()
+        
+        self._thread = threading.Thread(target=self._run_writer, daemon=True)
+        self._thread.start()
+    
+    def _connect(self):
+        """Yangi ulanish (har bir thread o'zinikini ishlatadi)"""
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(f"PRAGMA synchronous={ARCHIVE_SETTINGS['synchronous']}")
+        connection.row_factory = sqlite3.Row
+        return connection
+    
+    def record(self, camera_id, track_id, vehicle_info, clip_path=None, exit_time=None):
+        """Polygondan chiqqan avtomobilni arxivga navbatga qo'yish (kamera threadidan, bloklanmaydi)"""
+        if not self.enabled:
+            return
+        
+        # numpy sonlari sqlite3 ga to'g'ridan-to'g'ri berilmaydi - oddiy Python turlariga o'tkaziladi
+        exit_time = exit_time if exit_time is not None else time()
+        duration = float(vehicle_info['total_time'])
+        # Kirish vaqti - EnterEvent kadri vaqti (duration video vaqtida o'lchanadi, exit_time bilan boshqa soat)
+        entry_time = vehicle_info.get('entry_timestamp')
+        entry_time = float(entry_time) if entry_time is not None else exit_time - duration
+        class_id = vehicle_info['class_id']
+        plate_confidence = vehicle_info['plate_confidence']
+        row = (
+            str(camera_id), int(track_id), int(class_id) if class_id is not None else None, vehicle_info['class_name'],
+            entry_time, exit_time, duration, float(vehicle_info['speed']),
+            vehicle_info['license_plate'], float(plate_confidence) if plate_confidence else None, clip_path
+        )
+        with self._lock:
+            if not self._closed:
+                self.jobs.put(row)
+                return
+        # Yozuvchi to'xtagan (masalan, kamera threadi tizim to'xtaganda kadrni tugatyapti) - darhol yoziladi
+        connection = self._connect()
+        try:
+            self._insert(connection, [row])
+        finally:
+            connection.close()
+    
+    def on_exit(self, event):
+        """ExitEvent obunachisi (sinxron - faqat navbatga qo'yadi)"""
+        self.record(event.camera_id, event.track_id, event.vehicle, event.clip_path, exit_time=event.timestamp)
+    
+    def _insert(self, connection, batch):
+        """Paketni bitta tranzaksiyada yozish"""
+        insert = f"INSERT INTO passages ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        try:
+            with connection:
+                connection.executemany(insert, batch)
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            logger.error("Xato o'tishlarni arxivga yozishda (%d ta): %s", len(batch), e)
+    
+    def _run_writer(self):
+        """Navbatdagi yozuvlarni paketlab yozish (batch_size yoki flush_interval bo'yicha)"""
+        connection = self._connect()
+        stopping = False
+        
+        while not stopping:
+            batch = []
+            job = self.jobs.get()
+            deadline = time() + ARCHIVE_SETTINGS['flush_interval']
+            while True:
+                if job is None:
+                    stopping = True
+                else:
+                    batch.append(job)
+                if stopping or len(batch) >= ARCHIVE_SETTINGS['batch_size']:
+                    break
+                try:
+                    job = self.jobs.get(timeout=max(deadline - time(), 0))
+                except Empty:
+                    break
+            
+            if batch:
+                self._insert(connection, batch)
+            
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self.jobs.task_done()
+        
+        connection.close()
+    
+    def flush(self):
+        """Navbatdagi barcha yozuvlar bazaga tushishini kutish"""
+        if self._thread is not None and self._thread.is_alive():
+            self.jobs.join()
+    
+    def stop(self):
+        """Qolgan yozuvlarni yozib, yozuvchini to'xtatish"""
+        if self._thread is None:
+            return
+        # Shundan keyingi record() lar navbatga emas, to'g'ridan-to'g'ri yoziladi - belgidan keyin yozuv qolmaydi
+        with self._lock:
+            self._closed = True
+            self.jobs.put(None)
+        self._thread.join(timeout=30.0)
+        self._thread = None
+        logger.info("O'tishlar arxivi yopildi: %s (%d ta yozildi)", self.path, self.written)
+    
+    def get_queue_depth(self):
+        """Yozilishini kutayotgan o'tishlar soni"""
+        return self.jobs.qsize()
+    
+    def _where(self, camera_id=None, since=None, until=None, min_speed=None):
+        """So'rov shartlari (indekslangan ustunlar bo'yicha)"""
+        clauses, params = [], []
+        if camera_id is not None:
+            clauses.append('camera_id = ?')
+            params.append(str(camera_id))
+        if since is not None:
+            clauses.append('exit_time >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('exit_time < ?')
+            params.append(until)
+        if min_speed is not None:
+            clauses.append('speed >= ?')
+            params.append(min_speed)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+    
+    def _query(self, sql, params):
+        if not self.enabled:
+            return []
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+    
+    def get_passages(self, camera_id=None, since=None, until=None, min_speed=None, limit=None, order='exit_time'):
+        """O'tishlar ro'yxati (order: 'exit_time' yoki 'speed' - kamayish tartibida)"""
+        if order not in ('exit_time', 'speed'):
+            raise ValueError(f"Noto'g'ri tartib: {order}")
+        where, params = self._where(camera_id, since, until, min_speed)
+        sql = f"SELECT * FROM passages{where} ORDER BY {order} DESC"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return self._query(sql, params)
+    
+    def get_summary(self, since=None, until=None, min_speed=None):
+        """Kamera bo'yicha: o'tishlar soni, o'rtacha/maksimal tezlik, birinchi/oxirgi o'tish vaqti"""
+        where, params = self._where(None, since, until, min_speed)
+        sql = (f"SELECT camera_id, COUNT(*) AS passages, AVG(speed) AS avg_speed, MAX(speed) AS max_speed, "
+               f"MIN(exit_time) AS first_exit, MAX(exit_time) AS last_exit FROM passages{where} "
+               f"GROUP BY camera_id ORDER BY camera_id")
+        return self._query(sql, params)
+    
+    def get_hourly_counts(self, camera_id=None, since=None, until=None):
+        """Soatlar bo'yicha o'tishlar soni va o'rtacha tezlik (mahalliy vaqt)"""
+        where, params = self._where(camera_id, since, until)
+        sql = (f"SELECT camera_id, strftime('%Y-%m-%d %H:00', exit_time, 'unixepoch', 'localtime') AS hour, "
+               f"COUNT(*) AS passages, AVG(speed) AS avg_speed FROM passages{where} "
+               f"GROUP BY camera_id, hour ORDER BY camera_id, hour")
+        return self._query(sql, params)
\ No newline at end of file
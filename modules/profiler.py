@@ -0,0 +1,130 @@
+"""
+RailSafeAI - Ishlab turgan jarayon uchun namuna oluvchi (sampling) profiler moduli
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+from config.settings import PROFILER_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('profiler')
+
+def _frame_label(code):
+    """Funksiya nomi (fayl:qator) - flame graph uchun ';' siz"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+class SamplingProfiler:
+    """Tanlangan threadlar stekini belgilangan oraliqda o'qib, collapsed stack va funksiya hisobotini yozish
+    
+    Kamera threadlariga hech narsa qo'shilmaydi - namunalar alohida threadda sys._current_frames() orqali olinadi.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.targets = {}  # {thread_ident: camera_id}
+        self.last_report = None
+    
+    def is_running(self):
+        """Profiler ishlayaptimi"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, targets, duration=None, interval=None):
+        """Profilingni boshlash; targets - {camera_id: thread_ident}"""
+        with self.lock:
+            if self.is_running():
+                return False
+            
+            self.targets = {ident: camera_id for camera_id, ident in targets.items() if ident is not None}
+            if not self.targets:
+                logger.warning("Profiling uchun ishlayotgan kamera threadi topilmadi")
+                return False
+            
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(duration or PROFILER_SETTINGS['duration'], interval or PROFILER_SETTINGS['interval']),
+                daemon=True
+            )
+            self._thread.start()
+        
+        logger.info("Profiling boshlandi: %s", ', '.join(sorted(map(str, self.targets.values()))))
+        return True
+    
+    def stop(self):
+        """Profilingni muddatidan oldin to'xtatish (hisobot baribir yoziladi)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+    
+    def _run(self, duration, interval):
+        """Namuna olish sikli"""
+        max_depth = PROFILER_SETTINGS['max_depth']
+        labels_cache = {}  # {code: nom} - har namunada satr yig'masdan
+        stacks = Counter()
+        samples = 0
+        started = perf_counter()
+        deadline = started + duration
+        
+        while not self._stop.is_set() and perf_counter() < deadline:
+            frames = sys._current_frames()
+            for ident, camera_id in self.targets.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                
+                labels = []
+                while frame is not None and len(labels) < max_depth:
+                    code = frame.f_code
+                    label = labels_cache.get(code)
+                    if label is None:
+                        label = labels_cache[code] = _frame_label(code)
+                    labels.append(label)
+                    frame = frame.f_back
+                labels.append(f"kamera_{camera_id}")
+                stacks[tuple(reversed(labels))] += 1
+            del frames
+            samples += 1
+            self._stop.wait(interval)
+        
+        elapsed = perf_counter() - started
+        try:
+            self.last_report = self._write_report(stacks, samples, elapsed, interval)
+        except Exception as e:
+            logger.error("Xato profiling hisobotini yozishda: %s", e)
+    
+    def _write_report(self, stacks, samples, elapsed, interval):
+        """Collapsed stack (flamegraph.pl / speedscope) va funksiyalar hisobotini yozish"""
+        os.makedirs(Paths.PROFILES_DIR, exist_ok=True)
+        cameras = '_'.join(sorted(map(str, set(self.targets.values()))))
+        base = os.path.join(Paths.PROFILES_DIR, f"profile_{cameras}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        
+        # Har bir funksiya uchun: o'zi (stek tepasida) va umumiy (stekda bor) namunalar
+        self_counts = Counter()
+        total_counts = Counter()
+        total = sum(stacks.values())
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack[1:]):
+                total_counts[label] += count
+        
+        with open(base + '_summary.txt', 'w') as f:
+            f.write(f"Namunalar: {samples} ({elapsed:.1f}s, oraliq {interval * 1000:.1f}ms), "
+                    f"stek namunalari: {total}\n\n")
+            f.write("  o'zi %  umumiy %    o'zi  umumiy  funksiya\n")
+            for label, count in total_counts.most_common(PROFILER_SETTINGS['summary_top']):
+                f.write(f"{100.0 * self_counts[label] / max(total, 1):7.1f}% "
+                        f"{100.0 * count / max(total, 1):8.1f}% "
+                        f"{self_counts[label]:7d} {count:7d}  {label}\n")
+        
+        logger.info("Profiling hisoboti yozildi: %s.collapsed, %s_summary.txt", base, base)
+        return base
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+RailSafeAI - Kameralar orasida kechikish byudjeti bo'yicha xizmat sifati (QoS) rejalashtiruvchisi moduli
+"""
+import threading
+from config.settings import QOS_SETTINGS
+from modules.event_log import get_logger
+
+logger = get_logger('qos')
+
+class QoSScheduler:
+    """Yuklama oshganda kameralarni ustuvorlik bo'yicha soddalashtirish va zaxira paydo bo'lsa tiklash
+    
+    Har `interval` da kameraning o'rtacha kadr ishlov vaqti (metrikalardagi 'total' bosqichi farqi)
+    o'z chegarasi (target_latency_ms) bilan solishtiriladi. Biror kamera chegaradan oshsa - undan
+    yuqori bo'lmagan ustuvorlikdagi eng past ustuvorlikli kamera bir daraja soddalashtiriladi
+    (QOS_SETTINGS['levels']). Barcha kameralarda zaxira recover_intervals marta ketma-ket bo'lsa -
+    eng muhim soddalashtirilgan kamera bir daraja tiklanadi. critical_priority dagi kameralar
+    doim to'liq sifatda qoladi.
+    """
+    
+    def __init__(self, system):
+        self.system = system  # RailSafeAI: camera_processors, shutdown_event
+        self.levels = QOS_SETTINGS['levels']
+        self.samples = {}       # {camera_id: (kadrlar soni, kechikishlar yig'indisi)} - oldingi tekshiruvdan
+        self.latencies = {}     # {camera_id: oxirgi oraliqdagi o'rtacha kadr ishlov vaqti (sekund)}
+        self.headroom_streak = 0
+        self.stats = {'degraded': 0, 'restored': 0}
+        self._saturated = False
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='qos-scheduler', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self.system.shutdown_event.wait(QOS_SETTINGS['interval']):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("QoS rejalashtiruvchisi xatosi: %s", e)
+    
+    def _measure(self):
+        """Oxirgi oraliqda kadr ishlagan kameralar: [(processor, kechikish / chegara)]"""
+        measured = []
+        processors = dict(self.system.camera_processors)
+        for camera_id in [cam for cam in self.samples if cam not in processors]:
+            del self.samples[camera_id]
+            self.latencies.pop(camera_id, None)
+        
+        for camera_id, processor in processors.items():
+            count, total = processor.metrics.stage_totals('total')
+            previous = self.samples.get(camera_id)
+            self.samples[camera_id] = (count, total)
+            # Yangi kamera, kadr kelmagan oraliq (manba uzilgan) yoki keshdan o'qish - o'lchanmaydi
+            if previous is None or count <= previous[0] or not processor.running or \
+                    processor.detector.is_replaying_cache():
+                self.latencies.pop(camera_id, None)
+                continue
+            
+            latency = (total - previous[1]) / (count - previous[0])
+            self.latencies[camera_id] = latency
+            if processor.calibrating:
+                continue  # Kalibrlash to'liq o'lchamda - vaqtinchalik yuklama, kamera tugaguncha o'zgartirilmaydi
+            measured.append((processor, latency * 1000.0 / processor.cam_config['target_latency_ms']))
+        return measured
+    
+    def tick(self):
+        """Bitta tekshiruv: kerak bo'lsa bitta kamerani bir daraja pasaytirish yoki tiklash"""
+        measured = self._measure()
+        # Bitta kamera - resurs uchun raqobat yo'q, uni soddalashtirish boshqa kameraga yordam bermaydi
+        if len(measured) < QOS_SETTINGS['min_cameras']:
+            self.headroom_streak = 0
+            if len(self.system.camera_processors) < QOS_SETTINGS['min_cameras']:
+                self._restore()
+            return
+        
+        overloaded = [processor for processor, ratio in measured if ratio > 1.0]
+        if overloaded:
+            self.headroom_streak = 0
+            self._degrade(max(processor.cam_config['priority'] for processor in overloaded), measured)
+            return
+        
+        if all(ratio < QOS_SETTINGS['headroom_ratio'] for _, ratio in measured):
+            self.headroom_streak += 1
+        else:
+            self.headroom_streak = 0
+        if self.headroom_streak >= QOS_SETTINGS['recover_intervals']:
+            self.headroom_streak = 0
+            self._restore()
+    
+    def _degrade(self, max_priority, measured):
+        """Chegaradan oshgan kameradan muhim bo'lmagan, eng past ustuvorlikli (teng bo'lsa eng sekin) kamera"""
+        candidates = [(processor.cam_config['priority'], -ratio, processor) for processor, ratio in measured
+                      if processor.cam_config['priority'] <= max_priority and self._can_degrade(processor)]
+        if not candidates:
+            if not self._saturated:
+                self._saturated = True
+                logger.warning("QoS: kechikish chegaradan oshgan, soddalashtiriladigan kamera qolmadi",
+                               extra={'event': 'qos_saturated'})
+            return
+        
+        self._saturated = False
+        _, _, processor = min(candidates, key=lambda candidate: candidate[:2])
+        self._set_level(processor, processor.qos_level + 1)
+        self.stats['degraded'] += 1
+    
+    def _restore(self):
+        """Eng muhim (teng bo'lsa eng kam soddalashtirilgan) kamerani bir daraja tiklash"""
+        degraded = [processor for processor in list(self.system.camera_processors.values())
+                    if processor.qos_level > 0 and not processor.calibrating]
+        if not degraded:
+            return
+        processor = max(degraded, key=lambda p: (p.cam_config['priority'], -p.qos_level))
+        self._set_level(processor, processor.qos_level - 1)
+        self.stats['restored'] += 1
+    
+    def _can_degrade(self, processor):
+        return processor.cam_config['priority'] < QOS_SETTINGS['critical_priority'] and \
+            processor.qos_level < len(self.levels) - 1
+    
+    def _set_level(self, processor, level):
+        previous = processor.qos_level
+        processor.set_qos_level(level)
+        latency = self.latencies.get(processor.camera_id)
+        logger.info("QoS: kamera %s darajasi %d -> %d (kechikish %s ms, chegara %.0f ms)", processor.camera_id,
+                    previous, level, f"{latency * 1000:.1f}" if latency is not None else '-',
+                    processor.cam_config['target_latency_ms'],
+                    extra={'event': 'qos_degrade' if level > previous else 'qos_restore',
+                           'camera_id': processor.camera_id, 'level': level})
+    
+    def get_latency_ms(self, camera_id):
+        """Kameraning oxirgi oraliqdagi o'rtacha kadr ishlov vaqti (ms, o'lchanmagan bo'lsa None)"""
+        latency = self.latencies.get(camera_id)
+        return round(latency * 1000.0, 2) if latency is not None else None
\ No newline at end of file
@@ -2,11 +2,23 @@
 RailSafeAI - Video va rasm yozish moduli
 """
 import cv2
+import json
 import os
+import threading
 from datetime import datetime
+from functools import partial
+from queue import Queue
 from time import time
 from config.settings import RECORDING_ENABLED, VIDEO_SETTINGS, SAVE_SETTINGS
 from config.paths import Paths
+from modules.event_log import get_logger
+from modules.retention import RetentionManager
+from modules.snapshot_selector import SnapshotSelector
+from modules.stream_index import (
+    FrameIndexWriter, SeekIndexWriter, ClipExtractor, get_index_path, get_seek_index_path
+)
+
+logger = get_logger('recorder')
 
 class VideoRecorder:
     """Video va rasm yozish uchun klass"""
@@ -19,6 +31,22 @@ class VideoRecorder:
         
         # Papkalarni yaratish
         Paths.create_directories()
+        
+        # Natija fayllari indeksi va disk kvotasi
+        self.retention = RetentionManager()
+        
+        # Asosiy videodan kliplarni qayta kodlashsiz ajratib olish
+        self.clip_extractor = ClipExtractor(on_complete=self.retention.register)
+        if self.uses_indexed_clips() and not self.clip_extractor.is_available():
+            logger.warning("Ogohlantirish: ffmpeg topilmadi - avtomobil kliplari ajratib olinmaydi")
+        
+        # Eng yaxshi avtomobil rasmini tanlash va fon rejimida kodlash
+        self.snapshot_selector = SnapshotSelector(on_saved=self.retention.register)
+        
+        # Asosiy video segmentlarini ochish/yopish fon threadi
+        self._segment_jobs = Queue()
+        self._segment_worker = threading.Thread(target=self._run_segment_worker, daemon=True)
+        self._segment_worker.start()
     
     def is_recording_enabled(self):
         """Video yozish yoqilganligini tekshirish"""
@@ -28,14 +56,22 @@ class VideoRecorder:
         """Video yozishni yoqish/o'chirish"""
         self.recording_enabled = enabled
         status = "YOQILDI" if enabled else "O'CHIRILDI"
-        print(f"Video yozish: {status}")
+        logger.info("Video yozish: %s", status)
         
         if not enabled:
             # Barcha yozishni to'xtatish
             self.stop_all_recordings()
     
+    def uses_indexed_clips(self):
+        """Avtomobil kliplari asosiy videodan ajratib olinadimi"""
+        return VIDEO_SETTINGS.get('vehicle_clip_mode', 'full') == 'indexed'
+    
+    def is_main_recording(self, camera_id):
+        """Kamera uchun asosiy video yozilayotganini tekshirish"""
+        return camera_id in self.main_recorders
+    
     def start_main_recording(self, camera_id, frame_width, frame_height, fps):
-        """Asosiy video yozishni boshlash (barcha kadr)"""
+        """Asosiy video yozishni boshlash (barcha kadr, segmentlarga bo'lingan)"""
         if not self.recording_enabled:
             return False
         
@@ -43,42 +79,233 @@ class VideoRecorder:
             return True  # Allaqachon yozilmoqda
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"main_{camera_id}_{timestamp}.avi"
-        filepath = Paths.get_video_save_path(filename)
+        base_name = f"main_{camera_id}_{timestamp}"
+        
+        recorder_info = {
+            'base_name': base_name,
+            'fps': fps,
+            'frame_size': (frame_width, frame_height),
+            'start_time': time(),
+            'segment': None,         # Joriy segment
+            'segments': [],          # [{'segment_no', 'filepath', 'frames', 'closed', ...}]
+            'next_segment': None,    # Fon threadida oldindan ochilgan keyingi segment
+            'next_requested': False,
+            'stopped': False,
+            'lock': threading.Lock(),
+            'events_path': Paths.get_video_save_path(f"{base_name}_events.jsonl"),
+            'pending_events': []     # Segmenti hali yopilmagan avtomobil hodisalari
+        }
         
         try:
-            fourcc = cv2.VideoWriter_fourcc(*VIDEO_SETTINGS['codec'])
-            writer = cv2.VideoWriter(filepath, fourcc, fps, (frame_width, frame_height))
-            
-            if writer.isOpened():
-                self.main_recorders[camera_id] = {
-                    'writer': writer,
-                    'filename': filename,
-                    'start_time': time()
-                }
-                print(f"Kamera {camera_id}: Asosiy video yozish boshlandi - {filename}")
+            segment = self._create_main_segment(recorder_info, 0)
+            if segment is not None:
+                recorder_info['segment'] = segment
+                recorder_info['segments'].append(segment)
+                recorder_info['seek_index'] = SeekIndexWriter(
+                    get_seek_index_path(Paths.get_video_save_path(base_name)), recorder_info['start_time']
+                )
+                self.main_recorders[camera_id] = recorder_info
+                logger.info("Kamera %s: Asosiy video yozish boshlandi - %s", camera_id, segment['filename'],
+                            extra={'event': 'main_recording_start', 'camera_id': camera_id,
+                                   'file': segment['filename']})
                 return True
             else:
-                print(f"Xato: Kamera {camera_id} uchun video yozuvchi ochilmadi")
+                logger.error("Xato: Kamera %s uchun video yozuvchi ochilmadi", camera_id)
                 return False
-                
+        
         except Exception as e:
-            print(f"Xato asosiy video yozishni boshlashda: {e}")
+            logger.error("Xato asosiy video yozishni boshlashda: %s", e)
             return False
     
+    def _create_main_segment(self, recorder_info, segment_no):
+        """Asosiy videoning segmentini va uning kadr indeksini ochish"""
+        filename = f"{recorder_info['base_name']}_s{segment_no:04d}.avi"
+        filepath = Paths.get_video_save_path(filename)
+        
+        fourcc = cv2.VideoWriter_fourcc(*VIDEO_SETTINGS['codec'])
+        writer = cv2.VideoWriter(filepath, fourcc, recorder_info['fps'], recorder_info['frame_size'])
+        if not writer.isOpened():
+            return None
+        
+        start_time = time()
+        return {
+            'segment_no': segment_no,
+            'filename': filename,
+            'filepath': filepath,
+            'writer': writer,
+            'index': FrameIndexWriter(get_index_path(filepath), recorder_info['fps'], start_time),
+            'start_time': start_time,
+            'frames': 0,
+            'bytes': 0,
+            'closed': False
+        }
+    
+    def _close_main_segment(self, camera_id, recorder_info, segment):
+        """Segmentni yopish va unga tegishli kliplarni ajratishga yuborish"""
+        segment['writer'].release()
+        segment['index'].close()
+        self.retention.register(segment['filepath'], camera_id, 'video')
+        self.retention.register(get_index_path(segment['filepath']), camera_id, 'video')
+        
+        with recorder_info['lock']:
+            segment['closed'] = True
+            self._dispatch_vehicle_clips(camera_id, recorder_info)
+    
+    def _discard_main_segment(self, segment):
+        """Ishlatilmagan (bo'sh) segmentni yopib, fayllarini o'chirish"""
+        segment['writer'].release()
+        segment['index'].close()
+        for path in (segment['filepath'], get_index_path(segment['filepath'])):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _run_segment_worker(self):
+        """Segmentlarni ochish/yopish uchun fon thread (kamera thread kutmasligi uchun)"""
+        while True:
+            job = self._segment_jobs.get()
+            if job is None:
+                break
+            
+            action, camera_id, recorder_info, payload = job
+            try:
+                if action == 'open':
+                    segment = self._create_main_segment(recorder_info, payload)
+                    with recorder_info['lock']:
+                        if segment is not None and not recorder_info['stopped']:
+                            recorder_info['next_segment'] = segment
+                            segment = None
+                        else:
+                            recorder_info['next_requested'] = False
+                    
+                    # Yozish to'xtatilgan - keraksiz segmentni o'chirish
+                    if segment is not None:
+                        self._discard_main_segment(segment)
+                
+                elif action == 'close':
+                    self._close_main_segment(camera_id, recorder_info, payload)
+            except Exception as e:
+                logger.error("Xato segment bilan ishlashda (%s): %s", camera_id, e)
+    
+    def _rotate_main_segment(self, camera_id, recorder_info):
+        """Tayyor segmentga uzilishsiz o'tish; eskisini fon threadida yopish"""
+        with recorder_info['lock']:
+            next_segment = recorder_info['next_segment']
+            if next_segment is None:
+                # Hali tayyor emas - kadrlar joriy segmentga yozilishda davom etadi
+                return False
+            recorder_info['next_segment'] = None
+            recorder_info['next_requested'] = False
+            next_segment['start_time'] = time()  # Davomiylik faollashgan paytdan hisoblanadi
+            
+            old_segment = recorder_info['segment']
+            recorder_info['segment'] = next_segment
+            recorder_info['segments'].append(next_segment)
+        
+        recorder_info['seek_index'].flush()
+        self._segment_jobs.put(('close', camera_id, recorder_info, old_segment))
+        return True
+    
+    def _check_segment_rotation(self, camera_id, recorder_info, now):
+        """Vaqt yoki hajm bo'yicha segment almashtirish kerakligini tekshirish"""
+        segment = recorder_info['segment']
+        duration = VIDEO_SETTINGS.get('segment_duration', 0)
+        max_bytes = VIDEO_SETTINGS.get('segment_max_bytes', 0)
+        lead = VIDEO_SETTINGS.get('segment_prepare_lead', 2.0)
+        elapsed = now - segment['start_time']
+        
+        # Keyingi segmentni oldindan fon threadida ochish
+        almost_full = ((duration and elapsed >= duration - lead) or
+                       (max_bytes and segment['bytes'] >= max_bytes * 0.9))
+        if almost_full and not recorder_info['next_requested']:
+            recorder_info['next_requested'] = True
+            self._segment_jobs.put(('open', camera_id, recorder_info, segment['segment_no'] + 1))
+        
+        full = ((duration and elapsed >= duration) or
+                (max_bytes and segment['bytes'] >= max_bytes))
+        if full:
+            self._rotate_main_segment(camera_id, recorder_info)
+    
     def stop_main_recording(self, camera_id):
         """Asosiy video yozishni to'xtatish"""
         if camera_id in self.main_recorders:
-            recorder_info = self.main_recorders[camera_id]
-            recorder_info['writer'].release()
+            # Indekslangan kliplar asosiy videoga bog'liq - avval ularni yakunlash
+            for track_id, vehicle_recorder in list(self.vehicle_recorders.get(camera_id, {}).items()):
+                if vehicle_recorder['indexed']:
+                    self.stop_vehicle_recording(camera_id, track_id)
+            
+            recorder_info = self.main_recorders.pop(camera_id)
+            with recorder_info['lock']:
+                recorder_info['stopped'] = True
+                unused_segment = recorder_info['next_segment']
+                recorder_info['next_segment'] = None
+            
+            if unused_segment is not None:
+                self._discard_main_segment(unused_segment)
+            
+            self._close_main_segment(camera_id, recorder_info, recorder_info['segment'])
+            recorder_info['seek_index'].close()
+            self.retention.register(recorder_info['seek_index'].path, camera_id, 'video')
+            self.retention.register(recorder_info['events_path'], camera_id, 'video')
             duration = time() - recorder_info['start_time']
-            print(f"Kamera {camera_id}: Asosiy video yozish tugadi - {recorder_info['filename']} ({duration:.1f}s)")
-            del self.main_recorders[camera_id]
+            logger.info("Kamera %s: Asosiy video yozish tugadi - %s (%.1fs, %d segment)",
+                        camera_id, recorder_info['base_name'], duration, len(recorder_info['segments']),
+                        extra={'event': 'main_recording_stop', 'camera_id': camera_id,
+                               'file': recorder_info['base_name'], 'duration': duration})
     
     def write_main_frame(self, camera_id, frame):
         """Asosiy videoga kadr yozish"""
-        if camera_id in self.main_recorders:
-            self.main_recorders[camera_id]['writer'].write(frame)
+        recorder_info = self.main_recorders.get(camera_id)
+        if recorder_info is not None:
+            now = time()
+            segment = recorder_info['segment']
+            
+            # Vaqt -> (segment, kadr) qidiruv indeksi
+            recorder_info['seek_index'].mark(now, segment['segment_no'], segment['frames'])
+            segment['writer'].write(frame)
+            
+            # Kadr indeksi: raqam va vaqt
+            segment['index'].append(segment['frames'], now)
+            segment['frames'] += 1
+            # Hajm bo'yicha almashtirish uchun - sekundiga bir marta (yozuvchi buferlagani uchun taxminiy)
+            if VIDEO_SETTINGS.get('segment_max_bytes') and segment['frames'] % max(int(recorder_info['fps']), 1) == 0:
+                segment['bytes'] = os.path.getsize(segment['filepath'])
+            
+            self._check_segment_rotation(camera_id, recorder_info, now)
+    
+    def _get_main_position(self, camera_id):
+        """Asosiy videodagi keyingi kadr o'rni (segment, kadr)"""
+        recorder_info = self.main_recorders.get(camera_id)
+        if recorder_info is None:
+            return None
+        segment = recorder_info['segment']
+        return (segment['segment_no'], segment['frames'])
+    
+    def _dispatch_vehicle_clips(self, camera_id, recorder_info):
+        """Segmentlari yopilgan hodisalar uchun kliplarni fon rejimida ajratish (lock ostida)"""
+        fps = recorder_info['fps']
+        segments = {segment['segment_no']: segment for segment in recorder_info['segments']}
+        
+        remaining = []
+        for event in recorder_info['pending_events']:
+            start_segment, start_frame = event['start']
+            end_segment, end_frame = event['end']
+            
+            if not all(segments[n]['closed'] for n in range(start_segment, end_segment + 1)):
+                remaining.append(event)
+                continue
+            
+            parts = []
+            for segment_no in range(start_segment, end_segment + 1):
+                segment = segments[segment_no]
+                first = start_frame if segment_no == start_segment else 0
+                last = end_frame if segment_no == end_segment else segment['frames']
+                if last > first:
+                    parts.append((segment['filepath'], first / fps, last / fps))
+            
+            self.clip_extractor.submit(parts, Paths.get_video_save_path(event['filename']),
+                                       on_finished=partial(self.retention.release, event['segment_paths']))
+        
+        recorder_info['pending_events'] = remaining
     
     def start_vehicle_recording(self, camera_id, track_id, frame_width, frame_height, fps):
         """Alohida avtomobil uchun video yozishni boshlash"""
@@ -96,6 +323,33 @@ class VideoRecorder:
         filename = f"vehicle_{camera_id}_{track_id}_{timestamp}.avi"
         filepath = Paths.get_video_save_path(filename)
         
+        # Indekslangan rejimda alohida yozuvchi ochilmaydi - faqat asosiy videodagi o'rin belgilanadi
+        if self.uses_indexed_clips():
+            if camera_id not in self.main_recorders:
+                return False
+            
+            position = self._get_main_position(camera_id)
+            self.vehicle_recorders[camera_id][track_id] = {
+                'writer': None,
+                'filename': filename,
+                'start_time': time(),
+                'frames_recorded': 0,
+                'crop_mode': False,
+                'crop_window': None,
+                'indexed': True,
+                'main_base': self.main_recorders[camera_id]['base_name'],
+                'start': position,
+                'end': position
+            }
+            logger.info("Avtomobil %s (kamera %s) uchun klip belgilash boshlandi", track_id, camera_id,
+                        extra={'event': 'vehicle_recording_start', 'camera_id': camera_id, 'track_id': track_id})
+            return True
+        
+        # Kesilgan klip rejimida yozuvchi kichik, qat'iy o'lchamda ochiladi
+        crop_mode = VIDEO_SETTINGS.get('vehicle_clip_mode', 'full') == 'crop'
+        if crop_mode:
+            frame_width, frame_height = VIDEO_SETTINGS['vehicle_clip_size']
+        
         try:
             fourcc = cv2.VideoWriter_fourcc(*VIDEO_SETTINGS['codec'])
             writer = cv2.VideoWriter(filepath, fourcc, fps, (frame_width, frame_height))
@@ -106,48 +360,170 @@ class VideoRecorder:
                     'filename': filename,
                     'start_time': time(),
                     'frames_recorded': 0,
-                    'image_saved': False
+                    'crop_mode': crop_mode,
+                    'crop_window': None,  # Barqarorlashtirilgan (cx, cy, w, h)
+                    'indexed': False
                 }
-                print(f"Avtomobil {track_id} (kamera {camera_id}) uchun video yozish boshlandi")
+                logger.info("Avtomobil %s (kamera %s) uchun video yozish boshlandi", track_id, camera_id,
+                            extra={'event': 'vehicle_recording_start', 'camera_id': camera_id, 'track_id': track_id})
                 return True
             else:
-                print(f"Xato: Avtomobil {track_id} uchun video yozuvchi ochilmadi")
+                logger.error("Xato: Avtomobil %s uchun video yozuvchi ochilmadi", track_id)
                 return False
-                
+        
         except Exception as e:
-            print(f"Xato avtomobil video yozishni boshlashda: {e}")
+            logger.error("Xato avtomobil video yozishni boshlashda: %s", e)
             return False
     
     def write_vehicle_frame(self, camera_id, track_id, frame, vehicle_info):
         """Avtomobil videosiga kadr yozish"""
+        # Eng yaxshi rasm nomzodini yangilash (faqat xotirada, JPEG track tugaganda yoziladi)
+        if self.recording_enabled and SAVE_SETTINGS['save_individual_images']:
+            self.snapshot_selector.update(camera_id, track_id, frame, vehicle_info)
+        
         if (camera_id in self.vehicle_recorders and 
             track_id in self.vehicle_recorders[camera_id]):
-            
-            recorder_info = self.vehicle_recorders[camera_id][track_id]
-            
-            # Avtomobil atrofiga to'rtburchak chizish
-            record_frame = frame.copy()
-            if vehicle_info and vehicle_info['bbox']:
-                x1, y1, x2, y2 = vehicle_info['bbox']
-                cv2.rectangle(record_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-                
-                # Ma'lumot yozish
-                info_text = f"ID:{track_id} {vehicle_info['class_name']}"
-                cv2.putText(record_frame, info_text, (x1, y1-10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            
+            self.vehicle_recorders[camera_id][track_id]['last_info'] = vehicle_info
+            self._write_clip_frame(camera_id, track_id, frame, vehicle_info)
+    
+    def repeat_vehicle_frames(self, camera_id, track_ids, frame):
+        """Aniqlash o'tkazib yuborilgan kadr (QoS stride) - kliplarga oxirgi ma'lum bbox bilan yozish
+        
+        Klip VIDEO_SETTINGS['fps'] da kodlanadi - kadrlar tashlansa klip tezlashib ketadi.
+        Rasm tanlash faqat aniqlangan kadrlarda bo'ladi.
+        """
+        recorders = self.vehicle_recorders.get(camera_id)
+        if not recorders:
+            return
+        for track_id in track_ids:
+            recorder_info = recorders.get(track_id)
+            if recorder_info is not None:
+                self._write_clip_frame(camera_id, track_id, frame, recorder_info.get('last_info'))
+    
+    def _write_clip_frame(self, camera_id, track_id, frame, vehicle_info):
+        """Boshlangan klipga bitta kadr (indekslangan rejimda - klip oxirini surish)"""
+        recorder_info = self.vehicle_recorders[camera_id][track_id]
+        if recorder_info['indexed']:
+            # Kadr asosiy videoda kodlanadi - faqat klip oxirini surish
+            position = self._get_main_position(camera_id)
+            if position is not None:
+                recorder_info['end'] = position
+            record_frame = None
+        elif recorder_info['crop_mode']:
+            record_frame = self._make_clip_frame(recorder_info, track_id, frame, vehicle_info)
+        else:
+            record_frame = self._make_full_frame(track_id, frame, vehicle_info)
+        
+        if record_frame is not None:
             recorder_info['writer'].write(record_frame)
-            recorder_info['frames_recorded'] += 1
+        recorder_info['frames_recorded'] += 1
+        
+        # Vaqt tugashi bo'yicha to'xtatish
+        duration = time() - recorder_info['start_time']
+        if duration >= VIDEO_SETTINGS['individual_vehicle_recording_duration']:
+            self.stop_vehicle_recording(camera_id, track_id)
+    
+    def _make_full_frame(self, track_id, frame, vehicle_info):
+        """Butun kadr ustiga avtomobil ma'lumotlarini chizish"""
+        # Avtomobil atrofiga to'rtburchak chizish
+        record_frame = frame.copy()
+        if vehicle_info and vehicle_info['bbox']:
+            x1, y1, x2, y2 = vehicle_info['bbox']
+            cv2.rectangle(record_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
             
-            # Rasm saqlash (bir marta)
-            if not recorder_info['image_saved'] and SAVE_SETTINGS['save_individual_images']:
-                self.save_vehicle_image(camera_id, track_id, record_frame)
-                recorder_info['image_saved'] = True
+            # Ma'lumot yozish
+            info_text = f"ID:{track_id} {vehicle_info['class_name']}"
+            cv2.putText(record_frame, info_text, (x1, y1-10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        
+        return record_frame
+    
+    def _make_clip_frame(self, recorder_info, track_id, frame, vehicle_info):
+        """Avtomobil atrofidan barqaror, qat'iy o'lchamli klip kadrini yasash"""
+        out_w, out_h = VIDEO_SETTINGS['vehicle_clip_size']
+        frame_h, frame_w = frame.shape[:2]
+        
+        bbox = vehicle_info['bbox'] if vehicle_info else None
+        window = self._update_crop_window(recorder_info, bbox, frame_w, frame_h, out_w / out_h)
+        
+        # Oynani kadr ichiga joylashtirish
+        cx, cy, crop_w, crop_h = window
+        cx0 = int(round(min(max(cx - crop_w / 2, 0), frame_w - crop_w)))
+        cy0 = int(round(min(max(cy - crop_h / 2, 0), frame_h - crop_h)))
+        cx1 = cx0 + int(round(crop_w))
+        cy1 = cy0 + int(round(crop_h))
+        
+        # Kesib olingan qism kichraytiriladi - kodlash faqat shu o'lchamda bo'ladi
+        clip_frame = cv2.resize(frame[cy0:cy1, cx0:cx1], (out_w, out_h), interpolation=cv2.INTER_AREA)
+        scale_x = out_w / max(cx1 - cx0, 1)
+        scale_y = out_h / max(cy1 - cy0, 1)
+        
+        if bbox:
+            x1, y1, x2, y2 = bbox
+            p1 = (int((x1 - cx0) * scale_x), int((y1 - cy0) * scale_y))
+            p2 = (int((x2 - cx0) * scale_x), int((y2 - cy0) * scale_y))
+            cv2.rectangle(clip_frame, p1, p2, (0, 0, 255), 2)
             
-            # Vaqt tugashi bo'yicha to'xtatish
-            duration = time() - recorder_info['start_time']
-            if duration >= VIDEO_SETTINGS['individual_vehicle_recording_duration']:
-                self.stop_vehicle_recording(camera_id, track_id)
+            info_text = f"ID:{track_id} {vehicle_info['class_name']}"
+            cv2.putText(clip_frame, info_text, (5, out_h - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        
+        # Butun sahnaning kichik rasmi (inset)
+        if VIDEO_SETTINGS.get('vehicle_clip_thumbnail', False):
+            thumb_w = int(out_w * VIDEO_SETTINGS['vehicle_clip_thumbnail_scale'])
+            thumb_h = max(int(thumb_w * frame_h / frame_w), 1)
+            if 0 < thumb_w < out_w and thumb_h < out_h:
+                thumbnail = cv2.resize(frame, (thumb_w, thumb_h), interpolation=cv2.INTER_NEAREST)
+                
+                # Kesilgan hududni kichik rasmda belgilash
+                tx = thumb_w / frame_w
+                ty = thumb_h / frame_h
+                cv2.rectangle(thumbnail, (int(cx0 * tx), int(cy0 * ty)),
+                             (int(cx1 * tx) - 1, int(cy1 * ty) - 1), (0, 255, 255), 1)
+                
+                clip_frame[0:thumb_h, out_w - thumb_w:out_w] = thumbnail
+                cv2.rectangle(clip_frame, (out_w - thumb_w - 1, 0), (out_w - 1, thumb_h),
+                             (255, 255, 255), 1)
+        
+        return clip_frame
+    
+    def _update_crop_window(self, recorder_info, bbox, frame_w, frame_h, aspect):
+        """Kesish oynasini bbox bo'yicha yangilash va silliqlash"""
+        previous = recorder_info['crop_window']
+        
+        if not bbox:
+            # bbox yo'q bo'lsa oldingi oyna (yoki butun kadr) ishlatiladi
+            if previous is None:
+                previous = (frame_w / 2, frame_h / 2, frame_w, frame_h)
+            target = previous
+        else:
+            x1, y1, x2, y2 = bbox
+            padding = VIDEO_SETTINGS['vehicle_clip_padding']
+            width = max(x2 - x1, 1) * (1 + 2 * padding)
+            height = max(y2 - y1, 1) * (1 + 2 * padding)
+            target = ((x1 + x2) / 2, (y1 + y2) / 2, width, height)
+        
+        # Eksponensial silliqlash - oyna titramasligi uchun
+        alpha = VIDEO_SETTINGS.get('vehicle_clip_smoothing', 0.0)
+        if previous is not None and alpha > 0:
+            target = tuple(alpha * p + (1 - alpha) * t for p, t in zip(previous, target))
+        
+        cx, cy, width, height = target
+        
+        # Chiqish nisbatiga moslash
+        if width / height < aspect:
+            width = height * aspect
+        else:
+            height = width / aspect
+        
+        # Kadrdan katta bo'lmasligi kerak
+        if width > frame_w:
+            width, height = frame_w, frame_w / aspect
+        if height > frame_h:
+            width, height = frame_h * aspect, frame_h
+        
+        recorder_info['crop_window'] = (cx, cy, width, height)
+        return recorder_info['crop_window']
     
     def stop_vehicle_recording(self, camera_id, track_id):
         """Avtomobil video yozishni to'xtatish"""
@@ -155,14 +531,52 @@ class VideoRecorder:
             track_id in self.vehicle_recorders[camera_id]):
             
             recorder_info = self.vehicle_recorders[camera_id][track_id]
-            recorder_info['writer'].release()
+            if recorder_info['indexed']:
+                self._finish_indexed_clip(camera_id, track_id, recorder_info)
+            else:
+                recorder_info['writer'].release()
+                self.retention.register(Paths.get_video_save_path(recorder_info['filename']), camera_id, 'video')
             duration = time() - recorder_info['start_time']
             
-            print(f"Avtomobil {track_id} (kamera {camera_id}) video yozish tugadi - "
-                  f"{recorder_info['filename']} ({duration:.1f}s, {recorder_info['frames_recorded']} kadr)")
+            logger.info("Avtomobil %s (kamera %s) video yozish tugadi - %s (%.1fs, %d kadr)",
+                        track_id, camera_id, recorder_info['filename'], duration, recorder_info['frames_recorded'],
+                        extra={'event': 'vehicle_recording_stop', 'camera_id': camera_id, 'track_id': track_id,
+                               'file': recorder_info['filename'], 'duration': duration})
             
             del self.vehicle_recorders[camera_id][track_id]
     
+    def _finish_indexed_clip(self, camera_id, track_id, recorder_info):
+        """Avtomobil hodisasini asosiy video indeksiga yozish"""
+        main_info = self.main_recorders.get(camera_id)
+        if main_info is None or main_info['base_name'] != recorder_info['main_base']:
+            return
+        
+        # Oxirgi belgilangan kadr ham klipga kiradi
+        end_segment, end_frame = recorder_info['end']
+        event = {
+            'camera_id': camera_id,
+            'track_id': track_id,
+            'filename': recorder_info['filename'],
+            'start': recorder_info['start'],
+            'end': (end_segment, end_frame + 1),
+            'start_time': recorder_info['start_time'],
+            'end_time': time()
+        }
+        
+        try:
+            with open(main_info['events_path'], 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        except Exception as e:
+            logger.error("Xato hodisa indeksini yozishda: %s", e)
+        
+        with main_info['lock']:
+            # Klip ajratib olinguncha segmentlar saqlash kvotasi bo'yicha o'chirilmaydi
+            segments = {segment['segment_no']: segment for segment in main_info['segments']}
+            event['segment_paths'] = [segments[n]['filepath'] for n in range(event['start'][0], end_segment + 1)]
+            self.retention.hold(event['segment_paths'])
+            main_info['pending_events'].append(event)
+            self._dispatch_vehicle_clips(camera_id, main_info)
+    
     def save_vehicle_image(self, camera_id, track_id, frame):
         """Avtomobil rasmini saqlash"""
         if not SAVE_SETTINGS['save_individual_images']:
@@ -174,25 +588,47 @@ class VideoRecorder:
         
         try:
             cv2.imwrite(filepath, frame)
-            print(f"Avtomobil {track_id} rasmi saqlandi: {filename}")
+            logger.info("Avtomobil %s rasmi saqlandi: %s", track_id, filename)
         except Exception as e:
-            print(f"Xato rasm saqlashda: {e}")
+            logger.error("Xato rasm saqlashda: %s", e)
     
     def stop_all_recordings(self):
         """Barcha video yozishni to'xtatish"""
+        # Avtomobil videolarini to'xtatish (indekslangan kliplar asosiy videodan oldin yakunlanadi)
+        for camera_id in list(self.vehicle_recorders.keys()):
+            for track_id in list(self.vehicle_recorders[camera_id].keys()):
+                self.stop_vehicle_recording(camera_id, track_id)
+        
         # Asosiy video yozishni to'xtatish
         for camera_id in list(self.main_recorders.keys()):
             self.stop_main_recording(camera_id)
         
-        # Avtomobil videolarini to'xtatish
-        for camera_id in list(self.vehicle_recorders.keys()):
-            for track_id in list(self.vehicle_recorders[camera_id].keys()):
-                self.stop_vehicle_recording(camera_id, track_id)
+        # Tanlangan rasmlarni yozishga yuborish
+        self.snapshot_selector.finish_all()
         
-        print("Barcha video yozish to'xtatildi")
+        logger.info("Barcha video yozish to'xtatildi")
+    
+    def stop_camera_recordings(self, camera_id):
+        """Bitta kamera video yozishlarini to'xtatish (boshqa kameralar yozishda davom etadi)"""
+        for track_id in list(self.vehicle_recorders.get(camera_id, {}).keys()):
+            self.stop_vehicle_recording(camera_id, track_id)
+        self.stop_main_recording(camera_id)
+        self.snapshot_selector.finish_inactive(camera_id, ())
+        logger.info("Kamera %s: video yozish to'xtatildi", camera_id)
+    
+    def shutdown(self):
+        """Yozishni to'xtatish va fon ishlarini tugashini kutish"""
+        self.stop_all_recordings()
+        self._segment_jobs.put(None)
+        self._segment_worker.join(timeout=10.0)
+        self.clip_extractor.stop()
+        self.snapshot_selector.stop()
+        self.retention.stop()
     
     def cleanup_vehicle_recordings(self, camera_id, active_track_ids):
         """Faol bo'lmagan avtomobil yozishlarini tozalash"""
+        self.snapshot_selector.finish_inactive(camera_id, active_track_ids)
+        
         if camera_id not in self.vehicle_recorders:
             return
         
@@ -204,6 +640,13 @@ class VideoRecorder:
         for track_id in to_remove:
             self.stop_vehicle_recording(camera_id, track_id)
     
+    def get_vehicle_clip_path(self, camera_id, track_id):
+        """Avtomobil klipi fayl yo'li (yozilmayotgan bo'lsa None)"""
+        recorder_info = self.vehicle_recorders.get(camera_id, {}).get(track_id)
+        if recorder_info is None:
+            return None
+        return Paths.get_video_save_path(recorder_info['filename'])
+    
     def get_recording_status(self):
         """Yozish holatini olish"""
         status = {
@@ -211,4 +654,12 @@ class VideoRecorder:
             'main_recordings': len(self.main_recorders),
             'vehicle_recordings': sum(len(cams) for cams in self.vehicle_recorders.values())
         }
-        return status
\ No newline at end of file
+        return status
+    
+    def get_queue_depths(self):
+        """Fon ishchilari navbatlari uzunligi (metrikalar uchun)"""
+        return {
+            'segment_jobs': self._segment_jobs.qsize(),
+            'clip_jobs': self.clip_extractor.jobs.qsize(),
+            'snapshot_jobs': self.snapshot_selector.encode_jobs.qsize()
+        }
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+RailSafeAI - Kamera bo'yicha inference o'lchamini tanlash (polygon va aniqlangan avtomobillar o'lchami) moduli
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+from config.settings import RESOLUTION_SETTINGS, YOLO_MODEL_PATH
+from modules.event_log import get_logger
+
+logger = get_logger('resolution')
+
+class ResolutionStore:
+    """Kalibrlangan o'lchamlar fayli (JSON, kamera bo'yicha) - qayta ishga tushganda kalibrlash takrorlanmaydi"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Kalibrlash fayli o'qilmadi (%s): %s", path, e)
+    
+    def lookup(self, camera_id, signature):
+        """Shu sozlamalar uchun saqlangan va eskirmagan o'lcham (bo'lmasa None)"""
+        entry = self.entries.get(str(camera_id))
+        if entry is None or entry.get('signature') != signature:
+            return None
+        try:
+            created = datetime.fromisoformat(entry['created'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if datetime.now() - created > timedelta(days=RESOLUTION_SETTINGS['max_age_days']):
+            return None
+        return entry.get('imgsz')
+    
+    def save(self, camera_id, entry):
+        """Kamera natijasini yozish (vaqtinchalik fayl orqali - yarim yozilgan fayl qolmaydi)"""
+        with self.lock:
+            self.entries[str(camera_id)] = entry
+            tmp_path = self.path + '.tmp'
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error("Kalibrlash faylini yozishda xato: %s", e)
+
+class ResolutionCalibrator:
+    """Bitta kamera uchun eng kichik yetarli inference o'lchami
+    
+    Kalibrlash vaqtida model to'liq o'lchamda (reference_imgsz) ishlaydi va polygon ichidagi, kadr
+    chetiga tegmagan qutilarning qisqa tomoni yig'iladi. Tanlanadigan o'lcham - shunday eng kichik
+    `sizes` elementi, unda kichik avtomobillar (object_percentile) model kirishida kamida min_object_px
+    bo'ladi: undan kichik obyektlarda aniqlash (recall) keskin tushadi. Avtomobil kam o'tgan bo'lsa
+    o'lcham polygon geometriyasidan (metrdagi uzunligi) baholanadi.
+    """
+    
+    def __init__(self, camera_id, cam_config, polygon, frame_size, store):
+        self.camera_id = camera_id
+        self.polygon = np.asarray(polygon, dtype=np.float32)
+        self.polygon_length_meters = cam_config['polygon_length_meters']
+        self.frame_size = frame_size
+        self.store = store
+        self.signature = {
+            'source': str(cam_config['source']),
+            'polygon': [[round(float(x), 1), round(float(y), 1)] for x, y in self.polygon],
+            'frame_size': list(frame_size),
+            'model': os.path.basename(YOLO_MODEL_PATH),
+            'sizes': list(RESOLUTION_SETTINGS['sizes']),
+            'min_object_px': RESOLUTION_SETTINGS['min_object_px']
+        }
+        self.samples = []
+        self.frames = 0
+        self.size = store.lookup(camera_id, self.signature)
+        self.active = self.size is None
+        if self.active:
+            logger.info("Kamera %s: inference o'lchami kalibrlanmoqda (%s da)", camera_id,
+                        RESOLUTION_SETTINGS['reference_imgsz'])
+        else:
+            logger.info("Kamera %s: kalibrlangan inference o'lchami %s", camera_id, self.size)
+    
+    def observe(self, bbox):
+        """Polygon ichidagi avtomobil qutisi (kadr chetida kesilgan qutilar hisobga olinmaydi)"""
+        x1, y1, x2, y2 = bbox
+        width, height = self.frame_size
+        margin = RESOLUTION_SETTINGS['edge_margin']
+        if x1 <= margin or y1 <= margin or x2 >= width - margin or y2 >= height - margin:
+            return
+        self.samples.append(min(x2 - x1, y2 - y1))
+    
+    def end_frame(self):
+        """Aniqlash kadri tugadi; yetarli ma'lumot yig'ilgan bo'lsa True"""
+        self.frames += 1
+        return len(self.samples) >= RESOLUTION_SETTINGS['min_samples'] or \
+            self.frames >= RESOLUTION_SETTINGS['max_frames']
+    
+    def _polygon_object_px(self):
+        """Polygondan baho: uzun tomoni (piksel) / uzunligi (metr) - avtomobil eni necha piksel"""
+        (_, _), (side_a, side_b), _ = cv2.minAreaRect(self.polygon)
+        if self.polygon_length_meters <= 0 or max(side_a, side_b) <= 0:
+            return None
+        pixels_per_meter = max(side_a, side_b) / self.polygon_length_meters
+        # O'rtacha masshtab - polygonning uzoq chetida avtomobillar kichikroq
+        return RESOLUTION_SETTINGS['vehicle_width_m'] * pixels_per_meter * RESOLUTION_SETTINGS['prior_safety']
+    
+    def finish(self):
+        """O'lchamni tanlash va saqlash"""
+        self.active = False
+        if len(self.samples) >= RESOLUTION_SETTINGS['min_estimate_samples']:
+            object_px = float(np.percentile(self.samples, RESOLUTION_SETTINGS['object_percentile']))
+            basis = 'detections'
+        else:
+            object_px = self._polygon_object_px()
+            basis = 'polygon'
+        
+        self.size = self.select_size(object_px)
+        self.store.save(self.camera_id, {
+            'imgsz': self.size,
+            'object_px': round(object_px, 1) if object_px is not None else None,
+            'basis': basis,
+            'samples': len(self.samples),
+            'frames': self.frames,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'signature': self.signature
+        })
+        logger.info("Kamera %s: inference o'lchami %s tanlandi (kichik avtomobillar %s px, %s bo'yicha, %d quti)",
+                    self.camera_id, self.size, f"{object_px:.0f}" if object_px is not None else '-', basis,
+                    len(self.samples), extra={'event': 'resolution_calibrated', 'camera_id': self.camera_id})
+        self.samples = []
+        return self.size
+    
+    def select_size(self, object_px):
+        """Kichik avtomobil model kirishida min_object_px dan kichik bo'lmaydigan eng kichik o'lcham"""
+        reference = RESOLUTION_SETTINGS['reference_imgsz']
+        if not object_px:
+            return reference
+        # Letterbox kadrning uzun tomonini imgsz ga keltiradi
+        longest = max(self.frame_size)
+        for size in sorted(RESOLUTION_SETTINGS['sizes']):
+            if size >= reference or object_px * size / longest >= RESOLUTION_SETTINGS['min_object_px']:
+                return min(size, reference)
+        return reference
\ No newline at end of file
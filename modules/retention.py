@@ -0,0 +1,291 @@
+"""
+RailSafeAI - Natija fayllarini saqlash muddati va disk kvotasi moduli
+"""
+import heapq
+import json
+import os
+import shutil
+import threading
+from config.settings import RETENTION_SETTINGS, CAMERAS
+from config.paths import Paths
+
+class RetentionManager:
+    """data/outputs fayllari indeksini xotirada yuritish va kvotadan oshganda eskilarini o'chirish"""
+    
+    def __init__(self):
+        self.enabled = RETENTION_SETTINGS['enabled']
+        self.directories = {
+            'video': Paths.VEHICLE_VIDEOS_DIR,
+            'image': Paths.VEHICLE_IMAGES_DIR
+        }
+        self.camera_ids = sorted((str(cam['id']) for cam in CAMERAS), key=len, reverse=True)
+        
+        self.lock = threading.Lock()
+        self.files = {}           # {path: {'size', 'mtime', 'camera_id', 'kind'}}
+        self.kind_heaps = {}      # {kind: [(mtime, path), ...]} - eng eskisi birinchi
+        self.camera_heaps = {}    # {(camera_id, kind): [(mtime, path), ...]}
+        self.kind_totals = {}     # {kind: bayt}
+        self.camera_totals = {}   # {(camera_id, kind): bayt}
+        self.in_use = {}          # {abspath: soni} - navbatdagi/ishlanayotgan klip ishlari o'qiydigan segmentlar
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        
+        self.protected_path = os.path.join(Paths.OUTPUTS_DIR, RETENTION_SETTINGS['protected_file'])
+        self.protected = self._load_protected()
+        
+        self._wakeup = threading.Event()
+        self._running = False
+        self._worker = None
+        
+        if self.enabled:
+            self._build_index()
+            self.start()
+    
+    def _build_index(self):
+        """Ishga tushishda papkalarni bir marta ko'rib chiqib, indeksni qurish"""
+        count = 0
+        for kind, directory in self.directories.items():
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        self._add(entry.path, stat.st_size, stat.st_mtime,
+                                  self._camera_from_filename(entry.name), kind)
+                        count += 1
+        
+        total = sum(self.kind_totals.values())
+        print(f"Saqlash indeksi tayyor: {count} fayl, {total / 1024 ** 2:.1f} MB")
+    
+    def _camera_from_filename(self, filename):
+        """Fayl nomidan kamera ID sini aniqlash (main_<cam>_..., vehicle_<cam>_...)"""
+        for prefix in ('main_', 'vehicle_'):
+            if filename.startswith(prefix):
+                rest = filename[len(prefix):]
+                for camera_id in self.camera_ids:
+                    if rest.startswith(f"{camera_id}_"):
+                        return camera_id
+        return None
+    
+    def _kind_from_path(self, path):
+        """Fayl qaysi papkaga tegishli ekanini aniqlash"""
+        directory = os.path.dirname(os.path.abspath(path))
+        for kind, kind_directory in self.directories.items():
+            if directory == os.path.abspath(kind_directory):
+                return kind
+        return 'other'
+    
+    def _add(self, path, size, mtime, camera_id, kind):
+        """Faylni indeksga qo'shish (lock ostida chaqiriladi)"""
+        old = self.files.get(path)
+        if old is not None:
+            # Qayta ro'yxatga olingan (o'zgargan) fayl - eski hajmni ayirish
+            self.kind_totals[old['kind']] -= old['size']
+            if old['camera_id'] is not None:
+                self.camera_totals[(old['camera_id'], old['kind'])] -= old['size']
+        
+        self.files[path] = {'size': size, 'mtime': mtime, 'camera_id': camera_id, 'kind': kind}
+        heapq.heappush(self.kind_heaps.setdefault(kind, []), (mtime, path))
+        self.kind_totals[kind] = self.kind_totals.get(kind, 0) + size
+        
+        if camera_id is not None:
+            key = (camera_id, kind)
+            heapq.heappush(self.camera_heaps.setdefault(key, []), (mtime, path))
+            self.camera_totals[key] = self.camera_totals.get(key, 0) + size
+    
+    def _remove(self, path):
+        """Faylni indeksdan olib tashlash (lock ostida); heap dagi yozuv keyinroq tashlab yuboriladi"""
+        info = self.files.pop(path, None)
+        if info is None:
+            return 0
+        
+        self.kind_totals[info['kind']] -= info['size']
+        if info['camera_id'] is not None:
+            self.camera_totals[(info['camera_id'], info['kind'])] -= info['size']
+        return info['size']
+    
+    def register(self, path, camera_id=None, kind=None):
+        """Yozib tugatilgan faylni indeksga qo'shish (faqat shu fayl uchun stat)"""
+        if not self.enabled:
+            return
+        
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        
+        if camera_id is None:
+            camera_id = self._camera_from_filename(os.path.basename(path))
+        if kind is None:
+            kind = self._kind_from_path(path)
+        
+        with self.lock:
+            self._add(path, stat.st_size, stat.st_mtime, camera_id, kind)
+        self._wakeup.set()
+    
+    def protect(self, path):
+        """Faylni o'chirishdan himoyalash (masalan, qoidabuzarlik hodisasi)"""
+        with self.lock:
+            self.protected.add(os.path.abspath(path))
+            self._save_protected()
+    
+    def unprotect(self, path):
+        """Himoyani olib tashlash"""
+        with self.lock:
+            self.protected.discard(os.path.abspath(path))
+            self._save_protected()
+    
+    def hold(self, paths):
+        """Fayllarni vaqtincha o'chirishdan saqlash (masalan, klip hali ajratib olinmagan segmentlar)"""
+        with self.lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                self.in_use[path] = self.in_use.get(path, 0) + 1
+    
+    def release(self, paths):
+        """hold() ni bekor qilish; o'chirish navbatdagi tekshiruvda"""
+        with self.lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                count = self.in_use.pop(path, 0) - 1
+                if count > 0:
+                    self.in_use[path] = count
+        self._wakeup.set()
+    
+    def _load_protected(self):
+        """Himoyalangan fayllar ro'yxatini yuklash"""
+        try:
+            with open(self.protected_path, 'r') as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+        except Exception as e:
+            print(f"Xato himoyalangan fayllar ro'yxatini o'qishda: {e}")
+            return set()
+    
+    def _save_protected(self):
+        """Himoyalangan fayllar ro'yxatini saqlash (lock ostida)"""
+        try:
+            with open(self.protected_path, 'w') as f:
+                json.dump(sorted(self.protected), f, indent=2)
+        except Exception as e:
+            print(f"Xato himoyalangan fayllar ro'yxatini saqlashda: {e}")
+    
+    def _pop_oldest(self, heap, skipped):
+        """Heap dan eng eski, hali mavjud va himoyalanmagan faylni olish"""
+        while heap:
+            mtime, path = heapq.heappop(heap)
+            info = self.files.get(path)
+            if info is None or info['mtime'] != mtime:
+                continue  # Eskirgan heap yozuvi
+            if os.path.abspath(path) in self.protected or os.path.abspath(path) in self.in_use:
+                skipped.append((heap, (mtime, path)))
+                continue
+            return path
+        return None
+    
+    def _select_victims(self):
+        """Kvotadan oshgan joylar uchun o'chiriladigan fayllarni tanlash (lock ostida)"""
+        victims = []
+        skipped = []
+        
+        # 1. Kamera + tur bo'yicha kvotalar
+        for camera_id, quotas in RETENTION_SETTINGS['camera_quotas'].items():
+            for kind, quota in quotas.items():
+                key = (camera_id, kind)
+                heap = self.camera_heaps.get(key, [])
+                while self.camera_totals.get(key, 0) > quota:
+                    path = self._pop_oldest(heap, skipped)
+                    if path is None:
+                        break
+                    victims.append((path, self._remove(path)))
+        
+        # 2. Tur bo'yicha umumiy kvotalar
+        for kind, quota in RETENTION_SETTINGS['quotas'].items():
+            heap = self.kind_heaps.get(kind, [])
+            while self.kind_totals.get(kind, 0) > quota:
+                path = self._pop_oldest(heap, skipped)
+                if path is None:
+                    break
+                victims.append((path, self._remove(path)))
+        
+        # 3. Diskda minimal bo'sh joy
+        min_free = RETENTION_SETTINGS['min_free_bytes']
+        if min_free:
+            free = shutil.disk_usage(Paths.OUTPUTS_DIR).free
+            while free < min_free:
+                heaps = [heap for heap in self.kind_heaps.values() if heap]
+                if not heaps:
+                    break
+                path = self._pop_oldest(min(heaps, key=lambda h: h[0]), skipped)
+                if path is None:
+                    continue
+                size = self._remove(path)
+                victims.append((path, size))
+                free += size
+        
+        # Himoyalangan fayllar heap ga qaytariladi
+        for heap, item in skipped:
+            heapq.heappush(heap, item)
+        
+        return victims
+    
+    def enforce(self):
+        """Kvotalarni tekshirish va eski fayllarni o'chirish"""
+        with self.lock:
+            victims = self._select_victims()
+        
+        # Disk operatsiyalari lock dan tashqarida - register() kutib qolmasligi uchun
+        for path, size in victims:
+            try:
+                os.remove(path)
+                with self.lock:
+                    self.evicted_files += 1
+                    self.evicted_bytes += size
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Xato eski faylni o'chirishda: {path} - {e}")
+        
+        if victims:
+            print(f"Saqlash kvotasi: {len(victims)} ta eski fayl o'chirildi "
+                  f"({sum(size for _, size in victims) / 1024 ** 2:.1f} MB)")
+    
+    def _run(self):
+        """Fon thread - yangi fayl yozilganda yoki vaqti-vaqti bilan kvotani tekshiradi"""
+        while self._running:
+            self._wakeup.wait(RETENTION_SETTINGS['check_interval'])
+            self._wakeup.clear()
+            if not self._running:
+                break
+            try:
+                self.enforce()
+            except Exception as e:
+                print(f"Saqlash boshqaruvida xato: {e}")
+    
+    def start(self):
+        """Fon threadni ishga tushirish"""
+        if self._worker is None or not self._worker.is_alive():
+            self._running = True
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+    
+    def stop(self, timeout=5.0):
+        """Fon threadni to'xtatish"""
+        self._running = False
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+    
+    def get_usage(self):
+        """Indeks bo'yicha disk ishlatilishi (metrikalar uchun)"""
+        with self.lock:
+            return {
+                'files': len(self.files),
+                'kind_bytes': dict(self.kind_totals),
+                'camera_bytes': {f"{camera_id}/{kind}": size
+                                 for (camera_id, kind), size in self.camera_totals.items()},
+                'evicted_files': self.evicted_files,
+                'evicted_bytes': self.evicted_bytes
+            }
\ No newline at end of file
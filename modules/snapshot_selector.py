@@ -0,0 +1,119 @@
+"""
+RailSafeAI - Avtomobilning eng yaxshi rasmini tanlash moduli
+"""
+import threading
+from datetime import datetime
+from queue import Queue
+import cv2
+from config.settings import SNAPSHOT_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('snapshot')
+
+def estimate_sharpness(crop):
+    """Laplacian dispersiyasi orqali aniqlik (0..1), kichraytirilgan nusxada hisoblanadi"""
+    sample_size = SNAPSHOT_SETTINGS['sharpness_sample_size']
+    h, w = crop.shape[:2]
+    scale = sample_size / float(max(h, w))
+    if scale < 1:
+        crop = cv2.resize(crop, (max(int(w * scale), 1), max(int(h * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+    
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    variance = cv2.Laplacian(gray, cv2.CV_32F).var()
+    return variance / (variance + SNAPSHOT_SETTINGS['sharpness_reference'])
+
+class SnapshotSelector:
+    """Har bir track uchun eng yaxshi kesilgan rasmni xotirada saqlash va fon rejimida JPEG ga yozish"""
+    
+    def __init__(self, on_saved=None):
+        self.on_saved = on_saved  # Rasm yozilgandan keyin chaqiriladi: on_saved(path)
+        self.best = {}  # {(camera_id, track_id): {'score': float, 'crop': ndarray, 'time': datetime}}
+        self.encode_jobs = Queue()
+        self._worker = threading.Thread(target=self._run_encoder, daemon=True)
+        self._worker.start()
+    
+    def update(self, camera_id, track_id, frame, vehicle_info):
+        """Yangi kadrni baholash; oldingisidan yaxshi bo'lsa kesilgan qismini saqlash"""
+        if not vehicle_info or not vehicle_info.get('bbox'):
+            return
+        
+        frame_h, frame_w = frame.shape[:2]
+        x1, y1, x2, y2 = vehicle_info['bbox']
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(x2), frame_w), min(int(y2), frame_h)
+        if x2 <= x1 or y2 <= y1:
+            return
+        
+        key = (camera_id, track_id)
+        current = self.best.get(key)
+        
+        # Tez baho: ishonch * nisbiy o'lcham; kadr chetiga tegib turgan (kesilgan) avtomobil jarimalanadi
+        size_score = ((x2 - x1) * (y2 - y1) / float(frame_w * frame_h)) ** 0.5
+        score = vehicle_info.get('confidence', 0) * size_score
+        if x1 == 0 or y1 == 0 or x2 == frame_w or y2 == frame_h:
+            score *= SNAPSHOT_SETTINGS['edge_penalty']
+        
+        # Aniqlik koeffitsienti <= 1, shuning uchun yutqazadigan kadr uchun aniqlik hisoblanmaydi
+        if current is not None and score <= current['score']:
+            return
+        
+        crop = frame[y1:y2, x1:x2]
+        score *= estimate_sharpness(crop)
+        if current is not None and score <= current['score']:
+            return
+        
+        # Atrofdagi qo'shimcha joy bilan nusxa olish (keyingi kadrlar ustiga chizilishi mumkin)
+        pad_x = int((x2 - x1) * SNAPSHOT_SETTINGS['padding'])
+        pad_y = int((y2 - y1) * SNAPSHOT_SETTINGS['padding'])
+        crop = frame[max(y1 - pad_y, 0):min(y2 + pad_y, frame_h),
+                     max(x1 - pad_x, 0):min(x2 + pad_x, frame_w)].copy()
+        
+        self.best[key] = {'score': score, 'crop': crop, 'time': datetime.now()}
+    
+    def finish(self, camera_id, track_id):
+        """Track tugadi - eng yaxshi rasmni JPEG ga yozish uchun navbatga qo'yish"""
+        snapshot = self.best.pop((camera_id, track_id), None)
+        if snapshot is None:
+            return
+        
+        timestamp = snapshot['time'].strftime("%Y%m%d_%H%M%S")
+        filename = f"vehicle_{camera_id}_{track_id}_{timestamp}.jpg"
+        self.encode_jobs.put((filename, snapshot['crop'], track_id))
+    
+    def finish_inactive(self, camera_id, active_track_ids):
+        """Endi ko'rinmayotgan tracklarning rasmlarini yakunlash"""
+        ended = [key for key in list(self.best) if key[0] == camera_id and key[1] not in active_track_ids]
+        for _, track_id in ended:
+            self.finish(camera_id, track_id)
+    
+    def finish_all(self):
+        """Barcha tracklar rasmlarini yakunlash"""
+        for camera_id, track_id in list(self.best.keys()):
+            self.finish(camera_id, track_id)
+    
+    def _run_encoder(self):
+        """Fon ishchisi - JPEG kodlash kamera threadidan tashqarida"""
+        params = [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_SETTINGS['jpeg_quality']]
+        while True:
+            job = self.encode_jobs.get()
+            if job is None:
+                break
+            
+            filename, crop, track_id = job
+            try:
+                filepath = Paths.get_image_save_path(filename)
+                cv2.imwrite(filepath, crop, params)
+                logger.info("Avtomobil %s rasmi saqlandi: %s", track_id, filename,
+                            extra={'event': 'snapshot_saved', 'track_id': track_id, 'file': filename})
+                if self.on_saved is not None:
+                    self.on_saved(filepath)
+            except Exception as e:
+                logger.error("Xato rasm saqlashda: %s", e)
+    
+    def stop(self, timeout=10.0):
+        """Qolgan rasmlarni yozib, ishchini to'xtatish"""
+        self.finish_all()
+        self.encode_jobs.put(None)
+        self._worker.join(timeout=timeout)
\ No newline at end of file
@@ -38,7 +38,8 @@ class SpeedEstimator:
     def set_enabled(self, enabled):
         """Tezlik hisoblashni yoqish/o'chirish"""
         self.enabled = enabled
-        print(f"Tezlik hisoblash: {'YOQILDI' if enabled else "O'CHIRILDI"}")
+        status = "YOQILDI" if enabled else "O'CHIRILDI"
+        print(f"Tezlik hisoblash: {status}")
     
     def get_speed_info(self, vehicle_data, current_time, polygon_length):
         """Avtomobil uchun tezlik ma'lumotlarini olish"""
@@ -0,0 +1,273 @@
+"""
+RailSafeAI - Asosiy video indeksi va kliplarni ajratib olish moduli
+"""
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from queue import Queue
+import numpy as np
+from modules.event_log import get_logger
+
+logger = get_logger('stream_index')
+
+# Indeks fayli: sarlavha + bir xil o'lchamli yozuvlar (har kadr uchun bitta)
+FRAME_INDEX_MAGIC = b'RSFIDX2\0'
+FRAME_INDEX_HEADER = struct.Struct('<8sdd')  # magic, fps, boshlanish vaqti
+FRAME_INDEX_DTYPE = np.dtype([
+    ('frame', '<u8'),       # Segment ichidagi kadr raqami
+    ('timestamp', '<f8')    # Kadr yozilgan vaqt (unix)
+])
+# Oldingi versiya: yozuvchi buferlagan fayl hajmi ham bor edi (kadr o'rnini ko'rsatmaydi)
+_FRAME_INDEX_V1_MAGIC = b'RSFIDX1\0'
+_FRAME_INDEX_V1_DTYPE = np.dtype([('frame', '<u8'), ('timestamp', '<f8'), ('offset', '<i8')])
+
+class FrameIndexWriter:
+    """Segment uchun kadr indeksini (sidecar fayl) yozish"""
+    
+    def __init__(self, path, fps, start_time, flush_every=250):
+        self.path = path
+        self.flush_every = flush_every
+        self._rows = []
+        self._file = open(path, 'wb')
+        self._file.write(FRAME_INDEX_HEADER.pack(FRAME_INDEX_MAGIC, float(fps), float(start_time)))
+    
+    def append(self, frame_no, timestamp):
+        """Bitta kadr yozuvini qo'shish"""
+        self._rows.append((frame_no, timestamp))
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+    
+    def flush(self):
+        """Yig'ilgan yozuvlarni faylga tushirish"""
+        if self._rows and not self._file.closed:
+            np.array(self._rows, dtype=FRAME_INDEX_DTYPE).tofile(self._file)
+            self._file.flush()
+            self._rows = []
+    
+    def close(self):
+        """Indeks faylini yopish"""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+def read_frame_index(path):
+    """Indeks faylini o'qish: (fps, boshlanish vaqti, yozuvlar massivi)"""
+    with open(path, 'rb') as f:
+        magic, fps, start_time = FRAME_INDEX_HEADER.unpack(f.read(FRAME_INDEX_HEADER.size))
+        if magic not in (FRAME_INDEX_MAGIC, _FRAME_INDEX_V1_MAGIC):
+            raise ValueError(f"Noto'g'ri indeks fayli: {path}")
+    
+    dtype = FRAME_INDEX_DTYPE if magic == FRAME_INDEX_MAGIC else _FRAME_INDEX_V1_DTYPE
+    rows = np.memmap(path, dtype=dtype, mode='r', offset=FRAME_INDEX_HEADER.size) \
+        if os.path.getsize(path) > FRAME_INDEX_HEADER.size else np.empty(0, dtype=dtype)
+    return fps, start_time, rows
+
+def get_index_path(video_path):
+    """Video segmenti uchun indeks fayl yo'li"""
+    return os.path.splitext(video_path)[0] + '.fidx'
+
+# Qidiruv indeksi: har bir sekund uchun bitta (segment, kadr) yozuvi - O(1) qidiruv
+SEEK_INDEX_MAGIC = b'RSSIDX1\0'
+SEEK_INDEX_HEADER = struct.Struct('<8sq')  # magic, birinchi sekund (unix)
+SEEK_INDEX_RECORD = struct.Struct('<II')   # segment raqami, segment ichidagi kadr
+
+class SeekIndexWriter:
+    """Yozuv uchun vaqt -> (segment, kadr) indeksini yozish"""
+    
+    def __init__(self, path, start_time, flush_every=60):
+        self.path = path
+        self.first_second = int(start_time)
+        self.last_second = self.first_second - 1
+        self.flush_every = flush_every
+        self._buffer = bytearray()
+        self._pending = 0
+        self._file = open(path, 'wb')
+        self._file.write(SEEK_INDEX_HEADER.pack(SEEK_INDEX_MAGIC, self.first_second))
+    
+    def mark(self, timestamp, segment_no, frame_no):
+        """Kadr yozilishidan oldin chaqiriladi; yangi sekundlar uchun yozuv qo'shiladi"""
+        second = int(timestamp)
+        if second <= self.last_second:
+            return
+        
+        # Kadrsiz o'tgan sekundlar ham shu kadrga (undan keyingi birinchi kadrga) bog'lanadi
+        record = SEEK_INDEX_RECORD.pack(segment_no, frame_no)
+        count = second - self.last_second
+        self._buffer += record * count
+        self._pending += count
+        self.last_second = second
+        
+        if self._pending >= self.flush_every:
+            self.flush()
+    
+    def flush(self):
+        """Buferdagi yozuvlarni faylga tushirish"""
+        if self._buffer and not self._file.closed:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+            self._pending = 0
+    
+    def close(self):
+        """Indeks faylini yopish"""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+def get_seek_index_path(base_path):
+    """Yozuv (barcha segmentlar) uchun qidiruv indeksi yo'li"""
+    return base_path + '.sidx'
+
+def seek_recording(seek_index_path, timestamp):
+    """Berilgan vaqt uchun (segment yo'li, kadr, segment ichidagi sekund) ni O(1) da topish"""
+    with open(seek_index_path, 'rb') as f:
+        magic, first_second = SEEK_INDEX_HEADER.unpack(f.read(SEEK_INDEX_HEADER.size))
+        if magic != SEEK_INDEX_MAGIC:
+            raise ValueError(f"Noto'g'ri qidiruv indeksi: {seek_index_path}")
+        
+        position = int(timestamp) - first_second
+        if position < 0:
+            return None
+        
+        f.seek(SEEK_INDEX_HEADER.size + position * SEEK_INDEX_RECORD.size)
+        record = f.read(SEEK_INDEX_RECORD.size)
+        if len(record) < SEEK_INDEX_RECORD.size:
+            return None  # Yozuv oralig'idan tashqarida
+    
+    segment_no, frame_no = SEEK_INDEX_RECORD.unpack(record)
+    base_path = seek_index_path[:-len('.sidx')]
+    segment_path = f"{base_path}_s{segment_no:04d}.avi"
+    
+    # Segment fps i kadr indeksi sarlavhasidan olinadi
+    fps, _, _ = read_frame_index(get_index_path(segment_path))
+    return segment_path, frame_no, frame_no / fps if fps else 0.0
+
+class ClipExtractor:
+    """Asosiy video segmentlaridan qayta kodlashsiz (stream copy) klip ajratib olish"""
+    
+    def __init__(self, on_complete=None):
+        self.ffmpeg_path = shutil.which('ffmpeg')
+        self.on_complete = on_complete  # Klip tayyor bo'lganda chaqiriladi: on_complete(output_path)
+        self.jobs = Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+    
+    def is_available(self):
+        """ffmpeg mavjudligini tekshirish"""
+        return self.ffmpeg_path is not None
+    
+    def submit(self, parts, output_path, on_finished=None):
+        """Klipni fon rejimida ajratib olish uchun navbatga qo'yish
+        
+        parts - [(segment_yo'li, boshlanish_s, tugash_s), ...] segment ichidagi vaqtlar
+        on_finished - ish tugagach (muvaffaqiyatli yoki yo'q) chaqiriladi, masalan segmentlarni bo'shatish
+        """
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self.jobs.put((parts, output_path, on_finished))
+    
+    def _run(self):
+        """Fon ishchisi"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            parts, output_path, on_finished = job
+            try:
+                self.extract_clip(parts, output_path)
+            finally:
+                if on_finished is not None:
+                    on_finished()
+    
+    def extract_clip(self, parts, output_path):
+        """Klipni darhol ajratib olish (talab bo'yicha)"""
+        if not self.is_available() or not parts:
+            return False
+        
+        try:
+            if len(parts) == 1:
+                segment_path, start_s, end_s = parts[0]
+                success = self._copy_range(segment_path, start_s, end_s, output_path)
+            else:
+                # Bir necha segmentdagi qismlarni alohida ajratib, keyin birlashtirish
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    part_paths = []
+                    for i, (segment_path, start_s, end_s) in enumerate(parts):
+                        part_path = os.path.join(tmp_dir, f"part_{i}{os.path.splitext(output_path)[1]}")
+                        if self._copy_range(segment_path, start_s, end_s, part_path):
+                            part_paths.append(part_path)
+                    success = self._concat(part_paths, output_path, tmp_dir)
+            
+            if success:
+                logger.info("Klip ajratib olindi: %s", os.path.basename(output_path),
+                            extra={'event': 'clip_extracted', 'path': output_path})
+                if self.on_complete is not None:
+                    self.on_complete(output_path)
+            return success
+        except Exception as e:
+            logger.error("Xato klip ajratib olishda (%s): %s", os.path.basename(output_path), e)
+            return False
+    
+    def _copy_range(self, segment_path, start_s, end_s, output_path):
+        """Segmentning bir qismini stream copy bilan nusxalash"""
+        command = [
+            self.ffmpeg_path, '-y', '-loglevel', 'error',
+            '-ss', f"{max(start_s, 0):.3f}", '-i', segment_path,
+            '-t', f"{max(end_s - start_s, 0.001):.3f}",
+            '-c', 'copy', output_path
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            logger.error("Xato: ffmpeg klip ajratmadi - %s", result.stderr.decode(errors='ignore').strip())
+            return False
+        return True
+    
+    def _concat(self, part_paths, output_path, tmp_dir):
+        """Qismlarni qayta kodlashsiz birlashtirish"""
+        if not part_paths:
+            return False
+        
+        list_path = os.path.join(tmp_dir, 'parts.txt')
+        with open(list_path, 'w') as f:
+            for part_path in part_paths:
+                f.write(f"file '{part_path}'\n")
+        
+        command = [
+            self.ffmpeg_path, '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-c', 'copy', output_path
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            logger.error("Xato: ffmpeg qismlarni birlashtirmadi - %s", result.stderr.decode(errors='ignore').strip())
+            return False
+        return True
+    
+    def stop(self, timeout=10.0):
+        """Navbatdagi ishlarni tugatib, ishchini to'xtatish"""
+        if self._worker is not None and self._worker.is_alive():
+            self.jobs.put(None)
+            self._worker.join(timeout=timeout)
+
+if __name__ == "__main__":
+    # Masalan: python -m modules.stream_index data/outputs/vehicle_videos/main_cam1_20250101_120000.sidx 1735732800
+    import sys
+    
+    if len(sys.argv) != 3:
+        print("Foydalanish: python -m modules.stream_index <yozuv.sidx> <unix_vaqt>")
+        sys.exit(1)
+    
+    found = seek_recording(sys.argv[1], float(sys.argv[2]))
+    if found is None:
+        print("Berilgan vaqt yozuv oralig'ida emas")
+        sys.exit(1)
+    
+    segment_path, frame_no, offset_s = found
+    print(f"Segment: {segment_path}")
+    print(f"Kadr: {frame_no} ({offset_s:.2f}s)")
+    print(f"Ko'rish: ffplay -ss {offset_s:.2f} {segment_path}")
\ No newline at end of file
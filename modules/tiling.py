@@ -0,0 +1,171 @@
+"""
+RailSafeAI - Polygon hududini bo'laklab (tiled) aniqlash - uzoqdagi kichik avtomobillar uchun moduli
+"""
+import math
+import numpy as np
+from config.settings import TILING_SETTINGS
+from modules.detection_cache import CachedDetections
+from modules.event_log import get_logger
+
+logger = get_logger('tiling')
+
+def polygon_region(polygon, frame_size, margin):
+    """Polygon chegaralari margin (o'lchamiga nisbatan) bilan kengaytirilgan va kadr ichiga kesilgan (x1, y1, x2, y2)"""
+    width, height = frame_size
+    polygon = np.asarray(polygon, dtype=np.float32)
+    x1, y1 = polygon.min(axis=0)
+    x2, y2 = polygon.max(axis=0)
+    pad_x, pad_y = (x2 - x1) * margin, (y2 - y1) * margin
+    return (max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0),
+            min(int(math.ceil(x2 + pad_x)), width), min(int(math.ceil(y2 + pad_y)), height))
+
+def _axis_starts(start, end, tile, overlap):
+    """Bir o'q bo'yicha bo'laklar boshlanishi (chetlari aniq hudud chegarasiga tushadi)"""
+    length = end - start
+    if length <= tile:
+        return [start]
+    count = math.ceil((length - tile) / (tile * (1.0 - overlap))) + 1
+    step = (length - tile) / (count - 1)
+    return [start + int(round(i * step)) for i in range(count)]
+
+def make_tiles(region, tile_size, overlap):
+    """Hududni bir-birini overlap qismga yopadigan tile_size x tile_size bo'laklarga ajratish"""
+    x1, y1, x2, y2 = region
+    tile_w, tile_h = min(tile_size, x2 - x1), min(tile_size, y2 - y1)
+    return [(x, y, x + tile_w, y + tile_h)
+            for y in _axis_starts(y1, y2, tile_h, overlap)
+            for x in _axis_starts(x1, x2, tile_w, overlap)]
+
+def merge_detections(boxes, scores, classes, truncated, iou_threshold, ios_threshold, truncated_weight=0.5):
+    """Bo'laklar orasidagi takrorlarni olib tashlash (klass bo'yicha ochko'z NMS), qoldirilganlar indekslari
+    
+    Ikki bo'lak chegarasida kesilgan avtomobil bir bo'lakda to'liq, boshqasida qisman ko'rinadi - ularning
+    IoU si kichik, shuning uchun kichik qutining qanchasi kattasi ichida ekanligi (IoS) ham tekshiriladi.
+    Bo'lak ichki chetiga tegib turgan (kesilgan) qutilar tartibda keyinroq turadi.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+    order = np.argsort(-(scores * np.where(truncated, truncated_weight, 1.0)), kind='stable')
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for position, index in enumerate(order):
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        rest = order[position + 1:]
+        rest = rest[~suppressed[rest] & (classes[rest] == classes[index])]
+        if len(rest) == 0:
+            continue
+        w = np.minimum(boxes[rest, 2], boxes[index, 2]) - np.maximum(boxes[rest, 0], boxes[index, 0])
+        h = np.minimum(boxes[rest, 3], boxes[index, 3]) - np.maximum(boxes[rest, 1], boxes[index, 1])
+        inter = np.maximum(w, 0) * np.maximum(h, 0)
+        iou = inter / np.maximum(areas[rest] + areas[index] - inter, 1e-6)
+        ios = inter / np.maximum(np.minimum(areas[rest], areas[index]), 1e-6)
+        suppressed[rest[(iou > iou_threshold) | (ios > ios_threshold)]] = True
+    return np.asarray(keep, dtype=np.int64)
+
+def _to_numpy(values):
+    return values.cpu().numpy() if hasattr(values, 'cpu') else np.asarray(values)
+
+class TiledInference:
+    """Polygon hududi bo'laklari (va ixtiyoriy kichraytirilgan butun kadr) bitta batch da aniqlanadi
+    
+    Bo'laklar manba o'lchamida (1:1) modelga beriladi - uzoqdagi bir necha piksellik avtomobillar
+    kichraymaydi, butun kadr esa yuqori o'lchamda ishlanmaydi. Natijalar kadr koordinatalariga
+    o'tkaziladi, takrorlar merge_detections bilan olib tashlanadi va ultralytics trackeriga
+    (model.track() dagi kabi) beriladi. Natija - CachedDetections ustunlari.
+    """
+    
+    def __init__(self, target_classes):
+        self.target_classes = target_classes
+        self.polygon = None
+        self.tracker = None
+        self.frame_size = None
+        self.region = None
+        self.tiles = []
+    
+    def set_polygon(self, polygon):
+        self.polygon = polygon
+        self.frame_size = None  # Bo'laklar keyingi kadrda qayta hisoblanadi
+    
+    def _layout(self, frame):
+        """Kadr o'lchami uchun bo'laklar (bir marta hisoblanadi)"""
+        frame_size = (frame.shape[1], frame.shape[0])
+        if frame_size == self.frame_size:
+            return
+        self.frame_size = frame_size
+        if self.polygon is None:
+            self.region = (0, 0) + frame_size
+        else:
+            self.region = polygon_region(self.polygon, frame_size, TILING_SETTINGS['region_margin'])
+        self.tiles = make_tiles(self.region, TILING_SETTINGS['tile_size'], TILING_SETTINGS['overlap'])
+        logger.info("Bo'laklab aniqlash: hudud %s, %d ta %dpx bo'lak%s", self.region, len(self.tiles),
+                    TILING_SETTINGS['tile_size'], " + butun kadr" if TILING_SETTINGS['full_frame'] else "")
+    
+    def _create_tracker(self):
+        # model.track() ishlatadigan trackerlar va sozlamalar
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(TILING_SETTINGS['tracker'])))
+        return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=30)
+    
+    def detect(self, model, frame):
+        """Bo'laklar batch inference va birlashtirish: (xyxy, ishonch, klass) kadr koordinatalarida"""
+        self._layout(frame)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.tiles]
+        if TILING_SETTINGS['full_frame']:
+            crops.append(frame)
+        results = model.predict(crops, imgsz=TILING_SETTINGS['tile_size'], conf=TILING_SETTINGS['conf'],
+                                classes=self.target_classes, verbose=False)
+        
+        boxes, scores, classes, truncated = [], [], [], []
+        rx1, ry1, rx2, ry2 = self.region
+        edge = TILING_SETTINGS['edge_margin']
+        for index, result in enumerate(results):
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            xyxy = _to_numpy(result.boxes.xyxy).astype(np.float32).reshape(-1, 4)
+            if index < len(self.tiles):
+                x1, y1, x2, y2 = self.tiles[index]
+                xyxy += (x1, y1, x1, y1)
+                # Hudud chegarasida bo'lmagan bo'lak cheti - quti shu yerda kesilgan bo'lishi mumkin
+                cut = np.zeros(len(xyxy), dtype=bool)
+                if x1 > rx1:
+                    cut |= xyxy[:, 0] <= x1 + edge
+                if y1 > ry1:
+                    cut |= xyxy[:, 1] <= y1 + edge
+                if x2 < rx2:
+                    cut |= xyxy[:, 2] >= x2 - edge
+                if y2 < ry2:
+                    cut |= xyxy[:, 3] >= y2 - edge
+            else:
+                cut = np.zeros(len(xyxy), dtype=bool)
+            boxes.append(xyxy)
+            scores.append(_to_numpy(result.boxes.conf).astype(np.float32).reshape(-1))
+            classes.append(_to_numpy(result.boxes.cls).astype(np.float32).reshape(-1))
+            truncated.append(cut)
+        
+        if not boxes:
+            return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+        boxes, scores = np.concatenate(boxes), np.concatenate(scores)
+        classes, truncated = np.concatenate(classes), np.concatenate(truncated)
+        keep = merge_detections(boxes, scores, classes, truncated,
+                                TILING_SETTINGS['nms_iou'], TILING_SETTINGS['merge_ios'])
+        return boxes[keep], scores[keep], classes[keep]
+    
+    def detect_and_track(self, model, frame):
+        """Birlashtirilgan aniqlashlarni kuzatish: CachedDetections (track_id, klass, ishonch, xyxy)"""
+        from ultralytics.engine.results import Boxes
+        boxes, scores, classes = self.detect(model, frame)
+        if self.tracker is None:
+            self.tracker = self._create_tracker()
+        detections = Boxes(np.column_stack([boxes, scores, classes]), frame.shape[:2])
+        tracks = np.asarray(self.tracker.update(detections, frame), dtype=np.float32).reshape(-1, 8)
+        return CachedDetections(
+            tracks[:, 4].astype(np.int32),
+            tracks[:, 6].astype(np.int16),
+            tracks[:, 5],
+            tracks[:, :4]
+        )
\ No newline at end of file
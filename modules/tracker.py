@@ -2,17 +2,26 @@
 RailSafeAI - Avtomobil kuzatish moduli
 """
 from collections import defaultdict
-from config.settings import TEXT_SETTINGS
+from time import time
+from config.settings import TEXT_SETTINGS, TRACKING_SETTINGS
+from modules.event_log import get_logger
+from modules.traffic_stats import TrafficAggregator
+from modules.event_bus import EventBus, UpdateEvent, EnterEvent, ExitEvent, ExpireEvent
 import cv2
 
+logger = get_logger('tracker')
+
 class VehicleTracker:
     """Avtomobillarni kuzatish va ma'lumotlarni saqlash uchun klass"""
     
-    def __init__(self):
+    def __init__(self, event_bus=None):
         # Har bir kamera uchun avtomobil ma'lumotlari
         self.vehicle_tracking = defaultdict(lambda: defaultdict(lambda: {
             'start_time': None,
             'end_time': None,
+            'entry_timestamp': None,
+            'exit_timestamp': None,
+            'exit_pending': False,
             'in_polygon': False,
             'total_time': 0,
             'speed': 0,
@@ -22,12 +31,31 @@ class VehicleTracker:
             'confidence': 0,
             'bbox': None,
             'center': None,
-            'last_seen': 0
+            'last_seen': 0,
+            'license_plate': None,
+            'plate_confidence': 0
         }))
+        
+        # Polygondan to'liq o'tgan avtomobillar soni (kamera bo'yicha, kamayib bormaydi)
+        self.passage_counts = defaultdict(int)
+        
+        # Daqiqalik/soatlik soni va tezlik kvantillari (yozuvlarni saqlamasdan)
+        self.traffic_stats = TrafficAggregator()
+        
+        # Kirish, chiqish, o'chirish va har kadrdagi yangilanish hodisalari iste'molchilarga shu orqali
+        self.events = event_bus or EventBus()
     
-    def update_vehicle(self, camera_id, vehicle_data, current_time, is_inside_polygon):
-        """Avtomobil ma'lumotlarini yangilash"""
+    def update_vehicle(self, camera_id, vehicle_data, current_time, is_inside_polygon, timestamp=None):
+        """Avtomobil ma'lumotlarini yangilash (polygondan hozirgina chiqqan bo'lsa True)
+        
+        timestamp - kadr vaqti (unix) hodisalar uchun; current_time - video vaqti (tezlik uchun).
+        Chiqish darhol yakunlanmaydi: exit_debounce ichida qaytib kirgan avtomobil (polygon chetida
+        tebranish) o'sha o'tishni davom ettiradi - yakunlanganlar pop_finished_passages orqali olinadi.
+        """
         track_id = vehicle_data['track_id']
+        timestamp = timestamp if timestamp is not None else time()
+        if self.events.has_subscribers(UpdateEvent):
+            self.events.publish(UpdateEvent(camera_id, track_id, timestamp, vehicle_data, is_inside_polygon))
         
         # Asosiy ma'lumotlarni saqlash
         vehicle_info = self.vehicle_tracking[camera_id][track_id]
@@ -40,18 +68,59 @@ class VehicleTracker:
         
         # Polygon holati o'zgarishini kuzatish
         if is_inside_polygon:
-            if not vehicle_info['in_polygon']:
+            if vehicle_info['exit_pending']:
+                # Chegarada tebranish - yangi kirish emas, o'tish davom etadi
+                vehicle_info['exit_pending'] = False
+                vehicle_info['in_polygon'] = True
+            elif not vehicle_info['in_polygon']:
                 # Polygon ichiga kirdi
                 vehicle_info['start_time'] = current_time
+                vehicle_info['entry_timestamp'] = timestamp
                 vehicle_info['in_polygon'] = True
-                print(f"Kamera {camera_id}: Avtomobil {track_id} polygon ichiga kirdi")
+                logger.info("Kamera %s: Avtomobil %s polygon ichiga kirdi", camera_id, track_id,
+                            extra={'event': 'enter', 'camera_id': camera_id, 'track_id': track_id})
+                if self.events.has_subscribers(EnterEvent):
+                    self.events.publish(EnterEvent(camera_id, track_id, timestamp, vehicle_info['class_name']))
         else:
             if vehicle_info['in_polygon']:
-                # Polygondan chiqdi
+                # Polygondan chiqdi (exit_debounce dan keyin yakunlanadi)
                 vehicle_info['end_time'] = current_time
+                vehicle_info['exit_timestamp'] = timestamp
                 vehicle_info['in_polygon'] = False
+                vehicle_info['exit_pending'] = True
                 vehicle_info['total_time'] = vehicle_info['end_time'] - vehicle_info['start_time']
-                print(f"Kamera {camera_id}: Avtomobil {track_id} polygondan chiqdi. Vaqt: {vehicle_info['total_time']:.1f}s")
+                return True
+        
+        return False
+    
+    def pop_finished_passages(self, camera_id, current_time):
+        """exit_debounce davomida qaytib kirmagan (yoki ko'rinmay qolgan) avtomobillar - har o'tish bir marta"""
+        debounce = TRACKING_SETTINGS['exit_debounce']
+        finished = []
+        for track_id, vehicle_info in self.vehicle_tracking[camera_id].items():
+            if vehicle_info['exit_pending'] and current_time - vehicle_info['end_time'] >= debounce:
+                vehicle_info['exit_pending'] = False
+                finished.append(track_id)
+        return finished
+    
+    def finish_passage(self, camera_id, track_id, speed, clip_path=None, timestamp=None):
+        """Polygondan chiqqan avtomobil o'rtacha tezligini saqlash, statistikaga qo'shish va ExitEvent tarqatish
+        
+        timestamp - chiqish kadri vaqti (EnterEvent/UpdateEvent bilan bir xil soat).
+        """
+        vehicle_info = self.vehicle_tracking[camera_id][track_id]
+        vehicle_info['speed'] = speed
+        self.passage_counts[camera_id] += 1
+        logger.info("Kamera %s: Avtomobil %s polygondan chiqdi. Vaqt: %.1fs", camera_id, track_id,
+                    vehicle_info['total_time'],
+                    extra={'event': 'exit', 'camera_id': camera_id, 'track_id': track_id,
+                           'duration': vehicle_info['total_time']})
+        self.traffic_stats.add(camera_id, vehicle_info['class_name'], speed)
+        if self.events.has_subscribers(ExitEvent):
+            # Nusxa - async iste'molchilar o'qiyotganda kamera threadi yozuvni o'zgartirishi mumkin
+            self.events.publish(ExitEvent(camera_id, track_id, timestamp if timestamp is not None else time(),
+                                          dict(vehicle_info), clip_path))
+        return vehicle_info
     
     def get_vehicle_info(self, camera_id, track_id):
         """Avtomobil ma'lumotlarini olish"""
@@ -61,16 +130,34 @@ class VehicleTracker:
         """Kameradagi barcha avtomobillar ma'lumotlarini olish"""
         return self.vehicle_tracking[camera_id]
     
-    def cleanup_old_vehicles(self, camera_id, current_time, timeout=30):
-        """Uzoq vaqt ko'rinmagan avtomobillarni tozalash"""
+    def get_passage_count(self, camera_id):
+        """Polygondan o'tgan avtomobillar soni"""
+        return self.passage_counts.get(camera_id, 0)
+    
+    def cleanup_old_vehicles(self, camera_id, current_time, timeout=30, timestamp=None):
+        """Uzoq vaqt ko'rinmagan avtomobillarni tozalash (timestamp - joriy kadr vaqti, ExpireEvent uchun)"""
         to_remove = []
         for track_id, vehicle_info in self.vehicle_tracking[camera_id].items():
             if current_time - vehicle_info['last_seen'] > timeout:
                 to_remove.append(track_id)
         
+        publish = self.events.has_subscribers(ExpireEvent)
+        timestamp = timestamp if timestamp is not None else time()
         for track_id in to_remove:
-            del self.vehicle_tracking[camera_id][track_id]
-            print(f"Kamera {camera_id}: Avtomobil {track_id} kesh dan o'chirildi")
+            vehicle_info = self.vehicle_tracking[camera_id].pop(track_id)
+            logger.debug("Kamera %s: Avtomobil %s kesh dan o'chirildi", camera_id, track_id,
+                         extra={'event': 'expire', 'camera_id': camera_id, 'track_id': track_id})
+            if publish:
+                self.events.publish(ExpireEvent(camera_id, track_id, timestamp, vehicle_info))
+    
+    def reset_camera(self, camera_id):
+        """Kamera olib tashlanganda yoki qayta ishga tushganda uning avtomobillarini tozalash (o'tishlar soni saqlanadi)"""
+        vehicles = self.vehicle_tracking.pop(camera_id, {})
+        if self.events.has_subscribers(ExpireEvent):
+            now = time()
+            for track_id, vehicle_info in vehicles.items():
+                self.events.publish(ExpireEvent(camera_id, track_id, now, vehicle_info))
+        return len(vehicles)
     
     def draw_vehicle_info(self, frame, camera_id, track_id, speed_info=None):
         """Avtomobil ma'lumotlarini framega chizish"""
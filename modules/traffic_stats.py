@@ -0,0 +1,252 @@
+"""
+RailSafeAI - Oqimli harakat statistikasi (vaqt oynalari va tezlik kvantillari) moduli
+"""
+import math
+import threading
+from collections import OrderedDict
+from time import time
+from config.settings import TRAFFIC_STATS_SETTINGS
+
+class DDSketch:
+    """DDSketch: nisbiy xatosi cheklangan, birlashtiriladigan kvantil eskizi
+    
+    Qiymat log_gamma(v) bo'yicha savatga tushadi; savatlar soni max_bins bilan cheklanadi
+    (oshsa eng kichik savatlar birlashtiriladi - yuqori kvantillar aniqligi saqlanadi).
+    """
+    
+    __slots__ = ('relative_accuracy', 'gamma', 'log_gamma', 'max_bins', 'bins', 'zero_count', 'count',
+                 'sum', 'min', 'max')
+    
+    def __init__(self, relative_accuracy=None, max_bins=None):
+        self.relative_accuracy = relative_accuracy or TRAFFIC_STATS_SETTINGS['relative_accuracy']
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins or TRAFFIC_STATS_SETTINGS['max_bins']
+        self.bins = {}  # {savat indeksi: soni}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value, weight=1):
+        """Qiymat qo'shish (manfiy bo'lmagan, masalan tezlik km/h)"""
+        value = float(value)
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+    
+    def _collapse(self):
+        """Eng kichik savatlarni bittaga birlashtirish"""
+        indices = sorted(self.bins)
+        excess = len(indices) - self.max_bins
+        target = indices[excess]
+        for index in indices[:excess]:
+            self.bins[target] += self.bins.pop(index)
+    
+    def merge(self, other):
+        """Boshqa eskizni qo'shish (bir xil relative_accuracy bo'lishi kerak)"""
+        if other.count == 0:
+            return self
+        if other.gamma != self.gamma:
+            raise ValueError("Eskizlar aniqligi har xil - birlashtirib bo'lmaydi")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+    
+    def quantile(self, q):
+        """q-kvantil (0..1); bo'sh eskiz uchun None"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Savat markazi - nisbiy xato relative_accuracy dan oshmaydi
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+    
+    def to_dict(self):
+        """JSON ga yoziladigan ko'rinish (boshqa tugunga yuborish uchun)"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+class TrafficBucket:
+    """Bitta vaqt oynasi: klasslar bo'yicha o'tishlar soni va tezlik eskizi"""
+    
+    __slots__ = ('start', 'count', 'classes', 'speed')
+    
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.classes = {}
+        self.speed = DDSketch()
+    
+    def add(self, class_name, speed):
+        self.count += 1
+        self.classes[class_name] = self.classes.get(class_name, 0) + 1
+        if speed and speed > 0:
+            self.speed.add(speed)
+    
+    def merge(self, other):
+        self.count += other.count
+        for class_name, count in other.classes.items():
+            self.classes[class_name] = self.classes.get(class_name, 0) + count
+        self.speed.merge(other.speed)
+        return self
+    
+    def to_report(self, quantiles):
+        """Hisobot qatori: soni, klasslar, tezlik kvantillari"""
+        report = {
+            'start': self.start,
+            'count': self.count,
+            'classes': dict(self.classes),
+            'speed_count': self.speed.count,
+            'speed_mean': self.speed.sum / self.speed.count if self.speed.count else None
+        }
+        for q in quantiles:
+            report[f"p{round(q * 100)}"] = self.speed.quantile(q)
+        return report
+    
+    def to_dict(self):
+        return {'start': self.start, 'count': self.count, 'classes': dict(self.classes), 'speed': self.speed.to_dict()}
+    
+    @classmethod
+    def from_dict(cls, data):
+        bucket = cls(data['start'])
+        bucket.count = data['count']
+        bucket.classes = dict(data['classes'])
+        bucket.speed = DDSketch.from_dict(data['speed'])
+        return bucket
+
+class TrafficAggregator:
+    """Kamera bo'yicha daqiqalik va soatlik oynalar (xotira - oynalar soni bilan cheklangan)
+    
+    Har bir o'tish barcha o'lchamdagi joriy oynaga qo'shiladi; retention dan eski oynalar tashlanadi.
+    O'qish O(oynalar): tanlangan oynalar eskizlari birlashtiriladi, yozuvlar saqlanmaydi.
+    """
+    
+    def __init__(self):
+        self.resolutions = TRAFFIC_STATS_SETTINGS['resolutions']  # {nom: (oyna uzunligi s, saqlanadigan oynalar)}
+        self.quantiles = TRAFFIC_STATS_SETTINGS['quantiles']
+        self.lock = threading.Lock()
+        self.buckets = {name: {} for name in self.resolutions}  # {nom: {camera_id: OrderedDict(start -> bucket)}}
+    
+    def add(self, camera_id, class_name, speed, timestamp=None):
+        """O'tishni qo'shish (tracker chiqish hodisasida chaqiradi)"""
+        timestamp = timestamp if timestamp is not None else time()
+        with self.lock:
+            for name, (width, keep) in self.resolutions.items():
+                series = self.buckets[name].setdefault(str(camera_id), OrderedDict())
+                start = int(timestamp // width * width)
+                bucket = series.get(start)
+                if bucket is None:
+                    latest = next(reversed(series)) if series else start
+                    bucket = series[start] = TrafficBucket(start)
+                    if start < latest:
+                        # Kechikkan yozuv - oynalar vaqt tartibida qolishi kerak
+                        self.buckets[name][str(camera_id)] = series = OrderedDict(sorted(series.items()))
+                    self._evict(series, max(start, latest) - width * keep)
+                bucket.add(class_name, speed)
+    
+    def _evict(self, series, oldest_start):
+        while series:
+            start = next(iter(series))
+            if start > oldest_start:
+                break
+            del series[start]
+    
+    def _select(self, resolution, camera_id, since, until):
+        """Tanlangan kameralar oynalari nusxalari (lock ostida)"""
+        if resolution not in self.resolutions:
+            raise ValueError(f"Noma'lum o'lcham: {resolution}")
+        with self.lock:
+            cameras = [str(camera_id)] if camera_id is not None else list(self.buckets[resolution])
+            selected = []
+            for camera in cameras:
+                for start, bucket in self.buckets[resolution].get(camera, {}).items():
+                    if (since is None or start >= since) and (until is None or start < until):
+                        selected.append(TrafficBucket(start).merge(bucket))
+            return selected
+    
+    def get_series(self, resolution='minute', camera_id=None, since=None, until=None):
+        """Oynalar bo'yicha hisobot (camera_id=None - barcha kameralar bitta qatorga birlashtiriladi)"""
+        merged = {}
+        for bucket in self._select(resolution, camera_id, since, until):
+            if bucket.start in merged:
+                merged[bucket.start].merge(bucket)
+            else:
+                merged[bucket.start] = bucket
+        return [merged[start].to_report(self.quantiles) for start in sorted(merged)]
+    
+    def get_summary(self, resolution='hour', camera_id=None, since=None, until=None):
+        """Tanlangan davr uchun bitta umumiy qator"""
+        total = TrafficBucket(since)
+        for bucket in self._select(resolution, camera_id, since, until):
+            total.merge(bucket)
+        return total.to_report(self.quantiles)
+    
+    def export(self):
+        """Barcha oynalar (boshqa tugunda merge() qilish uchun JSON ko'rinishi)"""
+        with self.lock:
+            return {
+                name: {camera: [bucket.to_dict() for bucket in series.values()] for camera, series in cameras.items()}
+                for name, cameras in self.buckets.items()
+            }
+    
+    def merge(self, exported):
+        """Boshqa tugun (yoki oldingi ishga tushirish) eksportini qo'shish"""
+        with self.lock:
+            for name, cameras in exported.items():
+                if name not in self.resolutions:
+                    continue
+                for camera, buckets in cameras.items():
+                    series = self.buckets[name].setdefault(camera, OrderedDict())
+                    for data in buckets:
+                        bucket = TrafficBucket.from_dict(data)
+                        if bucket.start in series:
+                            series[bucket.start].merge(bucket)
+                        else:
+                            series[bucket.start] = bucket
+                    self.buckets[name][camera] = series = OrderedDict(sorted(series.items()))
+                    if series:
+                        width, keep = self.resolutions[name]
+                        self._evict(series, next(reversed(series)) - width * keep)
\ No newline at end of file
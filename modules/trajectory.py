@@ -0,0 +1,209 @@
+"""
+RailSafeAI - Avtomobil trayektoriyalarini ikkilik fayllarga yozish moduli
+"""
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from queue import Queue
+from time import time
+import numpy as np
+from config.settings import TRAJECTORY_SETTINGS
+from config.paths import Paths
+from modules.event_log import get_logger
+
+logger = get_logger('trajectory')
+
+# Bitta qator: vaqt (unix), track, bbox, ishonch, klass, polygon ichida
+TRAJECTORY_DTYPE = np.dtype([
+    ('t', '<f8'),
+    ('track_id', '<i4'),
+    ('x1', '<f4'), ('y1', '<f4'), ('x2', '<f4'), ('y2', '<f4'),
+    ('conf', '<f4'),
+    ('class_id', '<i2'),
+    ('in_zone', 'u1')
+])
+
+# Indeks: har bir yozilgan bo'lak uchun birinchi qator, qatorlar soni va vaqt oralig'i
+INDEX_DTYPE = np.dtype([('row', '<i8'), ('rows', '<i8'), ('t_min', '<f8'), ('t_max', '<f8')])
+
+MAGIC = b'RSTRAJ01'
+HEADER_ALIGN = 64
+
+def _write_header(f, camera_id, hour_start):
+    """Fayl sarlavhasi: MAGIC + uzunlik + JSON (dtype, kamera, soat), 64 baytga tekislangan"""
+    meta = json.dumps({
+        'version': 1,
+        'camera_id': str(camera_id),
+        'hour_start': hour_start,
+        'dtype': TRAJECTORY_DTYPE.descr
+    }).encode()
+    size = len(MAGIC) + 4 + len(meta)
+    size += -size % HEADER_ALIGN
+    f.write(MAGIC + size.to_bytes(4, 'little') + meta.ljust(size - len(MAGIC) - 4, b' '))
+
+class TrajectoryFile:
+    """Bir soatlik trayektoriya fayli - qatorlar memmap orqali (nusxa olinmaydi)"""
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Trayektoriya fayli emas: {path}")
+            header_size = int.from_bytes(f.read(4), 'little')
+            self.meta = json.loads(f.read(header_size - len(MAGIC) - 4))
+        
+        dtype = np.dtype([tuple(field) for field in self.meta['dtype']])
+        # Oxirgi qator yarim yozilgan bo'lishi mumkin (jarayon to'xtab qolgan) - faqat to'liq qatorlar
+        count = (os.path.getsize(path) - header_size) // dtype.itemsize
+        self.rows = (np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(count,))
+                     if count else np.empty(0, dtype=dtype))
+        
+        index_path = os.path.splitext(path)[0] + '.idx'
+        self.index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) else np.empty(0, INDEX_DTYPE)
+    
+    @property
+    def camera_id(self):
+        return self.meta['camera_id']
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def between(self, t_start, t_end):
+        """[t_start, t_end) oralig'idagi qatorlar (memmap ko'rinishi, nusxasiz)"""
+        start, end = 0, len(self.rows)
+        if len(self.index):
+            # Indeks bo'yicha qidiruv oralig'ini toraytirish
+            chunks = self.index[(self.index['t_max'] >= t_start) & (self.index['t_min'] < t_end)]
+            if not len(chunks):
+                return self.rows[:0]
+            start = int(chunks['row'][0])
+            end = min(int(chunks['row'][-1] + chunks['rows'][-1]), end)
+        times = self.rows['t'][start:end]
+        return self.rows[start + np.searchsorted(times, t_start, 'left'):start + np.searchsorted(times, t_end, 'left')]
+    
+    def track(self, track_id):
+        """Bitta avtomobil trayektoriyasi (nusxa)"""
+        return self.rows[self.rows['track_id'] == track_id]
+
+def list_trajectory_files(camera_id, day=None, directory=None):
+    """Kamera fayllari (day='YYYYMMDD' - bitta kun), vaqt tartibida"""
+    directory = directory or Paths.TRAJECTORIES_DIR
+    pattern = f"{camera_id}_{day}_*.traj" if day else f"{camera_id}_*.traj"
+    return sorted(glob.glob(os.path.join(directory, str(camera_id), pattern)))
+
+def load_trajectories(camera_id, day=None, directory=None):
+    """Kamera trayektoriya fayllarini memmap bilan ochish (soat bo'yicha TrajectoryFile ro'yxati)"""
+    return [TrajectoryFile(path) for path in list_trajectory_files(camera_id, day, directory)]
+
+class TrajectoryRecorder:
+    """Har kadrdagi avtomobillar holatini kamera bo'yicha oldindan ajratilgan buferga yozish
+    
+    Bufer to'lganda (yoki flush_interval o'tganda) bo'lak fon threadiga beriladi va soatlik
+    faylga qo'shiladi; kamera threadi disk bilan ishlamaydi.
+    """
+    
+    def __init__(self, directory=None):
+        self.enabled = TRAJECTORY_SETTINGS['enabled']
+        self.directory = directory or Paths.TRAJECTORIES_DIR
+        self.chunk_rows = TRAJECTORY_SETTINGS['chunk_rows']
+        self.buffers = {}  # {camera_id: [bufer, qatorlar soni, birinchi qator vaqti]} - faqat o'z kamera threadi yozadi
+        self.lock = threading.Lock()
+        self.jobs = Queue()
+        self.rows_written = 0
+        self._worker = None
+        if self.enabled:
+            self._worker = threading.Thread(target=self._run_writer, daemon=True)
+            self._worker.start()
+    
+    def append(self, camera_id, timestamp, vehicle, in_zone):
+        """Bitta qator qo'shish (kamera threadidan)"""
+        if not self.enabled:
+            return
+        
+        state = self.buffers.get(camera_id)
+        if state is None:
+            with self.lock:
+                state = self.buffers[camera_id] = [np.empty(self.chunk_rows, dtype=TRAJECTORY_DTYPE), 0, timestamp]
+        
+        buffer, count = state[0], state[1]
+        x1, y1, x2, y2 = vehicle['bbox']
+        buffer[count] = (timestamp, vehicle['track_id'], x1, y1, x2, y2, vehicle['confidence'],
+                         vehicle['class_id'], in_zone)
+        state[1] = count + 1
+        
+        if state[1] >= self.chunk_rows or timestamp - state[2] >= TRAJECTORY_SETTINGS['flush_interval']:
+            self.flush(camera_id)
+    
+    def on_update(self, event):
+        """UpdateEvent obunachisi (sinxron - kamera threadida, faqat buferga yozadi)"""
+        self.append(event.camera_id, event.timestamp, event.vehicle, event.in_zone)
+    
+    def flush(self, camera_id):
+        """Kamera buferini fon yozuvchiga berish va yangi bufer ajratish"""
+        state = self.buffers.get(camera_id)
+        if state is None or state[1] == 0:
+            return
+        self.jobs.put((camera_id, state[0][:state[1]]))
+        state[0] = np.empty(self.chunk_rows, dtype=TRAJECTORY_DTYPE)
+        state[1] = 0
+        state[2] = time()
+    
+    def stop(self):
+        """Qolgan buferlarni yozib, yozuvchini to'xtatish"""
+        if self._worker is None:
+            return
+        for camera_id in list(self.buffers):
+            self.flush(camera_id)
+        self.jobs.put(None)
+        self._worker.join(timeout=30.0)
+        self._worker = None
+    
+    def get_queue_depth(self):
+        return self.jobs.qsize()
+    
+    def _run_writer(self):
+        """Bo'laklarni soat bo'yicha ajratib fayllarga qo'shish"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            
+            camera_id, rows = job
+            try:
+                hours = (rows['t'] // 3600).astype(np.int64)
+                splits = np.flatnonzero(np.diff(hours)) + 1
+                for part in np.split(rows, splits):
+                    self._write_part(camera_id, part)
+                self.rows_written += len(rows)
+            except Exception as e:
+                logger.error("Xato trayektoriyani yozishda (%s): %s", camera_id, e)
+    
+    def _write_part(self, camera_id, rows):
+        """Bir soatga tegishli qatorlarni fayl oxiriga va indeksga yozish"""
+        hour_start = int(rows['t'][0] // 3600 * 3600)
+        camera_dir = os.path.join(self.directory, str(camera_id))
+        os.makedirs(camera_dir, exist_ok=True)
+        base = os.path.join(camera_dir, f"{camera_id}_{datetime.fromtimestamp(hour_start).strftime('%Y%m%d_%H')}")
+        
+        path = base + '.traj'
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.seek(len(MAGIC))
+                header_size = int.from_bytes(f.read(4), 'little')
+            first_row, torn = divmod(os.path.getsize(path) - header_size, TRAJECTORY_DTYPE.itemsize)
+            if torn:
+                # Oldingi ishga tushirishdan yarim qolgan qator - qatorlar chegarasi buzilmasligi uchun kesiladi
+                os.truncate(path, header_size + first_row * TRAJECTORY_DTYPE.itemsize)
+        else:
+            first_row = 0
+        
+        with open(path, 'ab') as f:
+            if first_row == 0 and f.tell() == 0:
+                _write_header(f, camera_id, hour_start)
+            rows.tofile(f)
+        
+        entry = np.array([(first_row, len(rows), rows['t'].min(), rows['t'].max())], dtype=INDEX_DTYPE)
+        with open(base + '.idx', 'ab') as f:
+            entry.tofile(f)
\ No newline at end of file
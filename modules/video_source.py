@@ -0,0 +1,163 @@
+"""
+RailSafeAI - Uzilganda qayta ulanadigan video manba (RTSP/USB kameralar) moduli
+"""
+import threading
+from time import time
+import cv2
+from config.settings import SOURCE_SETTINGS
+from modules.event_log import get_logger
+
+logger = get_logger('source')
+
+def is_live_source(source):
+    """Jonli manba: sxemali URL (rtsp://, http://, ...), USB kamera indeksi yoki /dev/video* qurilmasi
+    
+    Qolganlari video fayl hisoblanadi - xato yozilgan fayl yo'li cheksiz qayta ulanmaydi.
+    """
+    if isinstance(source, int) and not isinstance(source, bool):
+        return True
+    if not isinstance(source, str):
+        return False
+    scheme, separator, _ = source.partition('://')
+    if separator and len(scheme) > 1 and scheme.replace('+', '').replace('-', '').replace('.', '').isalnum():
+        return True
+    return source.startswith('/dev/')
+
+class ReconnectingCapture:
+    """cv2.VideoCapture o'rniga ishlatiladi (read/isOpened/get/release bir xil)
+    
+    Video faylda o'qilmagan kadr - fayl oxiri (exhausted). Jonli manbada esa uzilish: ulanish
+    yopiladi va fon threadi eksponensial kechikish bilan qayta ulanadi; shu vaqtda read() qisqa
+    kutib (False, None) qaytaradi - kamera threadi to'xtamaydi, tracker holati va yozuvchilar
+    ochiq qoladi. Qotib qolgan o'qish open/read timeout lari (FFmpeg) bilan uziladi.
+    """
+    
+    def __init__(self, source, camera_id=None):
+        self.source = source
+        self.camera_id = camera_id
+        self.live = is_live_source(source)
+        self.exhausted = False
+        self.lock = threading.Lock()
+        self._cap = None
+        self._restored = threading.Event()
+        self._stopping = threading.Event()
+        self._reconnect_thread = None
+        self._outage_started = None
+        self.frame_size = None
+        self.stats = {'reconnects': 0, 'outages': 0, 'outage_seconds': 0.0, 'last_outage_seconds': None,
+                      'failed_attempts': 0}
+        self._cap = self._open()
+    
+    def _open(self):
+        """Ulanish (jonli manbada ulanish/o'qish timeout lari bilan)"""
+        if not self.live:
+            return cv2.VideoCapture(self.source)
+        params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, SOURCE_SETTINGS['open_timeout_ms'],
+                  cv2.CAP_PROP_READ_TIMEOUT_MSEC, SOURCE_SETTINGS['read_timeout_ms']]
+        return cv2.VideoCapture(self.source, cv2.CAP_ANY, params)
+    
+    def isOpened(self):
+        cap = self._cap
+        return cap is not None and cap.isOpened()
+    
+    def is_connected(self):
+        """Jonli manba hozir ulangan (uzilish davom etmayapti)"""
+        return self._cap is not None
+    
+    def get(self, prop):
+        cap = self._cap
+        return cap.get(prop) if cap is not None else 0.0
+    
+    def read(self):
+        """Kadr o'qish; uzilish vaqtida read_wait gacha qayta ulanishni kutib (False, None)"""
+        cap = self._cap
+        if cap is None:
+            if not self._restored.wait(SOURCE_SETTINGS['read_wait']):
+                return False, None
+            cap = self._cap
+            if cap is None:
+                return False, None
+        
+        success, frame = cap.read()
+        if success:
+            self._check_frame_size(frame)
+            return success, frame
+        
+        if not self.live or not SOURCE_SETTINGS['reconnect']:
+            self.exhausted = True
+            return False, None
+        self._start_outage(cap)
+        return False, None
+    
+    def _check_frame_size(self, frame):
+        size = frame.shape[1], frame.shape[0]
+        if self.frame_size is not None and size != self.frame_size:
+            # Qayta ulangan kamera boshqa o'lchamda - asosiy video yozuvchisi eski o'lchamda qoladi
+            logger.warning("Kamera %s: kadr o'lchami o'zgardi %s -> %s", self.camera_id, self.frame_size, size)
+        self.frame_size = size
+    
+    def _start_outage(self, cap):
+        """Uzilish: ulanishni yopish va fon threadida qayta ulanishni boshlash"""
+        with self.lock:
+            if self._cap is not cap:
+                return
+            self._cap = None
+            self._restored.clear()
+            self._outage_started = time()
+            self.stats['outages'] += 1
+        cap.release()
+        logger.warning("Kamera %s: manba uzildi, qayta ulanilmoqda (%s)", self.camera_id, self.source,
+                       extra={'event': 'source_lost', 'camera_id': self.camera_id})
+        
+        if self._reconnect_thread is None or not self._reconnect_thread.is_alive():
+            self._reconnect_thread = threading.Thread(
+                target=self._run_reconnect, name=f"reconnect-{self.camera_id}", daemon=True
+            )
+            self._reconnect_thread.start()
+    
+    def _run_reconnect(self):
+        """Eksponensial kechikish bilan qayta ulanish (birinchi urinish darhol)"""
+        delay = 0.0
+        while not self._stopping.wait(delay):
+            cap = self._open()
+            if cap.isOpened() and cap.grab():
+                outage = time() - self._outage_started
+                with self.lock:
+                    if self._stopping.is_set():
+                        cap.release()
+                        return
+                    self._cap = cap
+                    self.stats['reconnects'] += 1
+                    self.stats['outage_seconds'] += outage
+                    self.stats['last_outage_seconds'] = outage
+                self._restored.set()
+                logger.info("Kamera %s: manba qayta ulandi (uzilish %.1fs)", self.camera_id, outage,
+                            extra={'event': 'source_restored', 'camera_id': self.camera_id, 'duration': outage})
+                return
+            
+            cap.release()
+            self.stats['failed_attempts'] += 1
+            delay = min(max(delay * 2, SOURCE_SETTINGS['backoff']), SOURCE_SETTINGS['backoff_max'])
+    
+    def get_outage_seconds(self):
+        """Joriy uzilish davomiyligi (ulangan bo'lsa 0)"""
+        started = self._outage_started
+        return time() - started if self._cap is None and started is not None else 0.0
+    
+    def get_stats(self):
+        """Qayta ulanishlar soni va uzilishlar davomiyligi (joriy uzilish ham)"""
+        stats = dict(self.stats)
+        stats['connected'] = self.is_connected()
+        stats['current_outage_seconds'] = round(self.get_outage_seconds(), 2)
+        return stats
+    
+    def release(self):
+        """Manbani yopish va qayta ulanishni to'xtatish"""
+        self._stopping.set()
+        self._restored.set()
+        if self._reconnect_thread is not None:
+            self._reconnect_thread.join(timeout=SOURCE_SETTINGS['open_timeout_ms'] / 1000.0 + 1.0)
+        with self.lock:
+            cap, self._cap = self._cap, None
+        if cap is not None:
+            cap.release()
\ No newline at end of file